@@ -0,0 +1,342 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+from web3 import Web3
+
+from features.contract_clause_suggestion import suggest_clauses
+from features.contract_compliance_monitoring import monitor_compliance
+from features.contract_review import review_contract
+from features.document_comparison import compare_documents
+from features.draft_generation import draft_contract
+from features.full_analysis import run_full_analysis
+from features.legal_document_categorization import categorize_document
+from helper_functions.blockchain import FULL_TEXT_MODE, HASH_ANCHOR_MODE, MERKLE_BATCH_MODE, MODE_CONTRACTS
+from helper_functions.blockchain import batch_receipts, submit_batch, submit_document, verify_batch_document, verify_document
+from helper_functions.contract_catalog import CONTRACT_TYPES, COUNTRIES
+from helper_functions.metrics import render_prometheus, span
+from helper_functions.pdf_text_extractor import extract_text_from_pdf
+from helper_functions.solidity_artifacts import load_contract_interface
+from helper_functions.transaction_service import CONFIRMED, TransactionService
+from helper_functions.word_diff import word_diff
+
+
+load_dotenv()
+
+# Threads that wait on Watsonx and the chain; these calls block in their SDKs, so each in-flight request holds one
+API_IO_WORKERS = int(os.environ.get("API_IO_WORKERS", "64"))
+
+# Threads that extract PDFs; large documents are fanned out further to the extraction process pool
+API_EXTRACTION_WORKERS = int(os.environ.get("API_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+
+# Bounds of the generation budget a client may ask for
+MIN_MAX_TOKENS = 1
+MAX_MAX_TOKENS = 2048
+DEFAULT_MAX_TOKENS = 500
+
+ibm_project_id = os.environ.get("PROJECT_ID")
+ibm_url = os.environ.get("WATSONX_URL")
+
+_io_pool = ThreadPoolExecutor(max_workers=API_IO_WORKERS, thread_name_prefix="api-io")
+_extraction_pool = ThreadPoolExecutor(max_workers=API_EXTRACTION_WORKERS, thread_name_prefix="api-extract")
+
+_chain_lock = threading.Lock()
+_chain = {}
+
+
+class BadRequest(Exception):
+    """
+    A request the client has to correct; answered with status 400.
+    """
+
+
+def _get_chain():
+    """
+    Returns the Web3 connection and the transaction service, created on first use so the API starts without a node.
+    """
+    with _chain_lock:
+        if not _chain:
+            w3 = Web3(Web3.HTTPProvider(os.environ.get("WEB3_PROVIDER")))
+            _chain["w3"] = w3
+            _chain["service"] = TransactionService(w3, os.environ.get("DEFAULT_ACCOUNT"), os.environ.get("PRIVATE_KEY"))
+        return _chain["w3"], _chain["service"]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_contract_interface(contract_name):
+    return load_contract_interface(contract_name)
+
+
+async def _run(pool, function, *args):
+    # Blocking work runs in a pool, so the event loop keeps accepting and answering other requests meanwhile
+    return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(function, *args))
+
+
+async def _read_request(request):
+    """
+    Reads the fields and uploaded files of a request, sent either as JSON or as a multipart form.
+
+    Returns:
+        tuple: The fields as a dict and the uploaded files as a dict of name to (filename, bytes).
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        fields, files = {}, {}
+        async with request.form() as form:
+            for name, value in form.multi_items():
+                if hasattr(value, "read"):
+                    files[name] = (value.filename, await value.read())
+                else:
+                    fields[name] = value
+        return fields, files
+
+    try:
+        fields = await request.json()
+    except json.JSONDecodeError:
+        raise BadRequest("The body must be JSON or a multipart form")
+    if not isinstance(fields, dict):
+        raise BadRequest("The body must be a JSON object")
+    return fields, {}
+
+
+async def _document_text(fields, files, name="text", file_name="file"):
+    """
+    Returns a document given as plain text in `name` or as an uploaded PDF in `file_name`, extracted in the
+    extraction pool.
+    """
+    if file_name in files:
+        return await _run(_extraction_pool, extract_text_from_pdf, BytesIO(files[file_name][1]))
+    text = fields.get(name)
+    if isinstance(text, str) and text.strip():
+        return text
+    raise BadRequest(f"Send the document as text in '{name}' or as a PDF in '{file_name}'")
+
+
+def _required(fields, name):
+    value = fields.get(name)
+    if not isinstance(value, str) or not value.strip():
+        raise BadRequest(f"'{name}' is required")
+    return value
+
+
+def _max_tokens(fields):
+    try:
+        max_tokens = int(fields.get("max_tokens", DEFAULT_MAX_TOKENS))
+    except (TypeError, ValueError):
+        raise BadRequest("'max_tokens' must be an integer")
+    if not MIN_MAX_TOKENS <= max_tokens <= MAX_MAX_TOKENS:
+        raise BadRequest(f"'max_tokens' must be between {MIN_MAX_TOKENS} and {MAX_MAX_TOKENS}")
+    return max_tokens
+
+
+def _checksum_address(address):
+    if not isinstance(address, str) or not Web3.is_address(address):
+        raise BadRequest("'contract_address' is not a valid Ethereum address")
+    return Web3.to_checksum_address(address)
+
+
+def endpoint(operation):
+    """
+    Wraps a handler so that it is timed under `operation` and its errors become JSON responses: 400 for a bad
+    request and 502 when Watsonx, the chain or a feature failed.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            try:
+                with span("api_request", operation=operation):
+                    fields, files = await _read_request(request)
+                    return JSONResponse(await handler(fields, files))
+            except BadRequest as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+            except Exception as e:
+                return JSONResponse({"error": f"{type(e).__name__}: {e}"}, status_code=502)
+        return wrapper
+    return decorator
+
+
+@endpoint("draft")
+async def draft(fields, files):
+    contract_type = _required(fields, "contract_type")
+    country = _required(fields, "country")
+    if contract_type not in CONTRACT_TYPES:
+        raise BadRequest(f"'contract_type' must be one of {', '.join(CONTRACT_TYPES)}")
+    if country not in COUNTRIES:
+        raise BadRequest("'country' is not a supported country")
+    draft_text = await _run(_io_pool, functools.partial(
+        draft_contract, ibm_url, ibm_project_id, contract_type=contract_type, party_one=_required(fields, "party_one"),
+        party_two=_required(fields, "party_two"), contract_terms=fields.get("contract_terms", ""), country=country,
+    ))
+    return {"draft": draft_text}
+
+
+@endpoint("review")
+async def review(fields, files):
+    contract_text = await _document_text(fields, files)
+    return {"review": await _run(_io_pool, review_contract, ibm_url, ibm_project_id, _max_tokens(fields), contract_text)}
+
+
+@endpoint("suggest_clauses")
+async def suggest(fields, files):
+    contract_text = await _document_text(fields, files)
+    return {"suggestions": await _run(_io_pool, suggest_clauses, ibm_url, ibm_project_id, _max_tokens(fields), contract_text)}
+
+
+@endpoint("compliance")
+async def compliance(fields, files):
+    contract_text = await _document_text(fields, files)
+    conditions = _required(fields, "conditions")
+    summary = await _run(_io_pool, monitor_compliance, ibm_url, ibm_project_id, _max_tokens(fields), contract_text, conditions)
+    return {"compliance": summary}
+
+
+@endpoint("compare")
+async def compare(fields, files):
+    original_text = await _document_text(fields, files, "original_text", "original_file")
+    new_text = await _document_text(fields, files, "new_text", "new_file")
+    comparison = await _run(_io_pool, compare_documents, ibm_url, ibm_project_id, _max_tokens(fields), original_text, new_text)
+    return {"comparison": comparison}
+
+
+@endpoint("categorize")
+async def categorize(fields, files):
+    document_text = await _document_text(fields, files)
+    return {"category": await _run(_io_pool, categorize_document, ibm_url, ibm_project_id, _max_tokens(fields), document_text)}
+
+
+@endpoint("full_analysis")
+async def full_analysis(fields, files):
+    contract_text = await _document_text(fields, files)
+    max_tokens = _max_tokens(fields)
+    results = await _run(
+        _io_pool, lambda: list(run_full_analysis(ibm_url, ibm_project_id, max_tokens, contract_text, fields.get("conditions")))
+    )
+    return {
+        result["analysis"]: {
+            "result": result["result"],
+            "error": None if result["error"] is None else f"{type(result['error']).__name__}: {result['error']}",
+            "seconds": round(result["seconds"], 3),
+        }
+        for result in results
+    }
+
+
+@endpoint("upload")
+async def upload(fields, files):
+    mode = fields.get("mode", HASH_ANCHOR_MODE)
+    if mode not in MODE_CONTRACTS:
+        raise BadRequest(f"'mode' must be one of {', '.join(MODE_CONTRACTS)}")
+    _, service = _get_chain()
+    contract_interface = await _run(_io_pool, _get_contract_interface, MODE_CONTRACTS[mode])
+
+    # Normalizing and hashing the documents and building the Merkle tree run in the pool too, since on long
+    # documents they would hold up every other request
+    if mode == MERKLE_BATCH_MODE:
+        if not files:
+            raise BadRequest("Send the contracts of a batch as PDF files")
+        documents = []
+        for name, (filename, pdf_bytes) in files.items():
+            documents.append((filename or name, await _run(_extraction_pool, extract_text_from_pdf, BytesIO(pdf_bytes))))
+        job_id = await _run(_io_pool, submit_batch, service, contract_interface, documents)
+    else:
+        document_text = await _document_text(fields, files)
+        job_id = await _run(_io_pool, submit_document, service, contract_interface, mode, document_text)
+    return {"job_id": job_id}
+
+
+async def upload_status(request):
+    try:
+        job_id = int(request.path_params["job_id"])
+        _, service = _get_chain()
+        job = service.status(job_id)
+    except (KeyError, ValueError):
+        return JSONResponse({"error": "Unknown upload job"}, status_code=404)
+
+    metadata = job.pop("metadata")
+    job["mode"] = metadata["mode"]
+    if metadata["mode"] == MERKLE_BATCH_MODE:
+        job["root"] = metadata["root"]
+        if job["status"] == CONFIRMED:
+            job["receipts"] = batch_receipts(dict(job, metadata=metadata))
+    else:
+        job["digest"] = metadata["digest"]
+    return JSONResponse(job)
+
+
+@endpoint("verify")
+async def verify(fields, files):
+    mode = fields.get("mode", HASH_ANCHOR_MODE)
+    if mode not in MODE_CONTRACTS:
+        raise BadRequest(f"'mode' must be one of {', '.join(MODE_CONTRACTS)}")
+    document_text = await _document_text(fields, files)
+    w3, _ = _get_chain()
+    contract_interface = await _run(_io_pool, _get_contract_interface, MODE_CONTRACTS[mode])
+
+    if mode == MERKLE_BATCH_MODE:
+        receipt = fields.get("receipt")
+        if "receipt" in files:
+            receipt = files["receipt"][1].decode("utf-8")
+        if isinstance(receipt, str):
+            try:
+                receipt = json.loads(receipt)
+            except json.JSONDecodeError:
+                raise BadRequest("'receipt' is not valid JSON")
+        if not isinstance(receipt, dict):
+            raise BadRequest("'receipt' with the inclusion receipt of the contract is required")
+        receipt = dict(receipt, contract_address=_checksum_address(receipt.get("contract_address")))
+        return await _run(_io_pool, verify_batch_document, w3, contract_interface, receipt, document_text)
+
+    contract_address = _checksum_address(fields.get("contract_address"))
+    verification = await _run(_io_pool, verify_document, w3, contract_interface, mode, contract_address, document_text)
+    if mode == FULL_TEXT_MODE:
+        # The normalized texts can be long; a bounded word diff tells the client what differs
+        stored, uploaded = verification.pop("stored"), verification.pop("uploaded")
+        if not verification["matches"]:
+            verification["diff"] = word_diff(stored, uploaded)
+    return verification
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics(request):
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(routes=[
+    Route("/health", health),
+    Route("/metrics", metrics),
+    Route("/draft", draft, methods=["POST"]),
+    Route("/review", review, methods=["POST"]),
+    Route("/suggest-clauses", suggest, methods=["POST"]),
+    Route("/compliance", compliance, methods=["POST"]),
+    Route("/compare", compare, methods=["POST"]),
+    Route("/categorize", categorize, methods=["POST"]),
+    Route("/full-analysis", full_analysis, methods=["POST"]),
+    Route("/upload", upload, methods=["POST"]),
+    Route("/upload/{job_id}", upload_status),
+    Route("/verify", verify, methods=["POST"]),
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the LegalEase features as a JSON HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    # One process: the response, extraction and PDF caches and the nonce counter of the transaction service are
+    # per process, so concurrency comes from the pools rather than from more workers
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,217 @@
+import argparse
+import csv
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+from features.legal_document_categorization import categorize_document
+from helper_functions.pdf_text_extractor import extract_text_from_pdf
+from helper_functions.rate_limiting import RateLimiter
+
+
+CSV_FIELDS = ["path", "category", "extract_seconds", "categorize_seconds", "error"]
+
+
+def collect_documents(source):
+    """
+    Lists the PDF files to categorize.
+
+    Parameters:
+        source (str): A directory that is searched recursively for PDF files, or a manifest file with one path per line.
+
+    Returns:
+        list: The sorted PDF paths.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(".pdf"):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+
+    with open(source, encoding="utf-8") as manifest:
+        return sorted(line.strip() for line in manifest if line.strip())
+
+
+def _write_records(output_path, records):
+    """
+    Replaces the results file with the given records, through a temporary file so a crash leaves the old one intact.
+    """
+    temporary_path = output_path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8", newline="") as output:
+        if output_path.endswith(".csv"):
+            writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        else:
+            for record in records:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(temporary_path, output_path)
+
+
+def load_completed(output_path):
+    """
+    Reads the paths that already have a result in the output file, so an interrupted run can resume.
+
+    A partially written last record left behind by a crash is truncated away. Failed records are removed from the
+    file, since those documents are processed again, so every path keeps a single record across resumed runs.
+
+    Parameters:
+        output_path (str): The JSONL or CSV results file.
+
+    Returns:
+        set: The paths of documents that were already categorized successfully.
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    # Drop an incomplete trailing line so new records start on a fresh line
+    with open(output_path, "rb+") as output:
+        content = output.read()
+        if content and not content.endswith(b"\n"):
+            output.truncate(content.rfind(b"\n") + 1)
+
+    with open(output_path, encoding="utf-8", newline="") as output:
+        if output_path.endswith(".csv"):
+            rows = list(csv.DictReader(output))
+        else:
+            rows = [json.loads(line) for line in output if line.strip()]
+
+    # The latest successful record of every path is kept
+    succeeded = {}
+    for row in rows:
+        if not row.get("error"):
+            succeeded[row["path"]] = row
+
+    if len(succeeded) < len(rows):
+        _write_records(output_path, list(succeeded.values()))
+    return set(succeeded)
+
+
+def categorize_file(path, url, project_id, max_tokens, rate_limiter):
+    """
+    Extracts the text of one PDF and categorizes it, timing both stages.
+
+    Parameters:
+        path (str): The PDF file path.
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the categorization output.
+        rate_limiter (RateLimiter): The limiter shared by all workers; every request sent to Watsonx takes a slot.
+
+    Returns:
+        dict: The result record with the category, stage timings and any error message.
+    """
+    record = {"path": path, "category": "", "extract_seconds": 0.0, "categorize_seconds": 0.0, "error": ""}
+
+    try:
+        started = time.perf_counter()
+        with open(path, "rb") as pdf_file:
+            document_text = extract_text_from_pdf(pdf_file)
+        record["extract_seconds"] = round(time.perf_counter() - started, 4)
+
+        started = time.perf_counter()
+        record["category"] = categorize_document(url, project_id, max_tokens, document_text, rate_limiter=rate_limiter)
+        record["categorize_seconds"] = round(time.perf_counter() - started, 4)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    return record
+
+
+def _latency_summary(values):
+    if not values:
+        return "n/a"
+    ordered = sorted(values)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"mean {statistics.mean(ordered):.3f}s, p50 {statistics.median(ordered):.3f}s, p95 {p95:.3f}s"
+
+
+def run_batch(source, output_path, url, project_id, max_tokens=200, concurrency=4, requests_per_minute=60):
+    """
+    Categorizes every PDF from `source` and appends one record per document to `output_path` as soon as it finishes.
+
+    Parameters:
+        source (str): A directory of PDF files or a manifest file listing them.
+        output_path (str): The results file; the format is CSV when it ends in .csv and JSONL otherwise.
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate per categorization.
+        concurrency (int): The maximum number of documents processed at the same time.
+        requests_per_minute (int): The ceiling on Watsonx requests per minute, 0 for no limit.
+
+    Returns:
+        list: The result records of the documents processed in this run.
+    """
+    documents = collect_documents(source)
+    completed = load_completed(output_path)
+    pending = [path for path in documents if path not in completed]
+    print(f"{len(documents)} documents found, {len(completed)} already done, {len(pending)} to process")
+
+    rate_limiter = RateLimiter(requests_per_minute)
+    write_csv = output_path.endswith(".csv")
+    write_header = write_csv and (not os.path.exists(output_path) or os.path.getsize(output_path) == 0)
+
+    records = []
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8", newline="") as output, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        writer = csv.DictWriter(output, fieldnames=CSV_FIELDS) if write_csv else None
+        if write_header:
+            writer.writeheader()
+
+        futures = [
+            executor.submit(categorize_file, path, url, project_id, max_tokens, rate_limiter)
+            for path in pending
+        ]
+
+        # Results are written from this thread only, in completion order, and flushed so they survive a crash
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            if writer:
+                writer.writerow(record)
+            else:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+            status = record["error"] or "ok"
+            print(f"[{len(records)}/{len(pending)}] {record['path']}: {status}")
+
+    elapsed = time.perf_counter() - started
+    succeeded = [record for record in records if not record["error"]]
+
+    print(f"Processed {len(records)} documents in {elapsed:.1f}s ({len(succeeded)} succeeded)")
+    if elapsed > 0:
+        print(f"Throughput: {len(records) / elapsed * 60:.1f} docs/min")
+    print(f"Extraction latency: {_latency_summary([record['extract_seconds'] for record in succeeded])}")
+    print(f"Categorization latency: {_latency_summary([record['categorize_seconds'] for record in succeeded])}")
+
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Categorize a folder of legal documents without the Streamlit UI.")
+    parser.add_argument("source", help="Directory of PDF files or a manifest file with one PDF path per line")
+    parser.add_argument("output", help="Results file (.jsonl or .csv); existing results are skipped on resume")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of documents processed concurrently")
+    parser.add_argument("--rpm", type=int, default=60, help="Maximum Watsonx requests per minute (0 disables the limit)")
+    parser.add_argument("--max-tokens", type=int, default=200, help="Maximum tokens generated per categorization")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    run_batch(
+        args.source,
+        args.output,
+        os.environ.get("WATSONX_URL"),
+        os.environ.get("PROJECT_ID"),
+        max_tokens=args.max_tokens,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+    )
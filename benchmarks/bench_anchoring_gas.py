@@ -0,0 +1,42 @@
+import argparse
+import time
+
+from web3 import EthereumTesterProvider, Web3
+
+from benchmarks.corpus import make_contract_text
+from helper_functions.blockchain import FULL_TEXT_MODE, HASH_ANCHOR_MODE, MODE_CONTRACTS, upload_document, verify_document
+from helper_functions.solidity_artifacts import load_contract_interface
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare gas and latency of full text storage and hash anchoring.")
+    parser.add_argument("--words", type=int, nargs="+", default=[500, 2000, 5000, 20000])
+    args = parser.parse_args()
+
+    # In-process chain from eth-tester; accounts are unlocked, so no private key is needed
+    w3 = Web3(EthereumTesterProvider())
+    account_address = w3.eth.accounts[0]
+    interfaces = {mode: load_contract_interface(name) for mode, name in MODE_CONTRACTS.items()}
+
+    print(f"{'words':>6} {'mode':>12} {'gas used':>10} {'upload s':>9} {'verify s':>9} {'match':>6}")
+    for word_count in args.words:
+        document_text = make_contract_text(word_count)
+
+        for mode in (FULL_TEXT_MODE, HASH_ANCHOR_MODE):
+            started = time.perf_counter()
+            try:
+                upload = upload_document(w3, interfaces[mode], mode, document_text, account_address)
+            except Exception as e:
+                # Long texts exceed the initcode size limit (EIP-3860) and cannot be stored in full at all
+                print(f"{word_count:>6} {mode:>12} {'failed':>10}  {type(e).__name__}: {str(e)[:60]}")
+                continue
+            upload_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            verification = verify_document(w3, interfaces[mode], mode, upload["contract_address"], document_text)
+            verify_seconds = time.perf_counter() - started
+
+            print(
+                f"{word_count:>6} {mode:>12} {upload['gas_used']:>10} {upload_seconds:>9.3f} "
+                f"{verify_seconds:>9.3f} {str(verification['matches']):>6}"
+            )
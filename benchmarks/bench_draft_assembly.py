@@ -0,0 +1,81 @@
+import argparse
+import time
+
+from benchmarks.fake_llm import FakeWatsonxLLM, fake_watsonx
+from features.draft_generation import stream_draft_contract
+from helper_functions.clause_library import build_skeleton
+from helper_functions.contract_catalog import CONTRACT_TYPES, COUNTRIES
+from helper_functions.llm_cache import clear_response_cache
+
+
+# Generation budget of drafting before the clause library, when the model wrote the whole contract
+FULL_DRAFT_TOKENS = 800
+
+TERMS = "Monthly fee of 5000 payable within 30 days of invoice. Work starts on 1 March and runs for 12 months."
+
+
+def measure_full_generation(first_token_seconds, tokens_per_second):
+    """
+    Times a model writing a whole contract within the former 800-token budget.
+
+    Returns:
+        tuple: The seconds to the first piece, the total seconds and the generated tokens.
+    """
+    model = FakeWatsonxLLM("full", {"max_new_tokens": FULL_DRAFT_TOKENS}, first_token_seconds, tokens_per_second)
+    started = time.perf_counter()
+    first_piece_seconds = None
+    pieces = []
+    for piece in model.stream("Draft a complete contract for the parties and key terms. " * 20):
+        if first_piece_seconds is None:
+            first_piece_seconds = time.perf_counter() - started
+        pieces.append(piece)
+    return first_piece_seconds, time.perf_counter() - started, FULL_DRAFT_TOKENS
+
+
+def measure_assembly(contract_type, country, models):
+    """
+    Times an assembled draft.
+
+    Returns:
+        tuple: The seconds to the first piece, the total seconds, the generated tokens and the words of the contract.
+        With the fake model no generated section is recognized, so every section keeps its library text.
+    """
+    models_before = len(models)
+    started = time.perf_counter()
+    first_piece_seconds = None
+    pieces = []
+    for piece in stream_draft_contract(
+        "", "", contract_type=contract_type, party_one="Acme Corp", party_two="Beta LLC", contract_terms=TERMS,
+        country=country,
+    ):
+        if first_piece_seconds is None:
+            first_piece_seconds = time.perf_counter() - started
+        pieces.append(piece)
+    # The fake models always write their whole budget, so the budgets of the called tiers are the generated tokens
+    generated = sum(int(model.params["max_new_tokens"]) * model.calls for model in models[models_before:])
+    return first_piece_seconds, time.perf_counter() - started, generated, len("".join(pieces).split())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare drafts assembled from the clause library with whole generated contracts.")
+    parser.add_argument("--first-token-seconds", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--countries", nargs="+", default=["United States"], choices=COUNTRIES)
+    args = parser.parse_args()
+
+    first, total, tokens = measure_full_generation(args.first_token_seconds, args.tokens_per_second)
+    print(f"whole contract generated: first piece {first:.2f}s, done {total:.2f}s, {tokens} tokens, at most ~{int(tokens * 0.75)} words")
+    print()
+    print(f"{'contract type':<24} {'country':<16} {'sections':>8} {'filled':>6} {'first s':>8} {'total s':>8} {'tokens':>7} {'words':>6}")
+
+    with fake_watsonx(first_token_seconds=args.first_token_seconds, tokens_per_second=args.tokens_per_second) as models:
+        for country in args.countries:
+            for contract_type in CONTRACT_TYPES:
+                clear_response_cache()
+                skeleton = build_skeleton(contract_type, "Acme Corp", "Beta LLC", country)
+                filled = sum(1 for section in skeleton["sections"] if section["fill"])
+                first, total, tokens, words = measure_assembly(contract_type, country, models)
+                print(
+                    f"{contract_type:<24} {country:<16} {len(skeleton['sections']):>8} {filled:>6} "
+                    f"{first:>8.3f} {total:>8.2f} {tokens:>7} {words:>6}"
+                )
@@ -0,0 +1,55 @@
+import argparse
+import time
+
+from benchmarks.corpus import make_contract_text
+from benchmarks.fake_llm import fake_watsonx
+from features.contract_clause_suggestion import suggest_clauses
+from features.contract_compliance_monitoring import monitor_compliance
+from features.contract_review import review_contract
+from features.full_analysis import run_full_analysis, summarize_latency
+from features.legal_document_categorization import categorize_document
+from helper_functions.llm_cache import clear_response_cache
+
+
+CONDITIONS = "Payment within 30 days of invoice. Personal data is processed under the GDPR."
+
+
+def run_serially(max_tokens, contract_text):
+    """
+    Runs the analyses of a full analysis one after another, as the separate pages of the app do.
+    """
+    review_contract("", "", max_tokens, contract_text)
+    suggest_clauses("", "", max_tokens, contract_text)
+    monitor_compliance("", "", max_tokens, contract_text, CONDITIONS)
+    categorize_document("", "", max_tokens, contract_text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the full analysis with running its analyses one after another.")
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 3000])
+    parser.add_argument("--max-tokens", type=int, default=300)
+    parser.add_argument("--first-token-seconds", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    args = parser.parse_args()
+
+    print(f"{'words':>6} {'serial s':>9} {'full s':>7} {'slowest s':>10} {'speedup':>8}")
+    with fake_watsonx(first_token_seconds=args.first_token_seconds, tokens_per_second=args.tokens_per_second):
+        for word_count in args.words:
+            contract_text = make_contract_text(word_count, seed=word_count)
+
+            # Greedy answers are cached, so both runs start from an empty cache
+            clear_response_cache()
+            started = time.perf_counter()
+            run_serially(args.max_tokens, contract_text)
+            serial_seconds = time.perf_counter() - started
+
+            clear_response_cache()
+            started = time.perf_counter()
+            results = list(run_full_analysis("", "", args.max_tokens, contract_text, CONDITIONS))
+            latency = summarize_latency(results, time.perf_counter() - started)
+
+            assert all(result["error"] is None for result in results), [result["error"] for result in results]
+            print(
+                f"{word_count:>6} {serial_seconds:>9.2f} {latency['total_seconds']:>7.2f} "
+                f"{latency['slowest_seconds']:>10.2f} {serial_seconds / latency['total_seconds']:>7.1f}x"
+            )
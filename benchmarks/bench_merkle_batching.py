@@ -0,0 +1,46 @@
+import argparse
+import time
+
+from web3 import EthereumTesterProvider, Web3
+
+from benchmarks.corpus import make_contract_text
+from helper_functions.blockchain import HASH_ANCHOR_MODE, MERKLE_BATCH_MODE, MODE_CONTRACTS
+from helper_functions.blockchain import upload_batch, upload_document, verify_batch_document
+from helper_functions.solidity_artifacts import load_contract_interface
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare one anchor per contract with Merkle-batched anchoring.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 256])
+    parser.add_argument("--words", type=int, default=1000, help="Approximate words per synthetic contract")
+    args = parser.parse_args()
+
+    # In-process chain from eth-tester; accounts are unlocked, so no private key is needed
+    w3 = Web3(EthereumTesterProvider())
+    account_address = w3.eth.accounts[0]
+    anchor_interface = load_contract_interface(MODE_CONTRACTS[HASH_ANCHOR_MODE])
+    batch_interface = load_contract_interface(MODE_CONTRACTS[MERKLE_BATCH_MODE])
+
+    print(f"{'docs':>5} {'mode':>12} {'txs':>5} {'gas/doc':>9} {'docs/s':>8} {'verify ms/doc':>14}")
+    for batch_size in args.batch_sizes:
+        documents = [(f"contract-{seed}.pdf", make_contract_text(args.words, seed=seed)) for seed in range(batch_size)]
+
+        started = time.perf_counter()
+        uploads = [upload_document(w3, anchor_interface, HASH_ANCHOR_MODE, text, account_address) for _, text in documents]
+        elapsed = time.perf_counter() - started
+        gas_per_document = sum(upload["gas_used"] for upload in uploads) // batch_size
+        print(f"{batch_size:>5} {HASH_ANCHOR_MODE:>12} {batch_size:>5} {gas_per_document:>9} {batch_size / elapsed:>8.1f} {'':>14}")
+
+        started = time.perf_counter()
+        batch = upload_batch(w3, batch_interface, documents, account_address)
+        elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for receipt, (_, text) in zip(batch["receipts"], documents):
+            assert verify_batch_document(w3, batch_interface, receipt, text)["matches"], receipt["name"]
+        verify_ms = (time.perf_counter() - started) * 1000 / batch_size
+
+        print(
+            f"{batch_size:>5} {MERKLE_BATCH_MODE:>12} {1:>5} {batch['gas_used'] // batch_size:>9} "
+            f"{batch_size / elapsed:>8.1f} {verify_ms:>14.2f}"
+        )
@@ -0,0 +1,93 @@
+import argparse
+import copy
+import time
+
+from benchmarks.corpus import make_contract_text
+from benchmarks.fake_llm import fake_watsonx
+from features.contract_clause_suggestion import suggest_clauses
+from features.contract_compliance_monitoring import monitor_compliance
+from features.contract_review import review_contract
+from features.legal_document_categorization import _prepare_categorization
+from helper_functions.llm_cache import clear_response_cache
+from helper_functions.model_routing import (
+    DEFAULT_ROUTING, get_routing_stats, reset_routing_stats, routed_invoke, set_routing_config,
+)
+
+
+CONDITIONS = "Payment within 30 days of invoice. Personal data is processed under the GDPR."
+
+
+def categorize_with_model(url, project_id, max_tokens, document_text):
+    # A trained local classifier may recognize the synthetic contracts, so the model path is called directly
+    route, watsonx_llms, template = _prepare_categorization(url, project_id, max_tokens, document_text)
+    return routed_invoke(route, watsonx_llms, template)
+
+
+FEATURES = {
+    "review_contract": lambda max_tokens, text: review_contract("", "", max_tokens, text),
+    "suggest_clauses": lambda max_tokens, text: suggest_clauses("", "", max_tokens, text),
+    "monitor_compliance": lambda max_tokens, text: monitor_compliance("", "", max_tokens, text, CONDITIONS),
+    "categorize_document": lambda max_tokens, text: categorize_with_model("", "", max_tokens, text),
+}
+
+
+def fixed_config():
+    """
+    Every feature on the large model with the budget asked for by the caller, as before routing existed.
+    """
+    config = copy.deepcopy(DEFAULT_ROUTING)
+    for route in config["features"].values():
+        route["tiers"] = [{"tier": "large"}]
+        route["max_new_tokens"] = {"min": 10 ** 6, "max": 10 ** 6, "per_input_token": 0.0}
+    return config
+
+
+def rejecting_config():
+    """
+    The default routes, with validation that no answer passes, so every small model answer is escalated.
+    """
+    config = copy.deepcopy(DEFAULT_ROUTING)
+    for route in config["features"].values():
+        route["validation"] = {"min_words": 10 ** 6}
+    return config
+
+
+def run(label, config, max_tokens, contract_text):
+    set_routing_config(config)
+    reset_routing_stats()
+    clear_response_cache()
+
+    for feature, call in FEATURES.items():
+        started = time.perf_counter()
+        call(max_tokens, contract_text)
+        seconds = time.perf_counter() - started
+
+        tiers = {tier: stats for (name, tier), stats in get_routing_stats().items() if name == feature}
+        path = "+".join(tier for tier in ("small", "large") if tier in tiers)
+        tokens = sum(stats["completion_tokens"] for stats in tiers.values())
+        cost = sum(stats["cost"] for stats in tiers.values())
+        print(f"{label:<10} {feature:<20} {path:<12} {seconds:>7.2f} {tokens:>7} {cost * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare routed model tiers and budgets with one model at a fixed budget.")
+    parser.add_argument("--words", type=int, default=1000)
+    parser.add_argument("--max-tokens", type=int, default=1000, help="The budget asked for, the slider maximum by default")
+    parser.add_argument("--first-token-seconds", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--small-speedup", type=float, default=3.0, help="How much faster the small model generates")
+    args = parser.parse_args()
+
+    small_model = DEFAULT_ROUTING["tiers"]["small"]["model_id"]
+    model_latency = {small_model: {
+        "first_token_seconds": args.first_token_seconds / 2,
+        "tokens_per_second": args.tokens_per_second * args.small_speedup,
+    }}
+    contract_text = make_contract_text(args.words, seed=args.words)
+
+    print(f"{'routing':<10} {'feature':<20} {'tiers':<12} {'seconds':>7} {'tokens':>7} {'cost m$':>9}")
+    with fake_watsonx(model_latency, first_token_seconds=args.first_token_seconds, tokens_per_second=args.tokens_per_second):
+        run("fixed", fixed_config(), args.max_tokens, contract_text)
+        run("routed", DEFAULT_ROUTING, args.max_tokens, contract_text)
+        run("escalated", rejecting_config(), args.max_tokens, contract_text)
+    set_routing_config(DEFAULT_ROUTING)
@@ -0,0 +1,95 @@
+import argparse
+import random
+import re
+import time
+from io import BytesIO
+
+import markdown
+from bs4 import BeautifulSoup
+
+from benchmarks.corpus import make_contract_pdf, make_contract_text
+from helper_functions.normalization import normalize_pages, normalize_text
+from helper_functions.pdf_text_extractor import iter_page_texts
+
+
+def legacy_normalize_text(text):
+    # The normalizer as it was before the single-pass path, kept as the reference
+    html_content = markdown.markdown(text)
+    plain_text = BeautifulSoup(html_content, "html.parser").get_text()
+    plain_text = re.sub(r'\s+', ' ', plain_text).strip().lower()
+    return re.sub(r'_+', '[underscore]', plain_text)
+
+
+# Markdown constructs and near misses that the single-pass path must either reproduce or hand back to markdown
+EDGE_CASES = [
+    "", "   \n\t ", "1. Definitions\n2. Term", "Intro\n1. Definitions", "Intro\n\n1. Definitions", "- a\n- b",
+    "Title\n=====\nBody", "Title\n---\nBody", "Signature: ____________", "Name:________", "____\n", "a __b__ c",
+    "snake_case_name", "*bold* and **strong**", "`code`", "a \\* b", "<b>tag</b> a < b", "AT&T &amp; &#39; &#x41",
+    "[link](http://x) [ref]\n\n[ref]: http://y", "> quoted", "# Heading", "    indented\n- after code",
+    "x _  \ny", " \n- a", "Party\r\n\r\n1. Term", "ΣΑΣ İstanbul STRASSE", "(a) first\n(b) second", "x\x0cy",
+]
+
+ATOMS = [
+    "word", "Party", "1.", "2. ", "- ", "* ", "#", ">", "_", "__", " _ ", "=", "---", "[x]", "](", "&", "&amp;",
+    "<b>", "`", "\\", "\n", "\n\n", "\r\n", " ", "\t", "    ", "\xa0", "Name:", "Signature: ______", "(a)", ".",
+]
+
+
+def regression_corpus(seed=0, random_documents=2000):
+    """
+    Builds the documents on which the single-pass normalizer must match the legacy one byte for byte.
+
+    Returns:
+        list: Each document as a list of page texts.
+    """
+    generator = random.Random(seed)
+    corpus = [[text] for text in EDGE_CASES]
+    corpus += [[make_contract_text(words, seed=document_seed)] for words in (50, 500, 5000) for document_seed in range(3)]
+    corpus += [list(iter_page_texts(BytesIO(make_contract_pdf(pages, seed=pages)))) for pages in (1, 5, 20)]
+
+    for _ in range(random_documents):
+        text = "".join(generator.choice(ATOMS) + generator.choice(["", " ", "\n"]) for _ in range(generator.randint(0, 40)))
+        cuts = sorted(generator.sample(range(len(text) + 1), min(len(text) + 1, 3)))
+        corpus.append([text[start:stop] for start, stop in zip([0] + cuts, cuts + [len(text)])])
+
+    return corpus
+
+
+def _best_of(function, argument, repeats):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the legacy and single-pass text normalizers.")
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--random-documents", type=int, default=2000)
+    args = parser.parse_args()
+
+    corpus = regression_corpus(random_documents=args.random_documents)
+    for pages in corpus:
+        expected = legacy_normalize_text("".join(pages))
+        assert normalize_text("".join(pages)) == expected, pages
+        assert "".join(normalize_pages(pages)) == expected, pages
+    print(f"Regression corpus: {len(corpus)} documents identical to the legacy normalizer")
+
+    print(f"{'words':>7} {'legacy s':>10} {'current s':>10} {'speedup':>8} {'streaming s':>12}")
+    for word_count in args.words:
+        text = make_contract_text(word_count)
+        lines = text.splitlines(keepends=True)
+        pages = ["".join(lines[start:start + 45]) for start in range(0, len(lines), 45)]
+
+        legacy_seconds = _best_of(legacy_normalize_text, text, args.repeats)
+        current_seconds = _best_of(normalize_text, text, args.repeats)
+        streaming_seconds = _best_of(lambda page_texts: "".join(normalize_pages(page_texts)), pages, args.repeats)
+
+        print(
+            f"{word_count:>7} {legacy_seconds:>10.4f} {current_seconds:>10.4f} "
+            f"{legacy_seconds / current_seconds:>7.1f}x {streaming_seconds:>12.4f}"
+        )
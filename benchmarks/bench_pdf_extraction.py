@@ -0,0 +1,66 @@
+import argparse
+import time
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+
+from benchmarks.corpus import make_contract_pdf
+from helper_functions.pdf_text_extractor import clear_extraction_cache, extract_text_from_pdf, iter_page_texts
+
+
+def legacy_extract_text_from_pdf(file):
+    # The extractor as it was before the page-parallel engine, kept as the baseline
+    pdf_reader = PdfReader(BytesIO(file.read()))
+    text = ""
+    for page_num in range(len(pdf_reader.pages)):
+        page = pdf_reader.pages[page_num]
+        text += page.extract_text() or ""
+    return text
+
+
+def _best_of(function, pdf_bytes, repeats):
+    best = None
+    result = None
+    for _ in range(repeats):
+        # Measure parsing, not the extraction cache
+        clear_extraction_cache()
+        started = time.perf_counter()
+        result = function(BytesIO(pdf_bytes))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _time_to_first_page(pdf_bytes):
+    clear_extraction_cache()
+    started = time.perf_counter()
+    next(iter_page_texts(BytesIO(pdf_bytes)))
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the legacy and current PDF text extraction.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'legacy s':>10} {'current s':>10} {'speedup':>8} {'first page s':>13} {'cached s':>10}")
+    for page_count in args.pages:
+        pdf_bytes = make_contract_pdf(page_count)
+
+        legacy_seconds, legacy_text = _best_of(legacy_extract_text_from_pdf, pdf_bytes, args.repeats)
+        current_seconds, current_text = _best_of(extract_text_from_pdf, pdf_bytes, args.repeats)
+        assert legacy_text == current_text, "extracted text differs from the legacy extractor"
+
+        first_page_seconds = _time_to_first_page(pdf_bytes)
+
+        # A repeated extraction of the same bytes is served from the extraction cache
+        extract_text_from_pdf(BytesIO(pdf_bytes))
+        started = time.perf_counter()
+        extract_text_from_pdf(BytesIO(pdf_bytes))
+        cached_seconds = time.perf_counter() - started
+
+        print(
+            f"{page_count:>6} {legacy_seconds:>10.3f} {current_seconds:>10.3f} "
+            f"{legacy_seconds / current_seconds:>7.2f}x {first_page_seconds:>13.4f} {cached_seconds:>10.5f}"
+        )
@@ -0,0 +1,93 @@
+import argparse
+import time
+import tracemalloc
+from io import BytesIO
+
+import markdown2
+from bs4 import BeautifulSoup
+from PyPDF2 import PdfReader
+from reportlab import rl_config
+from reportlab.lib.enums import TA_LEFT
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+from benchmarks.corpus import make_contract_text
+from helper_functions.pdf_conversion import clear_pdf_cache, render_pdf, save_to_pdf
+
+
+def legacy_save_to_pdf(markdown_text):
+    # The renderer as it was before caching and block-wise conversion, kept as the reference
+    html_text = markdown2.markdown(markdown_text)
+    soup = BeautifulSoup(html_text, "html.parser")
+    pdf_output = BytesIO()
+    doc = SimpleDocTemplate(pdf_output, pagesize=letter)
+    styles = getSampleStyleSheet()
+    custom_style = ParagraphStyle(
+        name="Custom", alignment=TA_LEFT, fontSize=12, leading=14, spaceAfter=10, preserveWhiteSpace=True
+    )
+    story = []
+    for element in soup:
+        style = custom_style
+        if element.name in ["h1", "h2", "h3", "h4", "h5", "h6"]:
+            style = styles["Heading1"] if element.name == "h1" else styles["Heading2"]
+        if element.name == 'br':
+            story.append(Spacer(1, 12))
+        else:
+            for para in str(element).split('\n'):
+                story.append(Paragraph(para, style) if para.strip() else Spacer(1, 12))
+    doc.build(story)
+    pdf_output.seek(0)
+    return pdf_output
+
+
+def make_draft(word_count):
+    # Drafts from the model are markdown with a title, headings and blank-line separated paragraphs
+    lines = make_contract_text(word_count).splitlines()
+    return "# " + lines[0] + "\n\n" + "\n\n".join(
+        "## " + line if line[:1].isdigit() else line for line in lines[1:]
+    )
+
+
+def _measure(function, argument, memory):
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = function(argument)
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the legacy PDF renderer with the cached block-wise one.")
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 50000, 100000])
+    parser.add_argument("--memory", action="store_true", help="Also report peak Python memory, which slows rendering down")
+    args = parser.parse_args()
+
+    # Deterministic PDFs, so small documents can be compared byte for byte
+    rl_config.invariant = 1
+
+    print(f"{'words':>7} {'pages':>6} {'legacy s':>9} {'render s':>9} {'cached ms':>10} {'legacy MB':>10} {'render MB':>10} {'same bytes':>11}")
+    for word_count in args.words:
+        draft = make_draft(word_count)
+        clear_pdf_cache()
+
+        legacy_pdf, legacy_seconds, legacy_peak = _measure(legacy_save_to_pdf, draft, args.memory)
+        pdf_bytes, render_seconds, render_peak = _measure(render_pdf, draft, args.memory)
+        save_to_pdf(draft)
+        _, cached_seconds, _ = _measure(save_to_pdf, draft, False)
+
+        legacy_bytes = legacy_pdf.getvalue()
+        legacy_text = [page.extract_text() for page in PdfReader(BytesIO(legacy_bytes)).pages]
+        rendered_text = [page.extract_text() for page in PdfReader(BytesIO(pdf_bytes)).pages]
+        # Only blank spacing may differ where a large document is split into markdown blocks
+        assert " ".join("".join(legacy_text).split()) == " ".join("".join(rendered_text).split())
+
+        print(
+            f"{word_count:>7} {len(rendered_text):>6} {legacy_seconds:>9.2f} {render_seconds:>9.2f} {cached_seconds * 1000:>10.3f} "
+            f"{legacy_peak / 2 ** 20:>10.1f} {render_peak / 2 ** 20:>10.1f} {str(legacy_bytes == pdf_bytes):>11}"
+        )
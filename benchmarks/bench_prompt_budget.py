@@ -0,0 +1,73 @@
+import argparse
+import random
+import time
+
+from benchmarks.corpus import make_contract_text
+from features.contract_clause_suggestion import _suggestion_template
+from features.contract_compliance_monitoring import _compliance_template
+from features.contract_review import _review_template
+from features.legal_document_categorization import _categorization_template
+from helper_functions.prompt_budget import CONTEXT_WINDOW_TOKENS, estimate_tokens, fit_prompt, get_budget_stats, reset_budget_stats
+
+
+NOTICE = (
+    "Any notice under this Agreement shall be given in writing and delivered by hand, by courier or by registered "
+    "mail to the address of the receiving party set out above, and shall be deemed received on delivery."
+)
+
+TEMPLATES = {
+    "review_contract": _review_template,
+    "suggest_clauses": _suggestion_template,
+    "monitor_compliance": lambda text: _compliance_template(text, "Payment within 30 days; GDPR applies."),
+    "categorize_document": _categorization_template,
+}
+
+
+def add_extraction_noise(text, lines_per_page=45, seed=0):
+    """
+    Makes a clean contract look like PDF extraction output: a running header, page number footers, words hyphenated
+    at line ends, doubled spaces and a notice repeated in every schedule.
+    """
+    generator = random.Random(seed)
+    lines = text.splitlines()
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)]
+
+    noisy = []
+    for number, page in enumerate(pages, 1):
+        noisy.append("ACME CORP  |  SERVICE AGREEMENT  |  CONFIDENTIAL")
+        for line in page:
+            words = line.split(" ")
+            if len(words) > 6 and generator.random() < 0.2:
+                # Break a long word across the line end like a justified PDF layout
+                index = generator.randrange(len(words))
+                word = words[index]
+                if len(word) > 6 and word.isalpha():
+                    words[index] = word[:3] + "-\n" + word[3:]
+            noisy.append("  ".join(words) if generator.random() < 0.3 else " ".join(words))
+        noisy.append(f"Page {number} of {len(pages)}")
+        if number % 5 == 0:
+            noisy.extend(["", f"SCHEDULE {number // 5}", "", NOTICE, ""])
+    return "\n".join(noisy)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the tokens saved by the prompt pre-flight step.")
+    parser.add_argument("--words", type=int, nargs="+", default=[500, 2000, 5000, 20000])
+    parser.add_argument("--max-new-tokens", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'words':>6} {'feature':>20} {'raw tokens':>11} {'sent':>6} {'cleaned':>8} {'trimmed':>8} {'fits':>5} {'ms':>7}")
+    for word_count in args.words:
+        document = add_extraction_noise(make_contract_text(word_count, seed=word_count))
+        for feature, render in TEMPLATES.items():
+            reset_budget_stats()
+            started = time.perf_counter()
+            prompt = fit_prompt(feature, render, document, args.max_new_tokens)
+            elapsed = time.perf_counter() - started
+
+            call = get_budget_stats()["recent"][-1]
+            fits = estimate_tokens(prompt) + args.max_new_tokens <= CONTEXT_WINDOW_TOKENS
+            print(
+                f"{word_count:>6} {feature:>20} {call['original_tokens']:>11} {call['prompt_tokens']:>6} "
+                f"{call['compressed_tokens']:>8} {call['trimmed_tokens']:>8} {str(fits):>5} {elapsed * 1000:>7.2f}"
+            )
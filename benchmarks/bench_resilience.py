@@ -0,0 +1,82 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import helper_functions.resilience as resilience
+from benchmarks.fake_llm import FakeWatsonxLLM
+from helper_functions.resilience import call_with_resilience, get_resilience_stats, reset_resilience
+
+
+MODEL_ID = "ibm/granite-13b-chat-v2"
+PROMPT = "Review the following contract. " * 20
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_calls(model, calls, concurrency, hedge=False):
+    """
+    Makes `calls` calls from `concurrency` threads.
+
+    Returns:
+        tuple: The latencies of the successful calls, the number of failed calls and the wall time.
+    """
+    def call(_):
+        started = time.perf_counter()
+        try:
+            call_with_resilience(MODEL_ID, lambda: model.invoke(PROMPT), hedge=hedge)
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(calls)))
+    latencies = [result for result in results if result is not None]
+    return latencies, len(results) - len(latencies), time.perf_counter() - started
+
+
+def scenario(label, model, calls, concurrency, retry_attempts, hedge=False, breaker_threshold=None):
+    reset_resilience()
+    resilience.RETRY_ATTEMPTS = retry_attempts
+    resilience.CIRCUIT_FAILURE_THRESHOLD = breaker_threshold or 10 ** 9
+    latencies, failed, elapsed = run_calls(model, calls, concurrency, hedge)
+    stats = get_resilience_stats().get(MODEL_ID, {})
+    p50 = f"{_percentile(latencies, 0.5):.2f}" if latencies else "-"
+    p99 = f"{_percentile(latencies, 0.99):.2f}" if latencies else "-"
+    print(
+        f"{label:<34} {failed / calls:>7.1%} {p50:>6} {p99:>6} {elapsed:>7.2f} {model.calls:>7} "
+        f"{stats.get('retries', 0):>7} {stats.get('hedges', 0):>6}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure retries, hedging and the circuit breaker against injected faults.")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    # Shorter backoff than in production, so the benchmark finishes quickly
+    resilience.RETRY_BASE_SECONDS = 0.05
+    resilience.HEDGE_MIN_DELAY_SECONDS = 0.1
+
+    def model(**faults):
+        return FakeWatsonxLLM(MODEL_ID, {"max_new_tokens": 20}, first_token_seconds=0.1, tokens_per_second=200.0, **faults)
+
+    print(f"{'scenario':<34} {'errors':>7} {'p50 s':>6} {'p99 s':>6} {'wall s':>7} {'calls':>7} {'retries':>7} {'hedges':>6}")
+
+    scenario(f"{args.failure_rate:.0%} failures, no retries", model(failure_rate=args.failure_rate), args.calls, args.concurrency, 1)
+    scenario(f"{args.failure_rate:.0%} failures, 3 attempts", model(failure_rate=args.failure_rate), args.calls, args.concurrency, 3)
+
+    slow = dict(slow_rate=args.slow_rate, slow_seconds=args.slow_seconds)
+    scenario(f"{args.slow_rate:.0%} slow calls, no hedging", model(**slow), args.calls, args.concurrency, 1)
+    scenario(f"{args.slow_rate:.0%} slow calls, hedged at p95", model(**slow), args.calls, args.concurrency, 1, hedge=True)
+
+    outage_calls = args.calls // 4
+    scenario("outage, 3 attempts, no breaker", model(failure_rate=1.0, failure_seconds=0.5), outage_calls, args.concurrency, 3)
+    scenario("outage, 3 attempts, breaker", model(failure_rate=1.0, failure_seconds=0.5), outage_calls, args.concurrency, 3, breaker_threshold=5)
@@ -0,0 +1,114 @@
+import argparse
+import threading
+import time
+
+from eth_account import Account
+from web3 import EthereumTesterProvider, Web3
+
+from benchmarks.corpus import make_contract_text
+from helper_functions.blockchain import HASH_ANCHOR_MODE, MODE_CONTRACTS
+from helper_functions.blockchain import deploy_contract, deployment_arguments, submit_document
+from helper_functions.solidity_artifacts import load_contract_interface
+from helper_functions.transaction_service import CONFIRMED, TransactionService
+
+
+# Well-known test key, funded below so the signed path is exercised as well
+TEST_PRIVATE_KEY = "0x" + "00" * 31 + "01"
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_service(service, contract_interface, texts, submitters):
+    """
+    Submits every text from `submitters` threads at once and waits until all jobs are final.
+
+    Returns:
+        tuple: The job statuses, the submit latencies in seconds and the seconds until the last job was final.
+    """
+    job_ids, latencies = [], []
+    lock = threading.Lock()
+
+    def submit(chunk):
+        for text in chunk:
+            started = time.perf_counter()
+            job_id = submit_document(service, contract_interface, HASH_ANCHOR_MODE, text)
+            elapsed = time.perf_counter() - started
+            with lock:
+                job_ids.append(job_id)
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=submit, args=(texts[index::submitters],)) for index in range(submitters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    jobs = [service.wait(job_id, timeout=120) for job_id in job_ids]
+    return jobs, latencies, time.perf_counter() - started
+
+
+def check_jobs(jobs):
+    failed = [job for job in jobs if job["status"] != CONFIRMED]
+    assert not failed, failed[0]
+    nonces = [job["nonce"] for job in jobs]
+    assert len(set(nonces)) == len(nonces), "nonce reused"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare blocking deployments with the background transaction service.")
+    parser.add_argument("--documents", type=int, default=64)
+    parser.add_argument("--submitters", type=int, default=8, help="Threads submitting concurrently")
+    parser.add_argument("--words", type=int, default=1000, help="Approximate words per synthetic contract")
+    args = parser.parse_args()
+
+    # In-process chain from eth-tester; its first account is unlocked
+    w3 = Web3(EthereumTesterProvider())
+    unlocked_address = w3.eth.accounts[0]
+    contract_interface = load_contract_interface(MODE_CONTRACTS[HASH_ANCHOR_MODE])
+    texts = [make_contract_text(args.words, seed=seed) for seed in range(args.documents)]
+
+    signing_address = Account.from_key(TEST_PRIVATE_KEY).address
+    if signing_address != unlocked_address:
+        tx_hash = w3.eth.send_transaction({"from": unlocked_address, "to": signing_address, "value": w3.to_wei(100, "ether")})
+        w3.eth.wait_for_transaction_receipt(tx_hash)
+
+    print(f"{'path':>22} {'docs':>5} {'submit p50 ms':>14} {'submit p95 ms':>14} {'docs/s':>8}")
+
+    started = time.perf_counter()
+    latencies = []
+    for text in texts:
+        constructor_args, _ = deployment_arguments(HASH_ANCHOR_MODE, text)
+        call_started = time.perf_counter()
+        deploy_contract(w3, contract_interface, constructor_args, unlocked_address)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{'blocking deploy':>22} {len(texts):>5} {_percentile(latencies, 0.5) * 1000:>14.2f} "
+        f"{_percentile(latencies, 0.95) * 1000:>14.2f} {len(texts) / elapsed:>8.1f}"
+    )
+
+    for label, account_address, private_key in (
+        ("service, unlocked", unlocked_address, None),
+        ("service, signed", signing_address, TEST_PRIVATE_KEY),
+    ):
+        service = TransactionService(w3, account_address, private_key, poll_seconds=0.05)
+        jobs, latencies, elapsed = run_service(service, contract_interface, texts, args.submitters)
+        check_jobs(jobs)
+        print(
+            f"{label:>22} {len(texts):>5} {_percentile(latencies, 0.5) * 1000:>14.2f} "
+            f"{_percentile(latencies, 0.95) * 1000:>14.2f} {len(texts) / elapsed:>8.1f}"
+        )
+
+        # Another sender using the same account leaves the cached nonce behind; the service must re-read it
+        if private_key is None:
+            constructor_args, _ = deployment_arguments(HASH_ANCHOR_MODE, texts[0])
+            deploy_contract(w3, contract_interface, constructor_args, account_address)
+            jobs, _, _ = run_service(service, contract_interface, texts[:4], 1)
+            check_jobs(jobs)
+            print(f"{'':>22} recovered from an external transaction, nonce resyncs: {service.stats()['nonce_resyncs']}")
+
+        service.shutdown()
@@ -0,0 +1,81 @@
+import argparse
+import difflib
+import random
+import time
+
+from benchmarks.corpus import make_contract_text
+from helper_functions.normalization import normalize_text
+from helper_functions.word_diff import diff_words, format_diff_html, word_diff
+
+
+def legacy_diff(original_text, new_text):
+    # The Verify page before the word-level diff; normalized texts are single lines, so ndiff compares characters
+    return list(difflib.ndiff(original_text.splitlines(), new_text.splitlines()))
+
+
+def edit_words(words, edits, seed=0):
+    """
+    Returns a copy of `words` with `edits` random substitutions, insertions and deletions.
+    """
+    generator = random.Random(seed)
+    edited = list(words)
+    for _ in range(edits):
+        position = generator.randrange(len(edited))
+        operation = generator.choice(["substitute", "insert", "delete"])
+        if operation == "substitute":
+            edited[position] = f"amended-{generator.randrange(10 ** 6)}"
+        elif operation == "insert":
+            edited.insert(position, f"inserted-{generator.randrange(10 ** 6)}")
+        else:
+            del edited[position]
+    return edited
+
+
+def apply_opcodes(original_words, new_words, opcodes):
+    # Rebuilds the new text from the original and the opcodes, to check that the diff is complete
+    rebuilt = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        rebuilt.extend(original_words[i1:i2] if tag == "equal" else new_words[j1:j2])
+    return rebuilt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ndiff with the word-level diff on normalized contracts.")
+    parser.add_argument("--words", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--edits", type=int, nargs="+", default=[1, 20, 500])
+    parser.add_argument("--legacy-max-words", type=int, default=10000, help="Largest document timed with ndiff, which is quadratic")
+    args = parser.parse_args()
+
+    print(f"{'words':>8} {'edits':>6} {'ndiff s':>9} {'diff s':>8} {'render s':>9} {'hunks':>6} {'removed':>8} {'added':>6} {'html KB':>8}")
+    for word_count in args.words:
+        original_text = normalize_text(make_contract_text(word_count))
+        original_words = original_text.split()
+
+        # A few edits, as after tampering or a re-extraction, and a different contract as the worst case
+        cases = [(str(edits), edit_words(original_words, edits, seed=edits)) for edits in args.edits]
+        cases.append(("other", normalize_text(make_contract_text(word_count, seed=1)).split()))
+
+        for edits, new_words in cases:
+            new_text = " ".join(new_words)
+
+            legacy_seconds = "skipped"
+            if word_count <= args.legacy_max_words:
+                started = time.perf_counter()
+                legacy_diff(original_text, new_text)
+                legacy_seconds = f"{time.perf_counter() - started:.3f}"
+
+            started = time.perf_counter()
+            opcodes = diff_words(original_words, new_words)
+            diff_seconds = time.perf_counter() - started
+            assert apply_opcodes(original_words, new_words, opcodes) == new_words
+
+            started = time.perf_counter()
+            document_diff = word_diff(original_text, new_text)
+            rendered = format_diff_html(document_diff)
+            render_seconds = time.perf_counter() - started
+
+            print(
+                f"{word_count:>8} {edits:>6} {legacy_seconds:>9} {diff_seconds:>8.3f} {render_seconds:>9.3f} "
+                f"{document_diff['total_hunks']:>6} {document_diff['removed_words']:>8} {document_diff['added_words']:>6} "
+                f"{len(rendered) / 1024:>8.1f}"
+            )
@@ -0,0 +1,71 @@
+import random
+from io import BytesIO
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+
+CLAUSE_HEADINGS = [
+    "Definitions", "Term", "Payment Terms", "Confidentiality", "Termination", "Governing Law",
+    "Dispute Resolution", "Liability", "Indemnification", "Notices", "Assignment", "Entire Agreement",
+]
+
+VOCABULARY = (
+    "the party shall agreement obligations notice days written consent pursuant hereto provided that "
+    "confidential information services fees invoice payment term termination breach remedy law court "
+    "jurisdiction liability damages indemnify losses claims third assignment successors notices address"
+).split()
+
+
+def make_contract_text(word_count, seed=0):
+    """
+    Generates a synthetic contract with numbered clauses and roughly `word_count` words.
+
+    Parameters:
+        word_count (int): The approximate number of words to generate.
+        seed (int): The random seed, so every run produces the same corpus.
+
+    Returns:
+        str: The contract text, one sentence per line.
+    """
+    generator = random.Random(seed)
+    lines = ["SERVICE AGREEMENT", "This Service Agreement is entered into by Acme Corp and Beta LLC."]
+    words = 12
+    clause = 1
+
+    while words < word_count:
+        lines.append(f"{clause}. {CLAUSE_HEADINGS[(clause - 1) % len(CLAUSE_HEADINGS)]}")
+        for _ in range(generator.randint(3, 8)):
+            sentence = " ".join(generator.choice(VOCABULARY) for _ in range(generator.randint(8, 20)))
+            lines.append(sentence.capitalize() + ".")
+            words += sentence.count(" ") + 1
+        clause += 1
+
+    return "\n".join(lines)
+
+
+def make_contract_pdf(page_count, lines_per_page=45, seed=0):
+    """
+    Renders a synthetic contract PDF with the given number of text pages.
+
+    Parameters:
+        page_count (int): The number of pages.
+        lines_per_page (int): The number of text lines on each page.
+        seed (int): The random seed for the contract text.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    lines = make_contract_text(page_count * lines_per_page * 12, seed=seed).splitlines()
+    output = BytesIO()
+    pdf = canvas.Canvas(output, pagesize=letter)
+
+    for page in range(page_count):
+        y = 750
+        for line in lines[page * lines_per_page:(page + 1) * lines_per_page]:
+            pdf.drawString(40, y, line[:110])
+            y -= 15
+        pdf.showPage()
+
+    pdf.save()
+    return output.getvalue()
@@ -0,0 +1,118 @@
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Prompts that ask for a fixed first line, such as 'Start your answer with a line of the form "Document Type: <...>"'
+_FIRST_LINE_RE = re.compile(r'Start your answer with a line of the form "([^"<]+)<')
+
+
+class FakeWatsonxError(Exception):
+    """
+    An injected failure, carrying an HTTP status like the errors of the Watsonx SDK.
+    """
+
+    def __init__(self, status_code):
+        super().__init__(f"Injected failure with status {status_code}")
+        self.status_code = status_code
+
+
+class FakeWatsonxLLM:
+    """
+    Stands in for WatsonxLLM in benchmarks: same `model_id`, `params`, `invoke` and `stream`, with a latency made of
+    a fixed time to first token plus a generation rate, and no network access. The answer repeats the words of the
+    prompt, after the first line the prompt asks for, if any, so format checks pass as with a real model.
+
+    Faults can be injected: a share of calls fails with `failure_status` after `failure_seconds`, and a share of calls
+    is slowed down by `slow_seconds`, to reproduce errors and tail latency.
+    """
+
+    def __init__(self, model_id, params, first_token_seconds=0.5, tokens_per_second=40.0, jitter=0.1, seed=0,
+                 failure_rate=0.0, failure_status=503, failure_seconds=0.05, slow_rate=0.0, slow_seconds=5.0):
+        self.model_id = model_id
+        self.params = dict(params)
+        self.first_token_seconds = first_token_seconds
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.failure_seconds = failure_seconds
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _answer(self, prompt):
+        with self._lock:
+            self.calls += 1
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+            failed = self._random.random() < self.failure_rate
+            slow = self._random.random() < self.slow_rate
+            if failed:
+                self.failures += 1
+        if failed:
+            time.sleep(self.failure_seconds)
+            raise FakeWatsonxError(self.failure_status)
+
+        tokens = int(self.params.get("max_new_tokens", 200))
+        words = prompt.split()
+        answer = " ".join(words[index % len(words)] for index in range(tokens)) if words else ""
+        first_line = _FIRST_LINE_RE.search(prompt)
+        if first_line:
+            answer = f"{first_line.group(1)}{' '.join(words[:3])}\n{answer}"
+        first_token_seconds = self.first_token_seconds * factor + (self.slow_seconds if slow else 0.0)
+        return answer, first_token_seconds, tokens / self.tokens_per_second * factor
+
+    def invoke(self, prompt):
+        answer, first_token_seconds, generation_seconds = self._answer(prompt)
+        time.sleep(first_token_seconds + generation_seconds)
+        return answer
+
+    def stream(self, prompt):
+        answer, first_token_seconds, generation_seconds = self._answer(prompt)
+        time.sleep(first_token_seconds)
+        pieces = answer.split(" ")
+        for piece in pieces:
+            time.sleep(generation_seconds / len(pieces))
+            yield piece + " "
+
+
+@contextmanager
+def fake_watsonx(model_latency=None, **latency):
+    """
+    Routes every feature module's get_watsonx_llm to FakeWatsonxLLM instances for the duration of the block.
+
+    Parameters:
+        model_latency (dict): Per model id, keyword arguments that override `latency` for that model, such as a
+            faster tokens_per_second for a small model.
+        latency: Keyword arguments passed to FakeWatsonxLLM, such as first_token_seconds, tokens_per_second or the
+            fault injection settings.
+
+    Yields:
+        list: The fake models created so far, to inspect their call counts.
+    """
+    models = []
+    lock = threading.Lock()
+
+    def get_fake_llm(model_id, url, project_id, parameters):
+        with lock:
+            settings = dict(latency, **(model_latency or {}).get(model_id, {}))
+            model = FakeWatsonxLLM(model_id, parameters, seed=len(models), **settings)
+            models.append(model)
+        return model
+
+    patched = []
+    for name, module in list(sys.modules.items()):
+        if name.startswith("features.") and hasattr(module, "get_watsonx_llm"):
+            patched.append((module, module.get_watsonx_llm))
+            module.get_watsonx_llm = get_fake_llm
+    try:
+        yield models
+    finally:
+        for module, original in patched:
+            module.get_watsonx_llm = original
@@ -0,0 +1,129 @@
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.corpus import make_contract_text
+
+
+ENDPOINTS = ("/review", "/suggest-clauses", "/categorize")
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def serve(port, first_token_seconds, tokens_per_second):
+    """
+    Runs the API with every feature answering from the fake Watsonx model.
+    """
+    import uvicorn
+
+    import api
+    from benchmarks.fake_llm import fake_watsonx
+
+    with fake_watsonx(first_token_seconds=first_token_seconds, tokens_per_second=tokens_per_second):
+        uvicorn.run(api.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def wait_until_ready(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("The API did not start")
+
+
+def run_load(port, endpoint, concurrency, requests, word_count, max_tokens, first_seed):
+    """
+    Sends `requests` requests from `concurrency` clients, each with its own keep-alive connection. Every request
+    carries a different document, so no answer comes from the response cache.
+
+    Returns:
+        tuple: The per-request latencies in seconds, the number of failed requests and the wall time.
+    """
+    bodies = [
+        json.dumps({"text": make_contract_text(word_count, seed=first_seed + index), "max_tokens": max_tokens})
+        for index in range(requests)
+    ]
+    latencies, errors = [], []
+    lock = threading.Lock()
+    next_index = iter(range(requests))
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                return
+            started = time.perf_counter()
+            connection.request("POST", endpoint, bodies[index], {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status != 200:
+                    errors.append(response.status)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(errors), time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the HTTP API against the fake Watsonx model.")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="/review")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--rounds", type=int, default=4, help="Requests per client at every concurrency level")
+    parser.add_argument("--words", type=int, default=1000)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--first-token-seconds", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.first_token_seconds, args.tokens_per_second)
+        sys.exit(0)
+
+    # The server runs in its own process, so the load generator does not compete with it for the GIL
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.load_api", "--serve", "--port", str(args.port),
+        "--first-token-seconds", str(args.first_token_seconds), "--tokens-per-second", str(args.tokens_per_second),
+    ])
+    try:
+        wait_until_ready(args.port)
+        fake_seconds = args.first_token_seconds + args.max_tokens / args.tokens_per_second
+        print(f"{args.endpoint}, {args.words} words, fake model answers in about {fake_seconds:.1f}s")
+        print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>7} {'p50 s':>7} {'p95 s':>7}")
+
+        first_seed = 0
+        for concurrency in args.concurrency:
+            requests = concurrency * args.rounds
+            latencies, errors, elapsed = run_load(
+                args.port, args.endpoint, concurrency, requests, args.words, args.max_tokens, first_seed
+            )
+            first_seed += requests
+            print(
+                f"{concurrency:>8} {requests:>9} {errors:>7} {requests / elapsed:>7.1f} "
+                f"{_percentile(latencies, 0.5):>7.2f} {_percentile(latencies, 0.95):>7.2f}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
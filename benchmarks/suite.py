@@ -0,0 +1,252 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+from io import BytesIO
+
+from benchmarks.corpus import make_contract_pdf, make_contract_text
+from benchmarks.fake_llm import fake_watsonx
+from features.contract_clause_suggestion import suggest_clauses
+from features.contract_compliance_monitoring import monitor_compliance
+from features.contract_review import review_contract
+from features.document_comparison import compare_documents
+from features.draft_generation import draft_contract
+from features.full_analysis import run_full_analysis
+from features.legal_document_categorization import categorize_document
+from helper_functions.clause_diff import diff_documents
+from helper_functions.llm_cache import clear_response_cache
+from helper_functions.normalization import normalize_text
+from helper_functions.pdf_conversion import clear_pdf_cache, save_to_pdf
+from helper_functions.pdf_text_extractor import clear_extraction_cache, extract_text_from_pdf
+from helper_functions.word_diff import word_diff
+
+
+# Results of every run are appended here, one JSON object per line
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "history.jsonl")
+
+# Document sizes of the corpus, in words, and the matching PDF page counts
+SIZES = {"small": 1000, "medium": 5000, "large": 20000}
+QUICK_SIZES = {"small": 1000}
+PAGES_PER_1000_WORDS = 2
+
+CONDITIONS = "Payment within 30 days of invoice. Personal data is processed under the GDPR."
+
+
+def _best_of(function, repeats, reset=None):
+    """
+    Returns the fastest of `repeats` calls in seconds, calling `reset` before each one so caches start empty.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        if reset is not None:
+            reset()
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _edited(text):
+    # A second version of a contract with a clause removed and a few sentences changed
+    lines = text.splitlines()
+    del lines[len(lines) // 3:len(lines) // 3 + 4]
+    for index in range(5, len(lines), max(1, len(lines) // 8)):
+        lines[index] = lines[index].replace("shall", "may")
+    return "\n".join(lines)
+
+
+def document_cases(size, text, pdf_bytes):
+    """
+    Yields the benchmarks of the document helpers, which need neither Watsonx nor a chain.
+    """
+    yield f"pdf_extract/{size}", lambda: extract_text_from_pdf(BytesIO(pdf_bytes)), clear_extraction_cache
+    yield f"normalize/{size}", lambda: normalize_text(text), None
+    yield f"pdf_render/{size}", lambda: save_to_pdf(text), clear_pdf_cache
+    edited = _edited(text)
+    yield f"word_diff/{size}", lambda: word_diff(text, edited), None
+    yield f"clause_diff/{size}", lambda: diff_documents(text, edited), None
+
+
+def feature_cases(size, text, max_tokens):
+    """
+    Yields the benchmarks of the feature functions, to be run against the fake Watsonx model.
+    """
+    edited = _edited(text)
+    yield f"review_contract/{size}", lambda: review_contract("", "", max_tokens, text), clear_response_cache
+    yield f"suggest_clauses/{size}", lambda: suggest_clauses("", "", max_tokens, text), clear_response_cache
+    yield f"monitor_compliance/{size}", lambda: monitor_compliance("", "", max_tokens, text, CONDITIONS), clear_response_cache
+    yield f"categorize_document/{size}", lambda: categorize_document("", "", max_tokens, text), clear_response_cache
+    yield f"compare_documents/{size}", lambda: compare_documents("", "", max_tokens, text, edited), clear_response_cache
+    yield f"full_analysis/{size}", lambda: list(run_full_analysis("", "", max_tokens, text, CONDITIONS)), clear_response_cache
+
+
+def chain_cases(size, text):
+    """
+    Yields the benchmarks of the upload and verify flows on an in-process eth-tester chain.
+
+    Returns nothing when eth-tester is not installed, since it is not a dependency of the app itself.
+    """
+    try:
+        from web3 import EthereumTesterProvider, Web3
+        w3 = Web3(EthereumTesterProvider())
+    except Exception:
+        return
+
+    from helper_functions.blockchain import FULL_TEXT_MODE, HASH_ANCHOR_MODE, MERKLE_BATCH_MODE, MODE_CONTRACTS
+    from helper_functions.blockchain import upload_batch, upload_document, verify_batch_document, verify_document
+    from helper_functions.solidity_artifacts import load_contract_interface
+
+    account_address = w3.eth.accounts[0]
+    interfaces = {mode: load_contract_interface(name) for mode, name in MODE_CONTRACTS.items()}
+    uploads = {}
+
+    def upload(mode):
+        uploads[mode] = upload_document(w3, interfaces[mode], mode, text, account_address)
+
+    def verify(mode):
+        if mode not in uploads:
+            upload(mode)
+        verification = verify_document(w3, interfaces[mode], mode, uploads[mode]["contract_address"], text)
+        assert verification["matches"]
+
+    for mode in (HASH_ANCHOR_MODE, FULL_TEXT_MODE):
+        # Only small contracts fit into the initcode size limit in full text mode
+        if mode == FULL_TEXT_MODE and len(text) > 40000:
+            continue
+        yield f"upload_{mode}/{size}", lambda mode=mode: upload(mode), None
+        yield f"verify_{mode}/{size}", lambda mode=mode: verify(mode), None
+
+    documents = [(f"contract-{index}.pdf", f"{text}\n{index}") for index in range(16)]
+
+    def batch():
+        uploads[MERKLE_BATCH_MODE] = upload_batch(w3, interfaces[MERKLE_BATCH_MODE], documents, account_address)
+
+    def verify_batch():
+        if MERKLE_BATCH_MODE not in uploads:
+            batch()
+        receipt = uploads[MERKLE_BATCH_MODE]["receipts"][7]
+        assert verify_batch_document(w3, interfaces[MERKLE_BATCH_MODE], receipt, documents[7][1])["matches"]
+
+    yield f"upload_{MERKLE_BATCH_MODE}_16/{size}", batch, None
+    yield f"verify_{MERKLE_BATCH_MODE}/{size}", verify_batch, None
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout
+        return commit + ("-dirty" if dirty.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_history(path):
+    """
+    Reads the stored runs, oldest first.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def compare(run, baseline):
+    """
+    Compares a run with an earlier one.
+
+    Parameters:
+        run (dict): The current run.
+        baseline (dict): The earlier run.
+
+    Returns:
+        list: (case, earlier seconds, current seconds, ratio) for every case both runs measured.
+    """
+    rows = []
+    for case, seconds in run["cases"].items():
+        if case in baseline["cases"]:
+            before = baseline["cases"][case]
+            rows.append((case, before, seconds, seconds / before if before else float("inf")))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the features, document helpers and chain flows offline and store the results."
+    )
+    parser.add_argument("--quick", action="store_true", help="Only the small document size")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-tokens", type=int, default=300)
+    parser.add_argument("--first-token-seconds", type=float, default=0.05, help="Latency of the fake Watsonx model")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0, help="Throughput of the fake Watsonx model")
+    parser.add_argument("--no-chain", action="store_true", help="Skip the upload and verify flows")
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--results", default=RESULTS_FILE, help="The JSON lines file runs are appended to")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown reported as a regression")
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    results = {}
+
+    print(f"{'case':<36} {'seconds':>10}")
+    with fake_watsonx(first_token_seconds=args.first_token_seconds, tokens_per_second=args.tokens_per_second, jitter=0.0):
+        for size, word_count in sizes.items():
+            text = make_contract_text(word_count, seed=word_count)
+            pdf_bytes = make_contract_pdf(max(1, word_count * PAGES_PER_1000_WORDS // 1000), seed=word_count)
+
+            cases = [
+                *document_cases(size, text, pdf_bytes),
+                *feature_cases(size, text, args.max_tokens),
+                *([] if args.no_chain else chain_cases(size, text)),
+            ]
+            for name, function, reset in cases:
+                if args.only and args.only not in name:
+                    continue
+                results[name] = _best_of(function, args.repeats, reset)
+                print(f"{name:<36} {results[name]:>10.4f}")
+
+        # Drafting does not depend on a document, so it is measured once
+        if not args.only or args.only in "draft_contract":
+            results["draft_contract"] = _best_of(
+                lambda: draft_contract(
+                    "", "", contract_type="Service Agreement", party_one="Acme Corp", party_two="Beta LLC",
+                    contract_terms="Monthly fee of 5000 USD", country="United States",
+                ),
+                args.repeats, clear_response_cache,
+            )
+            print(f"{'draft_contract':<36} {results['draft_contract']:>10.4f}")
+
+    run = {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeats": args.repeats,
+        "settings": {
+            "max_tokens": args.max_tokens,
+            "first_token_seconds": args.first_token_seconds,
+            "tokens_per_second": args.tokens_per_second,
+        },
+        "cases": results,
+    }
+
+    # The latest earlier run with the same fake model settings is the baseline
+    history = [earlier for earlier in load_history(args.results) if earlier["settings"] == run["settings"]]
+    if history:
+        baseline = history[-1]
+        print(f"\nCompared with {baseline['commit']} from {baseline['timestamp']}:")
+        print(f"{'case':<36} {'before s':>10} {'now s':>10} {'ratio':>7}")
+        for case, before, seconds, ratio in compare(run, baseline):
+            flag = "  slower" if ratio > args.threshold else ("  faster" if ratio < 1 / args.threshold else "")
+            print(f"{case:<36} {before:>10.4f} {seconds:>10.4f} {ratio:>6.2f}x{flag}")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, "a", encoding="utf-8") as history_file:
+            history_file.write(json.dumps(run, sort_keys=True) + "\n")
+        print(f"\nSaved to {args.results}")
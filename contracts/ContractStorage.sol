@@ -0,0 +1,14 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+contract ContractStorage {
+    string public contractContent;
+
+    constructor(string memory _content) {
+        contractContent = _content;
+    }
+
+    function getContractContent() public view returns (string memory) {
+        return contractContent;
+    }
+}
@@ -0,0 +1,22 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+contract DocumentAnchor {
+    bytes32 public documentHash;
+
+    // Packed into a single storage slot next to the hash
+    address public anchoredBy;
+    uint64 public anchoredAt;
+    uint32 public textLength;
+
+    constructor(bytes32 _documentHash, uint32 _textLength) {
+        documentHash = _documentHash;
+        anchoredBy = msg.sender;
+        anchoredAt = uint64(block.timestamp);
+        textLength = _textLength;
+    }
+
+    function getAnchor() public view returns (bytes32, address, uint64, uint32) {
+        return (documentHash, anchoredBy, anchoredAt, textLength);
+    }
+}
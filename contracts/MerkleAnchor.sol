@@ -0,0 +1,22 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+contract MerkleAnchor {
+    bytes32 public merkleRoot;
+
+    // Packed into a single storage slot next to the root
+    address public anchoredBy;
+    uint64 public anchoredAt;
+    uint32 public documentCount;
+
+    constructor(bytes32 _merkleRoot, uint32 _documentCount) {
+        merkleRoot = _merkleRoot;
+        anchoredBy = msg.sender;
+        anchoredAt = uint64(block.timestamp);
+        documentCount = _documentCount;
+    }
+
+    function getAnchor() public view returns (bytes32, address, uint64, uint32) {
+        return (merkleRoot, anchoredBy, anchoredAt, documentCount);
+    }
+}
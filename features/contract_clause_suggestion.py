@@ -1,41 +1,12 @@
-from langchain_ibm import WatsonxLLM 
-
-def suggest_clauses(url, project_id, max_tokens, contract_text):
-    """
-    Suggests additional clauses for a given contract based on its context and identified needs using IBM's WatsonxLLM.
-
-
-    Parameters:
-        url (str): The API endpoint URL to access the WatsonxLLM service.
-        project_id (str): The project identifier for the WatsonxLLM instance.
-        max_tokens (int): The maximum number of tokens to generate in the suggested clauses.
-        contract_text (str): The current text of the contract for which additional clauses are needed.
-
-    Returns:
-        str: A list of suggested clauses, each accompanied by a brief explanation of its relevance and importance to the contract.
-    """
-
-    # Definig the parameters for generating suggestions using WatsonLLM
-
-    parameters = {
-        "decoding_method": "sample",
-        "max_new_tokens": max_tokens,
-        "temperature": 0.7,
-        "top_k": 50,
-        "top_p": 0.9,
-    }
-
-    # Initialize the WatsonxLLM instance with the specified parameters
-
-    watsonx_llm = WatsonxLLM(
-            model_id="ibm/granite-13b-chat-v2",
-            url=url,
-            project_id=project_id,
-            params=parameters,
-    )
+from helper_functions.llm_cache import apply_decoding_mode
+from helper_functions.metrics import timed
+from helper_functions.model_routing import plan_route, routed_invoke, routed_stream
+from helper_functions.prompt_budget import fit_prompt
+from helper_functions.watsonx_client import get_watsonx_llm
 
+def _suggestion_template(contract_text):
     # system message for the model to define its persona and what it is expected to do
-    suggestion_template = f"""
+    return f"""
     You are a legal expert tasked with reviewing the following contract to identify any gaps and suggest additional clauses that may be necessary or beneficial:
 
     Contract Text:
@@ -59,6 +30,76 @@ def suggest_clauses(url, project_id, max_tokens, contract_text):
     """
 
 
-    # Use the WatsonxLLM to generate clause suggestions
-    suggested_clauses = watsonx_llm.invoke(suggestion_template)
+def _prepare_clause_suggestion(url, project_id, max_tokens, contract_text):
+    """
+    Builds the route, its WatsonxLLM instances and the rendered prompt for a clause suggestion request.
+    """
+
+    # Pick the model tiers and the generation budget for this contract
+    route = plan_route("suggest_clauses", contract_text, max_tokens)
+
+    # Definig the parameters for generating suggestions using WatsonLLM
+
+    parameters = {
+        "decoding_method": "sample",
+        "max_new_tokens": route["max_new_tokens"],
+        "temperature": 0.7,
+        "top_k": 50,
+        "top_p": 0.9,
+    }
+
+    # Switch to greedy decoding in deterministic mode so the response can be cached
+    parameters = apply_decoding_mode(parameters)
+
+    # Reuse the shared WatsonxLLM instance of every tier for these parameters from the client registry
+
+    watsonx_llms = [get_watsonx_llm(model_id, url, project_id, parameters) for model_id in route["models"]]
+
+    # Clean the document and fit it into the context window next to the answer
+    suggestion_template = fit_prompt("suggest_clauses", _suggestion_template, contract_text, route["max_new_tokens"])
+
+    return route, watsonx_llms, suggestion_template
+
+
+@timed("feature", feature="suggest_clauses")
+def suggest_clauses(url, project_id, max_tokens, contract_text):
+    """
+    Suggests additional clauses for a given contract based on its context and identified needs using IBM's WatsonxLLM.
+
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the suggested clauses; the route may allow fewer.
+        contract_text (str): The current text of the contract for which additional clauses are needed.
+
+    Returns:
+        str: A list of suggested clauses, each accompanied by a brief explanation of its relevance and importance to the contract.
+    """
+
+    route, watsonx_llms, suggestion_template = _prepare_clause_suggestion(url, project_id, max_tokens, contract_text)
+
+    # Use the smallest WatsonxLLM whose answer passes validation to generate clause suggestions
+    suggested_clauses = routed_invoke(route, watsonx_llms, suggestion_template)
     return suggested_clauses
+
+
+@timed("feature", feature="stream_suggest_clauses")
+def stream_suggest_clauses(url, project_id, max_tokens, contract_text):
+    """
+    Streams the clause suggestions of suggest_clauses as they are generated, so the first words can be shown before the full answer is ready.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the suggested clauses; the route may allow fewer.
+        contract_text (str): The current text of the contract for which additional clauses are needed.
+
+    Yields:
+        str: Consecutive pieces of the suggested clauses text.
+    """
+
+    route, watsonx_llms, suggestion_template = _prepare_clause_suggestion(url, project_id, max_tokens, contract_text)
+
+    # Stream the generated text piece by piece as Watsonx produces it
+    yield from routed_stream(route, watsonx_llms, suggestion_template)
@@ -1,5 +1,66 @@
-from langchain_ibm import WatsonxLLM 
+from helper_functions.llm_cache import apply_decoding_mode
+from helper_functions.metrics import timed
+from helper_functions.model_routing import plan_route, routed_invoke, routed_stream
+from helper_functions.prompt_budget import fit_prompt
+from helper_functions.watsonx_client import get_watsonx_llm
 
+def _compliance_template(contract_text, conditions):
+    # Template for instructing the model to generate suggestions.
+    return f"""
+    As a legal analyst, your task is to review and assess the compliance of the following contract with the specified conditions:
+
+    Contract Text:
+    {contract_text}
+
+    Conditions to Terms and Conditions:
+    {conditions}
+
+    Instructions:
+    1. Identify and summarize each key term and obligation outlined in the contract related to the specified conditions.
+    2. Evaluate the compliance status of each term:
+    - Fully Compliant
+    - Partially Compliant (Specify areas of concern)
+    - Non-Compliant (Highlight breaches or deviations)
+    3. Provide a comprehensive summary that includes:
+    - An overview of fully compliant areas related to the specified conditions.
+    - Details of any partial compliance, with recommendations for rectification.
+    - A clear identification of any non-compliance, specifying the clauses breached and potential legal implications.
+    4. Conclude with any additional observations or recommendations for ensuring full compliance with the specified conditions.
+
+    Deliver your analysis in a clear, structured format suitable for legal review.
+    """
+
+
+def _prepare_compliance_check(url, project_id, max_tokens, contract_text, conditions):
+    """
+    Builds the route, its WatsonxLLM instances and the rendered prompt for a compliance check.
+    """
+
+    # Pick the model tiers and the generation budget for this contract
+    route = plan_route("monitor_compliance", contract_text, max_tokens)
+
+    # Define parameters for generating suggestions using WatsonLLM
+    parameters = {
+        "decoding_method": "sample",
+        "max_new_tokens": route["max_new_tokens"],
+        "temperature": 0.7,
+        "top_k": 50,
+        "top_p": 0.9,
+    }
+
+    # Switch to greedy decoding in deterministic mode so the response can be cached
+    parameters = apply_decoding_mode(parameters)
+
+    # Reuse the shared WatsonxLLM instance of every tier for these parameters from the client registry
+    watsonx_llms = [get_watsonx_llm(model_id, url, project_id, parameters) for model_id in route["models"]]
+
+    # Clean the document and fit it into the context window next to the answer
+    compliance_template = fit_prompt("monitor_compliance", lambda text: _compliance_template(text, conditions), contract_text, route["max_new_tokens"])
+
+    return route, watsonx_llms, compliance_template
+
+
+@timed("feature", feature="monitor_compliance")
 def monitor_compliance(url, project_id, max_tokens, contract_text, conditions):
 
     """
@@ -10,7 +71,7 @@ def monitor_compliance(url, project_id, max_tokens, contract_text, conditions):
     Parameters:
         url (str): The API endpoint URL to access the WatsonxLLM service.
         project_id (str): The project identifier for the WatsonxLLM instance.
-        max_tokens (int): The maximum number of tokens to generate in the compliance summary.
+        max_tokens (int): The maximum number of tokens to generate in the compliance summary; the route may allow fewer.
         contract_text (str): The full text of the contract to be analyzed for compliance.
         conditions (str): Specific terms and conditions to check for compliance within the contract.
 
@@ -23,49 +84,30 @@ def monitor_compliance(url, project_id, max_tokens, contract_text, conditions):
 
     """
 
-    # Define parameters for generating suggestions using WatsonLLM
-    parameters = {
-        "decoding_method": "sample",
-        "max_new_tokens": max_tokens,
-        "temperature": 0.7,
-        "top_k": 50,
-        "top_p": 0.9,
-    }
-
-    # Initialize the WatsonLLM model with the specified parameters
-    watsonx_llm = WatsonxLLM(
-            model_id="ibm/granite-13b-chat-v2",
-            url=url,
-            project_id=project_id,
-            params=parameters,
-    )
-
-    # Template for instructing the model to generate suggestions.
+    route, watsonx_llms, compliance_template = _prepare_compliance_check(url, project_id, max_tokens, contract_text, conditions)
 
-    compliance_template = f"""
-    As a legal analyst, your task is to review and assess the compliance of the following contract with the specified conditions:
+    # Use the smallest WatsonxLLM whose answer passes validation to monitor contract compliance
+    compliance_summary = routed_invoke(route, watsonx_llms, compliance_template)
+    return compliance_summary
 
-    Contract Text:
-    {contract_text}
 
-    Conditions to Terms and Conditions:
-    {conditions}
+@timed("feature", feature="stream_monitor_compliance")
+def stream_monitor_compliance(url, project_id, max_tokens, contract_text, conditions):
+    """
+    Streams the compliance summary of monitor_compliance as it is generated, so the first words can be shown before the full answer is ready.
 
-    Instructions:
-    1. Identify and summarize each key term and obligation outlined in the contract related to the specified conditions.
-    2. Evaluate the compliance status of each term:
-    - Fully Compliant
-    - Partially Compliant (Specify areas of concern)
-    - Non-Compliant (Highlight breaches or deviations)
-    3. Provide a comprehensive summary that includes:
-    - An overview of fully compliant areas related to the specified conditions.
-    - Details of any partial compliance, with recommendations for rectification.
-    - A clear identification of any non-compliance, specifying the clauses breached and potential legal implications.
-    4. Conclude with any additional observations or recommendations for ensuring full compliance with the specified conditions.
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the compliance summary; the route may allow fewer.
+        contract_text (str): The full text of the contract to be analyzed for compliance.
+        conditions (str): Specific terms and conditions to check for compliance within the contract.
 
-    Deliver your analysis in a clear, structured format suitable for legal review.
+    Yields:
+        str: Consecutive pieces of the compliance summary.
     """
 
-    # Use the WatsonxLLM to monitor contract compliance
-    compliance_summary = watsonx_llm.invoke(compliance_template)
-    return compliance_summary
+    route, watsonx_llms, compliance_template = _prepare_compliance_check(url, project_id, max_tokens, contract_text, conditions)
+
+    # Stream the generated text piece by piece as Watsonx produces it
+    yield from routed_stream(route, watsonx_llms, compliance_template)
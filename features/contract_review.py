@@ -1,43 +1,31 @@
-from langchain_ibm import WatsonxLLM 
+import os
+from concurrent.futures import ThreadPoolExecutor
 
-def review_contract(url, project_id, max_tokens, contract_text):
+from helper_functions.llm_cache import apply_decoding_mode, cached_invoke
+from helper_functions.metrics import timed
+from helper_functions.model_routing import plan_route, routed_invoke, routed_stream
+from helper_functions.prompt_budget import compress_document, fit_prompt
+from helper_functions.text_chunking import chunk_text
+from helper_functions.watsonx_client import get_watsonx_llm
 
-    """
-    Reviews the provided contract text to identify key clauses and potential legal issues using IBM's WatsonxLLM.
 
-    This function utilizes the WatsonxLLM model to analyze the text of a contract, identifying key clauses and any potential legal issues. The function provides a comprehensive summary that highlights the critical components of the contract, identifies any ambiguities or risks, and offers recommendations for improvements.
+# ibm/granite-13b-chat-v2 has an 8192 token context window. At roughly four characters per token this leaves
+# room for the instructions and up to 1000 generated tokens next to the contract text.
+MAX_SINGLE_PASS_CHARS = 16000
 
-    Parameters:
-        url (str): The API endpoint URL to access the WatsonxLLM service.
-        project_id (str): The project identifier for the WatsonxLLM instance.
-        max_tokens (int): The maximum number of tokens to generate in the review summary.
-        contract_text (str): The full text of the contract to be reviewed.
+# Size of the excerpts reviewed in parallel by the chunked mode
+REVIEW_CHUNK_CHARS = 10000
 
-    Returns:
-        str: A detailed summary of the contract
-
-    """
-
-    # Define the parameters for generating suggestions
-    parameters = {
-    "decoding_method": "sample",
-    "max_new_tokens": max_tokens,
-    "temperature": 0.7,
-    "top_k": 50,
-    "top_p": 0.9,
-    }
+# Upper bound on the number of concurrent Watsonx calls made by one chunked review
+REVIEW_MAX_WORKERS = int(os.environ.get("REVIEW_MAX_WORKERS", "8"))
 
-    # Initialize the WatsonLLM model with the specified parameters and project details
-    watsonx_llm = WatsonxLLM(
-            model_id="ibm/granite-13b-chat-v2",
-            url=url,
-            project_id=project_id,
-            params=parameters,
-    )
+# Generation budget for each partial review, kept small so the partial reviews fit into the merge prompt
+PARTIAL_REVIEW_TOKENS = 400
 
 
+def _review_template(contract_text):
     # Template for the model that define persona for the model and specify instructions
-    review_template = f"""
+    return f"""
     You are a legal expert tasked with reviewing the following contract to identify its key clauses and any potential legal issues:
 
     Contract Text:
@@ -65,6 +53,222 @@ def review_contract(url, project_id, max_tokens, contract_text):
     """
 
 
-    # Use the WatsonxLLM to analyze the contract text
-    review_summary = watsonx_llm.invoke(review_template)
+def _prepare_review(url, project_id, max_tokens, contract_text):
+    """
+    Builds the route, its WatsonxLLM instances and the rendered prompt for a review request.
+    """
+
+    # Contracts that do not fit into a single prompt, even without extraction noise, are reviewed chunk by chunk and merged
+    cleaned_text = compress_document(contract_text)
+    if len(cleaned_text) > MAX_SINGLE_PASS_CHARS:
+        return _prepare_chunked_review(url, project_id, max_tokens, cleaned_text, REVIEW_CHUNK_CHARS, REVIEW_MAX_WORKERS)
+
+    # Pick the model tiers and the generation budget for this contract
+    route = plan_route("review_contract", cleaned_text, max_tokens)
+
+    # Define the parameters for generating suggestions
+    parameters = {
+    "decoding_method": "sample",
+    "max_new_tokens": route["max_new_tokens"],
+    "temperature": 0.7,
+    "top_k": 50,
+    "top_p": 0.9,
+    }
+
+    # Switch to greedy decoding in deterministic mode so the response can be cached
+    parameters = apply_decoding_mode(parameters)
+
+    # Reuse the shared WatsonxLLM instance of every tier for these parameters from the client registry
+    watsonx_llms = [get_watsonx_llm(model_id, url, project_id, parameters) for model_id in route["models"]]
+
+    # Fit the contract into the context window next to the answer
+    # The contract was already compressed for the size check above, so only the trimming is left to do
+    review_template = fit_prompt(
+        "review_contract", _review_template, contract_text, route["max_new_tokens"], compressed_text=cleaned_text
+    )
+
+    return route, watsonx_llms, review_template
+
+
+@timed("feature", feature="review_contract")
+def review_contract(url, project_id, max_tokens, contract_text):
+
+    """
+    Reviews the provided contract text to identify key clauses and potential legal issues using IBM's WatsonxLLM.
+
+    This function utilizes the WatsonxLLM model to analyze the text of a contract, identifying key clauses and any potential legal issues. The function provides a comprehensive summary that highlights the critical components of the contract, identifies any ambiguities or risks, and offers recommendations for improvements.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the review summary; the route may allow fewer.
+        contract_text (str): The full text of the contract to be reviewed.
+
+    Returns:
+        str: A detailed summary of the contract
+
+    """
+
+    route, watsonx_llms, review_template = _prepare_review(url, project_id, max_tokens, contract_text)
+
+    # Use the WatsonxLLM of the route to analyze the contract text
+    review_summary = routed_invoke(route, watsonx_llms, review_template)
+    return review_summary
+
+
+@timed("feature", feature="stream_review_contract")
+def stream_review_contract(url, project_id, max_tokens, contract_text):
+    """
+    Streams the review summary of review_contract as it is generated, so the first words can be shown before the full answer is ready.
+
+    For long contracts the excerpt reviews run to completion first and only the final merge is streamed.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the review summary; the route may allow fewer.
+        contract_text (str): The full text of the contract to be reviewed.
+
+    Yields:
+        str: Consecutive pieces of the review summary.
+    """
+
+    route, watsonx_llms, review_template = _prepare_review(url, project_id, max_tokens, contract_text)
+
+    # Stream the generated text piece by piece as Watsonx produces it
+    yield from routed_stream(route, watsonx_llms, review_template)
+
+
+def _review_llm(url, project_id, model_id, max_tokens):
+    """
+    Returns the shared WatsonxLLM instance used by the chunked review for the given model and generation budget.
+    """
+    parameters = apply_decoding_mode({
+        "decoding_method": "sample",
+        "max_new_tokens": max_tokens,
+        "temperature": 0.7,
+        "top_k": 50,
+        "top_p": 0.9,
+    })
+    return get_watsonx_llm(model_id, url, project_id, parameters)
+
+
+def _partial_review_template(chunk, chunk_number, chunk_count):
+    return f"""
+    You are a legal expert reviewing part {chunk_number} of {chunk_count} of a longer contract. Only this excerpt is shown to you:
+
+    Contract Excerpt:
+    {chunk}
+
+    Instructions:
+    1. List the key clauses found in this excerpt (for example parties, payment terms, confidentiality, termination, governing law, dispute resolution, liability and indemnification) with a one sentence summary each.
+    2. List potential legal issues, ambiguities or unbalanced terms in this excerpt.
+    3. List brief recommendations for addressing each issue.
+    Do not speculate about parts of the contract that are not shown. Use the headings "Key Clauses", "Potential Issues" and "Recommendations".
+    """
+
+
+def _merge_review_template(partial_reviews):
+    reviews = "\n\n".join(
+        f"Partial Review {number}:\n{review}" for number, review in enumerate(partial_reviews, 1)
+    )
+    return f"""
+    You are a legal expert. The following partial reviews each cover a consecutive part of the same contract:
+
+    {reviews}
+
+    Instructions:
+    1. Merge the partial reviews into a single review of the whole contract.
+    2. Combine duplicate key clauses and issues, and resolve issues that are answered by another part of the contract.
+    3. Structure the summary in a clear and organized format, with sections dedicated to key clauses, potential issues, and recommendations.
+
+    Deliver a detailed and professional summary that is ready for legal review.
+    """
+
+
+def _reduce_partial_reviews(url, project_id, model_id, max_tokens, partial_reviews, executor):
+    """
+    Merges partial reviews in groups, concurrently and repeatedly, until they fit into one merge prompt.
+    """
+    groups = []
+    current = []
+    current_chars = 0
+    for review in partial_reviews:
+        if current and current_chars + len(review) > MAX_SINGLE_PASS_CHARS:
+            groups.append(current)
+            current = []
+            current_chars = 0
+        current.append(review)
+        current_chars += len(review)
+    groups.append(current)
+
+    if 1 < len(groups) < len(partial_reviews):
+        group_llm = _review_llm(url, project_id, model_id, min(max_tokens, PARTIAL_REVIEW_TOKENS))
+        partial_reviews = list(executor.map(
+            lambda group: cached_invoke(group_llm, _merge_review_template(group)),
+            groups,
+        ))
+        return _reduce_partial_reviews(url, project_id, model_id, max_tokens, partial_reviews, executor)
+
+    return partial_reviews
+
+
+def _prepare_chunked_review(url, project_id, max_tokens, contract_text, max_chunk_chars, max_workers):
+    """
+    Runs the map step of the chunked review and returns the route, its WatsonxLLM instance and the prompt for the
+    final merge.
+    """
+    # Excerpts and merges are only sent to the last tier of the route; a smaller model would have to see the whole
+    # contract to judge whether its part of the review is good enough
+    route = plan_route("review_contract", contract_text, max_tokens)
+    route = dict(route, tiers=route["tiers"][-1:], models=route["models"][-1:])
+    model_id = route["models"][0]
+
+    chunks = chunk_text(contract_text, max_chunk_chars)
+    chunk_llm = _review_llm(url, project_id, model_id, min(max_tokens, PARTIAL_REVIEW_TOKENS))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Map: review every excerpt independently
+        partial_reviews = list(executor.map(
+            lambda numbered_chunk: cached_invoke(chunk_llm, fit_prompt(
+                "review_contract_excerpt",
+                lambda chunk: _partial_review_template(chunk, numbered_chunk[0], len(chunks)),
+                numbered_chunk[1],
+                min(max_tokens, PARTIAL_REVIEW_TOKENS),
+                compress=False,
+            )),
+            enumerate(chunks, 1),
+        ))
+
+        partial_reviews = _reduce_partial_reviews(url, project_id, model_id, max_tokens, partial_reviews, executor)
+
+    return route, [_review_llm(url, project_id, model_id, route["max_new_tokens"])], _merge_review_template(partial_reviews)
+
+
+@timed("feature", feature="review_contract_chunked")
+def review_contract_chunked(url, project_id, max_tokens, contract_text, max_chunk_chars=REVIEW_CHUNK_CHARS, max_workers=REVIEW_MAX_WORKERS):
+
+    """
+    Reviews a contract that is too long for a single prompt using a map-reduce approach.
+
+    The contract is split along clause and heading boundaries into excerpts that are reviewed concurrently by a bounded
+    pool of workers. The partial reviews are then merged into one summary with the same structure as review_contract,
+    so the wall time is governed by the longest excerpt rather than the length of the whole document.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the final review summary; the route may allow fewer.
+        contract_text (str): The full text of the contract to be reviewed.
+        max_chunk_chars (int): The maximum number of characters per excerpt.
+        max_workers (int): The maximum number of concurrent Watsonx calls.
+
+    Returns:
+        str: A detailed summary of the contract with key clauses, potential issues and recommendations.
+    """
+
+    route, watsonx_llms, merge_template = _prepare_chunked_review(url, project_id, max_tokens, contract_text, max_chunk_chars, max_workers)
+
+    # Reduce: merge the partial reviews into the final summary
+    review_summary = routed_invoke(route, watsonx_llms, merge_template)
     return review_summary
@@ -1,64 +1,122 @@
-from langchain_ibm import WatsonxLLM 
+from helper_functions.clause_diff import diff_documents, format_diff_for_prompt, summarize_diff
+from helper_functions.llm_cache import apply_decoding_mode
+from helper_functions.metrics import timed
+from helper_functions.model_routing import plan_route, routed_invoke, routed_stream
+from helper_functions.prompt_budget import fit_prompt
+from helper_functions.watsonx_client import get_watsonx_llm
 
-def compare_documents(url, project_id, max_tokens, original_contract, new_contract):
+def _comparison_template(counts, changed_clauses):
+    # Template for instructing the model for generation
+    return f"""
+    You are a legal expert tasked with analyzing the differences between two versions of a contract.
+
+    The versions were aligned clause by clause: {counts['identical']} clauses are identical, {counts['modified']} were modified, {counts['added']} were added, {counts['removed']} were removed and {counts['moved']} were moved without changes. Only the changed clauses are shown below.
 
+    Changed Clauses:
+    {changed_clauses}
+
+    Instructions:
+    1. Review each changed clause, focusing on changes in key terms, obligations, conditions, and any other critical provisions.
+    2. Categorize each difference as follows:
+    - Minor changes (e.g., wording adjustments with no impact on the meaning)
+    - Significant changes (e.g., alterations to terms, obligations, or legal implications)
+    - Additions or removals of clauses
+    3. For each significant difference, provide a brief analysis of its potential impact on the rights and obligations of the parties involved.
+    4. Ensure that the summary is structured clearly, with sections dedicated to minor changes, significant changes, and an overall assessment of how the updated contract differs from the original.
+    5. Conclude with any recommendations or considerations for further review, particularly if the changes could lead to legal or practical concerns.
+
+    Deliver a well-organized and concise summary suitable for legal review.
     """
-    Compares two versions of a contract and provides a detailed summary of the differences using IBM's WatsonxLLM.
 
-    This function utilizes the WatsonxLLM model to compare an original contract with an updated version, identifying and analyzing any differences between the two. The function generates a comprehensive summary that highlights minor and significant changes, additions, removals, and their potential impact on the contract's terms and obligations.
 
-    Parameters:
-        url (str): The API endpoint URL to access the WatsonxLLM service.
-        project_id (str): The project identifier for the WatsonxLLM instance.
-        max_tokens (int): The maximum number of tokens to generate in the comparison summary.
-        original_contract (str): The original contract text.
-        new_contract (str): The updated contract text.
+def _prepare_comparison(url, project_id, max_tokens, original_contract, new_contract, document_diff=None):
+    """
+    Builds the route, its WatsonxLLM instances and the rendered prompt for a document comparison.
 
-    Returns:
-        str: A comprehensive summary highlighting the differences between the original and updated contracts.
+    Only the clauses that differ between the two versions are sent to the model, together with minimal context.
     """
-        
+
+    # Align the two versions locally so the model only has to assess the impact of the changes
+    if document_diff is None:
+        document_diff = diff_documents(original_contract, new_contract)
+    counts = summarize_diff(document_diff)
+
+    # Pick the model tiers and the generation budget for the changed clauses
+    changed_clauses = format_diff_for_prompt(document_diff)
+    route = plan_route("compare_documents", changed_clauses, max_tokens)
+
     # define the parameters for generating suggestions
     parameters = {
     "decoding_method": "sample",
-    "max_new_tokens": max_tokens,
+    "max_new_tokens": route["max_new_tokens"],
     "temperature": 0.7,
     "top_k": 50,
     "top_p": 0.9,
     }
 
-    # Initialize the WatsonLLM with the specified parameters
-    watsonx_llm = WatsonxLLM(
-            model_id="ibm/granite-13b-chat-v2",
-            url=url,
-            project_id=project_id,
-            params=parameters,
+    # Switch to greedy decoding in deterministic mode so the response can be cached
+    parameters = apply_decoding_mode(parameters)
+
+    # Reuse the shared WatsonxLLM instance of every tier for these parameters from the client registry
+    watsonx_llms = [get_watsonx_llm(model_id, url, project_id, parameters) for model_id in route["models"]]
+
+    # Fit the prompt into the context window next to the answer
+    comparison_template = fit_prompt(
+        "compare_documents",
+        lambda changed_clauses: _comparison_template(counts, changed_clauses),
+        changed_clauses,
+        route["max_new_tokens"],
+        compress=False,
     )
 
-    # Template for instructing the model for generation
-    comparison_template = f"""
-    You are a legal expert tasked with comparing two versions of a contract to identify and analyze any differences between them.
+    return route, watsonx_llms, comparison_template
 
-    Original Contract:
-    {original_contract}
 
-    Updated Contract:
-    {new_contract}
+@timed("feature", feature="compare_documents")
+def compare_documents(url, project_id, max_tokens, original_contract, new_contract, document_diff=None):
 
-    Instructions:
-    1. Conduct a thorough comparison of the two contracts, focusing on changes in key terms, obligations, conditions, and any other critical provisions.
-    2. Highlight each difference found, categorizing them as follows:
-    - Minor changes (e.g., wording adjustments with no impact on the meaning)
-    - Significant changes (e.g., alterations to terms, obligations, or legal implications)
-    - Additions or removals of clauses
-    3. For each significant difference, provide a brief analysis of its potential impact on the rights and obligations of the parties involved.
-    4. Ensure that the summary is structured clearly, with sections dedicated to minor changes, significant changes, and an overall assessment of how the updated contract differs from the original.
-    5. Conclude with any recommendations or considerations for further review, particularly if the changes could lead to legal or practical concerns.
+    """
+    Compares two versions of a contract and provides a detailed summary of the differences using IBM's WatsonxLLM.
 
-    Deliver a well-organized and concise summary suitable for legal review.
+    This function utilizes the WatsonxLLM model to compare an original contract with an updated version, identifying and analyzing any differences between the two. The function generates a comprehensive summary that highlights minor and significant changes, additions, removals, and their potential impact on the contract's terms and obligations. The two versions are first aligned clause by clause locally, so only the changed clauses are sent to the model.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the comparison summary; the route may allow fewer.
+        original_contract (str): The original contract text.
+        new_contract (str): The updated contract text.
+        document_diff (list, optional): A precomputed clause-level diff from diff_documents, computed when omitted.
+
+    Returns:
+        str: A comprehensive summary highlighting the differences between the original and updated contracts.
     """
 
+    route, watsonx_llms, comparison_template = _prepare_comparison(url, project_id, max_tokens, original_contract, new_contract, document_diff)
 
-    # Use the WatsonxLLM to compare documents
-    differences = watsonx_llm.invoke(comparison_template)
+    # Use the smallest WatsonxLLM whose answer passes validation to compare documents
+    differences = routed_invoke(route, watsonx_llms, comparison_template)
     return differences
+
+
+@timed("feature", feature="stream_compare_documents")
+def stream_compare_documents(url, project_id, max_tokens, original_contract, new_contract, document_diff=None):
+    """
+    Streams the comparison summary of compare_documents as it is generated, so the first words can be shown before the full answer is ready.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the comparison summary; the route may allow fewer.
+        original_contract (str): The original contract text.
+        new_contract (str): The updated contract text.
+        document_diff (list, optional): A precomputed clause-level diff from diff_documents, computed when omitted.
+
+    Yields:
+        str: Consecutive pieces of the comparison summary.
+    """
+
+    route, watsonx_llms, comparison_template = _prepare_comparison(url, project_id, max_tokens, original_contract, new_contract, document_diff)
+
+    # Stream the generated text piece by piece as Watsonx produces it
+    yield from routed_stream(route, watsonx_llms, comparison_template)
@@ -1,11 +1,85 @@
-from langchain_ibm import WatsonxLLM
+from helper_functions.clause_library import assemble_draft, build_skeleton
+from helper_functions.llm_cache import apply_decoding_mode
+from helper_functions.metrics import timed
+from helper_functions.model_routing import plan_route, routed_invoke, routed_stream
+from helper_functions.prompt_budget import fit_prompt
+from helper_functions.watsonx_client import get_watsonx_llm
 
-def draft_contract(url, project_id, contract_type, party_one, party_two, contract_terms, country):
+def _sections_to_write(skeleton):
+    return "\n".join(
+        f"### {section['title']}\n{section['fill']}\n" for section in skeleton["sections"] if section["fill"]
+    )
+
+
+def _draft_template(skeleton, contract_terms):
+    values = skeleton["values"]
+    first_title = next(section["title"] for section in skeleton["sections"] if section["fill"])
+    return f"""
+
+    You are a legal expert completing a {values['contract_type']} between {values['party_one']} (the "{values['role_one']}") and {values['party_two']} (the "{values['role_two']}") that is governed by {values['governing_law']}. The standard clauses of the contract are already written. Write only the sections listed below, based on the key terms.
+
+    Key Terms:
+    {contract_terms}
+
+    Sections to Write:
+    {_sections_to_write(skeleton)}
+
+    Instructions:
+    1. Write the sections in the order listed, and start each one with its heading line exactly as given, such as "### {first_title}".
+    2. Base every section on the key terms and conform to the legal requirements and customary practices of {values['country_name']}. Where a section needs a detail the key terms do not give, insert a bracketed placeholder such as [amount] instead of inventing it.
+    3. Refer to the parties as the {values['role_one']} and the {values['role_two']}, and introduce the defined terms named in the section descriptions.
+    4. Use precise and legally sound language suitable for a formal legal document.
+    5. Do not write any other section, title, introduction or signature block.
+    """
+
+
+def _prepare_draft(url, project_id, contract_type, party_one, party_two, contract_terms, country):
+    """
+    Lays out the contract from the clause library and builds the route, its WatsonxLLM instances and the rendered
+    prompt for the sections that depend on the key terms. Without key terms, or without such sections, no model is
+    needed and only the skeleton is returned.
+    """
+
+    # The clause library covers every contract type and country of the drafting form
+    skeleton = build_skeleton(contract_type, party_one, party_two, country)
+    if not contract_terms.strip() or not any(section["fill"] for section in skeleton["sections"]):
+        return skeleton, None, None, None
+
+    # Pick the model tiers and the generation budget for the sections to write
+    route = plan_route("draft_contract", contract_terms + _sections_to_write(skeleton))
+
+    parameters = {
+        "decoding_method": "sample",
+        "max_new_tokens": route["max_new_tokens"],
+        "temperature": 0.7,
+        "top_k": 50,
+        "top_p": 0.9,
+    }
+
+    # Switch to greedy decoding in deterministic mode so the response can be cached
+    parameters = apply_decoding_mode(parameters)
+
+    watsonx_llms = [get_watsonx_llm(model_id, url, project_id, parameters) for model_id in route["models"]]
+
+    # Fit the prompt into the context window next to the answer
+    template = fit_prompt(
+        "draft_contract",
+        lambda terms: _draft_template(skeleton, terms),
+        contract_terms,
+        parameters["max_new_tokens"],
+        compress=False,
+    )
+
+    return skeleton, route, watsonx_llms, template
+
+
+@timed("feature", feature="draft_contract")
+def draft_contract(url, project_id, *, contract_type, party_one, party_two, contract_terms, country):
 
     """
-    Drafts a legal contract based on the specified type, parties involved, contract terms, and country-specific legal requirements using IBM's WatsonxLLM.
+    Drafts a legal contract based on the specified type, parties involved, contract terms, and country-specific legal requirements.
 
-    This function leverages the WatsonxLLM model to create a comprehensive contract tailored to the given details. The contract is drafted in accordance with the legal standards and practices of the specified country, ensuring that all necessary clauses and provisions are included.
+    The contract is assembled from the clause library, which holds the standard clauses of every contract type with the law, courts and statutes of every country. IBM's WatsonxLLM only writes the sections that depend on the key terms, such as the services and fees of a Service Agreement, so a complete contract needs a fraction of the generated tokens. The contract details are keyword-only, so they cannot be passed in the wrong order.
 
     Parameters:
         url (str): The API endpoint URL to access the WatsonxLLM service.
@@ -17,42 +91,42 @@ def draft_contract(url, project_id, contract_type, party_one, party_two, contrac
         country (str): The country in which the contract will be executed, to ensure compliance with local laws and regulations.
 
     Returns:
-        str: A fully drafted contract that includes all relevant clauses, structured in a clear and legally sound format, ready for review and execution by both parties.
+        str: A fully drafted contract in markdown that includes all relevant clauses, structured in a clear and legally sound format, ready for review and execution by both parties.
+
+    Raises:
+        ValueError: When the contract type or the country is not in the clause library.
     """
 
-    parameters = {
-        "decoding_method": "sample",
-        "max_new_tokens": 800,
-        "temperature": 0.7,
-        "top_k": 50,
-        "top_p": 0.9,
-    }
-    
-    watsonx_llm = WatsonxLLM(
-        model_id="ibm/granite-13b-chat-v2",
-        url=url,
-        project_id=project_id,
-        params=parameters,
-    )
+    skeleton, route, watsonx_llms, template = _prepare_draft(url, project_id, contract_type, party_one, party_two, contract_terms, country)
 
+    # Only the sections that depend on the key terms are generated; the library supplies the rest
+    generated = routed_invoke(route, watsonx_llms, template) if route else ""
+    return "".join(assemble_draft(skeleton, [generated]))
 
-    template = f"""
-    
-    You are a legal expert tasked with drafting a {contract_type} contract that adheres to the legal standards and practices of {country}. Below are the details to be included in the contract:
 
-    - Party One: {party_one}
-    - Party Two: {party_two}
-    - Key Terms: {contract_terms}
+@timed("feature", feature="stream_draft_contract")
+def stream_draft_contract(url, project_id, *, contract_type, party_one, party_two, contract_terms, country):
+    """
+    Streams the contract drafted by draft_contract as it is assembled, so the library sections before the first generated section are shown at once.
 
-    Instructions:
-    1. Draft a comprehensive {contract_type} contract based on the provided details, ensuring that it conforms to the legal requirements and customary practices of {country}.
-    2. Ensure that all necessary clauses and provisions specific to {country} are included, such as governing law, dispute resolution, and any mandatory legal disclosures.
-    3. Structure the contract in a clear, logical format, including sections for definitions, obligations, terms, conditions, and signatures.
-    4. Use precise and legally sound language suitable for a formal legal document.
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        contract_type (str): The type of contract to be drafted (e.g., Employment Agreement, Lease Contract).
+        party_one (str): The name of the first party involved in the contract.
+        party_two (str): The name of the second party involved in the contract.
+        contract_terms (str): A description of the key terms and conditions to be included in the contract.
+        country (str): The country in which the contract will be executed, to ensure compliance with local laws and regulations.
+
+    Yields:
+        str: Consecutive pieces of the drafted contract.
 
-    Deliver a complete and professional contract ready for review and execution by both parties.
+    Raises:
+        ValueError: When the contract type or the country is not in the clause library.
     """
 
-    response = watsonx_llm.invoke(template)
+    skeleton, route, watsonx_llms, template = _prepare_draft(url, project_id, contract_type, party_one, party_two, contract_terms, country)
 
-    return response
\ No newline at end of file
+    # Splice the generated sections into the library sections as Watsonx produces them
+    generated_pieces = routed_stream(route, watsonx_llms, template) if route else ()
+    yield from assemble_draft(skeleton, generated_pieces)
@@ -0,0 +1,90 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from features.contract_clause_suggestion import suggest_clauses
+from features.contract_compliance_monitoring import monitor_compliance
+from features.contract_review import review_contract
+from features.legal_document_categorization import categorize_document
+
+
+# Upper bound on the analyses running at the same time; each one is mostly waiting on Watsonx
+FULL_ANALYSIS_MAX_WORKERS = int(os.environ.get("FULL_ANALYSIS_MAX_WORKERS", "4"))
+
+# The analyses of a full analysis in display order, with their titles
+ANALYSES = {
+    "review_contract": "Contract Review",
+    "suggest_clauses": "Suggested Clauses",
+    "monitor_compliance": "Compliance Summary",
+    "categorize_document": "Document Category",
+}
+
+
+def _timed(function, *args):
+    started = time.perf_counter()
+    try:
+        return function(*args), None, time.perf_counter() - started
+    except Exception as e:
+        return None, e, time.perf_counter() - started
+
+
+def run_full_analysis(url, project_id, max_tokens, contract_text, conditions=None):
+    """
+    Runs the review, clause suggestion, compliance check and categorization of one contract concurrently.
+
+    The contract is extracted once by the caller and every analysis is submitted to a thread pool at the same time,
+    so the whole run takes about as long as the slowest analysis instead of the sum of all of them. Results are
+    yielded in the order they finish, so each one can be shown as soon as it is ready. One failing analysis does not
+    stop the others.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in each analysis.
+        contract_text (str): The extracted contract text.
+        conditions (str): The terms and conditions for the compliance check; without them the check is skipped.
+
+    Yields:
+        dict: One result per analysis with the keys "analysis", "title", "result", "error" and "seconds".
+    """
+    calls = {
+        "review_contract": (review_contract, url, project_id, max_tokens, contract_text),
+        "suggest_clauses": (suggest_clauses, url, project_id, max_tokens, contract_text),
+        "categorize_document": (categorize_document, url, project_id, max_tokens, contract_text),
+    }
+    if conditions:
+        calls["monitor_compliance"] = (monitor_compliance, url, project_id, max_tokens, contract_text, conditions)
+
+    with ThreadPoolExecutor(max_workers=FULL_ANALYSIS_MAX_WORKERS) as executor:
+        futures = {executor.submit(_timed, *call): analysis for analysis, call in calls.items()}
+
+        for future in as_completed(futures):
+            analysis = futures[future]
+            result, error, seconds = future.result()
+            yield {
+                "analysis": analysis,
+                "title": ANALYSES[analysis],
+                "result": result,
+                "error": error,
+                "seconds": seconds,
+            }
+
+
+def summarize_latency(results, total_seconds):
+    """
+    Compares the wall time of a full analysis with the time its analyses would have taken one after another.
+
+    Parameters:
+        results (list): The results yielded by run_full_analysis.
+        total_seconds (float): The wall time of the whole run.
+
+    Returns:
+        dict: The total, the sum of the parts, the slowest part and the speedup over running them serially.
+    """
+    sum_of_parts = sum(result["seconds"] for result in results)
+    return {
+        "total_seconds": total_seconds,
+        "sum_of_parts_seconds": sum_of_parts,
+        "slowest_seconds": max((result["seconds"] for result in results), default=0.0),
+        "speedup": sum_of_parts / total_seconds if total_seconds else 1.0,
+    }
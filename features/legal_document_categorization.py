@@ -1,55 +1,125 @@
-from langchain_ibm import WatsonxLLM 
+from helper_functions.document_classifier import classify_document
+from helper_functions.llm_cache import apply_decoding_mode
+from helper_functions.metrics import timed
+from helper_functions.model_routing import plan_route, routed_invoke, routed_stream
+from helper_functions.prompt_budget import fit_prompt
+from helper_functions.watsonx_client import get_watsonx_llm
 
-def categorize_document(url, project_id, max_tokens, document_text):
+
+def _format_local_categorization(label, confidence, evidence):
     """
-    Categorizes a legal document based on its content, structure, and key terms using IBM's WatsonxLLM.
+    Renders a local classifier prediction in the same form as a model-generated categorization.
+    """
+    article = "an" if label[0].upper() in "AEIOU" else "a"
+    return (
+        f"Document Type: {label}\n\n"
+        f"The document was identified as {article} {label} with {confidence:.0%} confidence based on its key terms: "
+        f"{', '.join(evidence)}."
+    )
 
-    This function utilizes the WatsonxLLM model to analyze a legal document and determine its specific type (e.g., Non-Disclosure Agreement, Employment Agreement, Lease Contract). The function provides a clear and concise explanation of the categorization, highlighting the features or clauses that led to the determination.
 
-    Parameters:
-        url (str): The API endpoint URL to access the WatsonxLLM service.
-        project_id (str): The project identifier for the WatsonxLLM instance.
-        max_tokens (int): The maximum number of tokens to generate in the categorization output.
-        document_text (str): The text of the document to be categorized.
+def _categorization_template(document_text):
+    # system message that defines the persona for the AI and gives intruction on how to act
+    return f"""
+    You are a legal expert tasked with identifying the type of legal document based on the following text:
 
-    Returns:
-        str: A precise categorization of the document type, along with an explanation that supports the determination. The explanation includes an analysis of the content, structure, and key terms, as well as any nuances or specific elements that distinguish this document from similar types.
+    Document Text:
+    {document_text}
 
+    Instructions:
+    1. Analyze the content, structure, and key terms within the document to determine its purpose and function.
+    2. Identify the specific type of legal document (e.g., Non-Disclosure Agreement, Employment Agreement, Lease Contract) by considering the nature of the obligations, parties involved, and legal context.
+    3. Provide a clear and concise explanation for the categorization, highlighting the features or clauses that led to your determination.
+    4. If applicable, mention any nuances or specific elements that distinguish this document from similar types of legal documents.
+    5. Start your answer with a line of the form "Document Type: <type of the document>", followed by the explanation.
+
+    Deliver a precise categorization along with a reasoned explanation that supports your determination.
+    """
+
+
+def _prepare_categorization(url, project_id, max_tokens, document_text):
+    """
+    Builds the route, its WatsonxLLM instances and the rendered prompt for a categorization request.
     """
 
+    # Pick the model tiers and the generation budget for this document
+    route = plan_route("categorize_document", document_text, max_tokens)
+
     # define the parameters for generating suggestions
     parameters = {
     "decoding_method": "sample",
-    "max_new_tokens": max_tokens,
+    "max_new_tokens": route["max_new_tokens"],
     "temperature": 0.7,
     "top_k": 50,
     "top_p": 0.9,
     }
 
-    # Initialize the WatsonLLM model with the specified parameters
-    watsonx_llm = WatsonxLLM(
-            model_id="ibm/granite-13b-chat-v2",
-            url=url,
-            project_id=project_id,
-            params=parameters,
-    )
+    # Switch to greedy decoding in deterministic mode so the response can be cached
+    parameters = apply_decoding_mode(parameters)
 
-    # system message that defines the persona for the AI and gives intruction on how to act
-    categorization_template = f"""
-    You are a legal expert tasked with identifying the type of legal document based on the following text:
+    # Reuse the shared WatsonxLLM instance of every tier for these parameters from the client registry
+    watsonx_llms = [get_watsonx_llm(model_id, url, project_id, parameters) for model_id in route["models"]]
 
-    Document Text:
-    {document_text}
+    # Clean the document and fit it into the context window next to the answer
+    categorization_template = fit_prompt("categorize_document", _categorization_template, document_text, route["max_new_tokens"])
 
-    Instructions:
-    1. Analyze the content, structure, and key terms within the document to determine its purpose and function.
-    2. Identify the specific type of legal document (e.g., Non-Disclosure Agreement, Employment Agreement, Lease Contract) by considering the nature of the obligations, parties involved, and legal context.
-    3. Provide a clear and concise explanation for the categorization, highlighting the features or clauses that led to your determination.
-    4. If applicable, mention any nuances or specific elements that distinguish this document from similar types of legal documents.
+    return route, watsonx_llms, categorization_template
+
+
+@timed("feature", feature="categorize_document")
+def categorize_document(url, project_id, max_tokens, document_text, rate_limiter=None):
+    """
+    Categorizes a legal document based on its content, structure, and key terms using IBM's WatsonxLLM.
+
+    This function utilizes the WatsonxLLM model to analyze a legal document and determine its specific type (e.g., Non-Disclosure Agreement, Employment Agreement, Lease Contract). The function provides a clear and concise explanation of the categorization, highlighting the features or clauses that led to the determination. When a trained and evaluated local classifier is available, documents it recognizes with high confidence and a clear lead over the other types are answered without calling WatsonxLLM. The others go to a small model first and only reach the large one when its answer fails validation, see helper_functions.model_routing.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the categorization output; the route may allow fewer.
+        document_text (str): The text of the document to be categorized.
+        rate_limiter (RateLimiter): An optional limiter acquired before every request sent to Watsonx, escalations,
+            retries and hedged duplicates included; documents answered locally take no slot.
+
+    Returns:
+        str: A precise categorization of the document type, along with an explanation that supports the determination. The explanation includes an analysis of the content, structure, and key terms, as well as any nuances or specific elements that distinguish this document from similar types.
 
-    Deliver a precise categorization along with a reasoned explanation that supports your determination.
     """
 
-    # Use the WatsonxLLM to categorize the document
-    document_type = watsonx_llm.invoke(categorization_template)
+    # Obvious documents are categorized locally in milliseconds, the rest fall back to Watsonx
+    local_prediction = classify_document(document_text)
+    if local_prediction is not None:
+        return _format_local_categorization(*local_prediction)
+
+    route, watsonx_llms, categorization_template = _prepare_categorization(url, project_id, max_tokens, document_text)
+
+    # Use the smallest WatsonxLLM whose answer passes validation to categorize the document
+    document_type = routed_invoke(route, watsonx_llms, categorization_template, rate_limiter)
     return document_type
+
+
+@timed("feature", feature="stream_categorize_document")
+def stream_categorize_document(url, project_id, max_tokens, document_text):
+    """
+    Streams the categorization of categorize_document as it is generated, so the first words can be shown before the full answer is ready.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        max_tokens (int): The maximum number of tokens to generate in the categorization output; the route may allow fewer.
+        document_text (str): The text of the document to be categorized.
+
+    Yields:
+        str: Consecutive pieces of the categorization and its explanation.
+    """
+
+    # Obvious documents are categorized locally in milliseconds, the rest fall back to Watsonx
+    local_prediction = classify_document(document_text)
+    if local_prediction is not None:
+        yield _format_local_categorization(*local_prediction)
+        return
+
+    route, watsonx_llms, categorization_template = _prepare_categorization(url, project_id, max_tokens, document_text)
+
+    # Stream the generated text piece by piece as Watsonx produces it
+    yield from routed_stream(route, watsonx_llms, categorization_template)
@@ -0,0 +1,341 @@
+import hashlib
+import os
+
+from helper_functions.merkle import build_merkle_tree, merkle_proof, merkle_root, verify_merkle_proof
+from helper_functions.metrics import GAS_BUCKETS, observe, span
+from helper_functions.normalization import normalize_text
+
+
+# Gas price offered for deployments signed with a private key
+GAS_PRICE_GWEI = os.environ.get("GAS_PRICE_GWEI", "50")
+
+# Headroom added to the gas estimate of every deployment
+GAS_MARGIN = 100000
+
+# Storage modes of "Upload to Blockchain": the whole contract text, only its digest and minimal metadata, or the
+# Merkle root of a batch of digests
+FULL_TEXT_MODE = "full_text"
+HASH_ANCHOR_MODE = "hash_anchor"
+MERKLE_BATCH_MODE = "merkle_batch"
+
+# The Solidity contract in contracts/ deployed for each storage mode
+MODE_CONTRACTS = {
+    FULL_TEXT_MODE: "ContractStorage",
+    HASH_ANCHOR_MODE: "DocumentAnchor",
+    MERKLE_BATCH_MODE: "MerkleAnchor",
+}
+
+
+def document_digest(document_text):
+    """
+    Computes the digest that anchors a contract on-chain.
+
+    The text is normalized first, so the same contract extracted from two renderings of the PDF produces the same
+    digest.
+
+    Parameters:
+        document_text (str): The extracted contract text.
+
+    Returns:
+        bytes: The 32-byte SHA-256 of the normalized text.
+    """
+    return hashlib.sha256(normalize_text(document_text).encode("utf-8")).digest()
+
+
+def send_deployment(w3, contract_interface, constructor_args, account_address, private_key=None, nonce=None):
+    """
+    Sends a contract deployment without waiting for it to be mined.
+
+    Parameters:
+        w3 (Web3): The connected Web3 instance.
+        contract_interface (dict): The contract ABI and bytecode with the keys "abi" and "bin".
+        constructor_args (tuple): The constructor arguments.
+        account_address (str): The deploying account.
+        private_key (str): The key that signs the transaction; None sends it from an account unlocked on the node,
+            as on a local development chain.
+        nonce (int): The transaction nonce; None asks the node for the next one.
+
+    Returns:
+        tuple: The transaction hash and the signed raw transaction, which is None for unlocked accounts.
+    """
+    Contract = w3.eth.contract(abi=contract_interface['abi'], bytecode=contract_interface['bin'])
+    constructor = Contract.constructor(*constructor_args)
+    with span("gas_estimation"):
+        gas_estimate = constructor.estimate_gas({'from': account_address})
+    observe("deployment_gas_estimate", gas_estimate, GAS_BUCKETS, "Estimated gas of contract deployments.")
+
+    if nonce is None:
+        nonce = w3.eth.get_transaction_count(account_address, 'pending')
+
+    if private_key is None:
+        tx_hash = constructor.transact({'from': account_address, 'gas': gas_estimate + GAS_MARGIN, 'nonce': nonce})
+        return tx_hash, None
+
+    transaction = constructor.build_transaction({
+        'from': account_address,
+        'gas': gas_estimate + GAS_MARGIN,
+        'gasPrice': w3.to_wei(GAS_PRICE_GWEI, 'gwei'),
+        'nonce': nonce,
+    })
+    signed_txn = w3.eth.account.sign_transaction(transaction, private_key=private_key)
+    tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+    return tx_hash, signed_txn.raw_transaction
+
+
+def record_gas_used(gas_used):
+    """
+    Records the gas a mined deployment used.
+    """
+    observe("deployment_gas_used", gas_used, GAS_BUCKETS, "Gas used by mined contract deployments.")
+
+
+def deploy_contract(w3, contract_interface, constructor_args, account_address, private_key=None):
+    """
+    Deploys a contract and waits for its receipt.
+
+    Parameters:
+        w3 (Web3): The connected Web3 instance.
+        contract_interface (dict): The contract ABI and bytecode with the keys "abi" and "bin".
+        constructor_args (tuple): The constructor arguments.
+        account_address (str): The deploying account.
+        private_key (str): The signing key, or None for an unlocked account.
+
+    Returns:
+        tuple: The transaction hash and the transaction receipt.
+    """
+    tx_hash, _ = send_deployment(w3, contract_interface, constructor_args, account_address, private_key)
+    with span("receipt_wait"):
+        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    record_gas_used(tx_receipt.gasUsed)
+    return tx_hash, tx_receipt
+
+
+def deployment_arguments(mode, document_text):
+    """
+    Builds the constructor arguments that store a contract in the given storage mode.
+
+    Parameters:
+        mode (str): FULL_TEXT_MODE or HASH_ANCHOR_MODE.
+        document_text (str): The extracted contract text.
+
+    Returns:
+        tuple: The constructor arguments and the anchored digest, which is None in full text mode.
+    """
+    if mode == HASH_ANCHOR_MODE:
+        normalized_text = normalize_text(document_text)
+        digest = hashlib.sha256(normalized_text.encode("utf-8")).digest()
+        return (digest, len(normalized_text)), digest
+    if mode == FULL_TEXT_MODE:
+        return (document_text,), None
+    raise ValueError(f"Unknown storage mode: {mode}")
+
+
+def upload_document(w3, contract_interface, mode, document_text, account_address, private_key=None):
+    """
+    Stores a contract on-chain in the given storage mode.
+
+    In full text mode the extracted text is the constructor argument of ContractStorage. In hash anchor mode only the
+    SHA-256 of the normalized text and its length are sent to DocumentAnchor, which also records the sender and the
+    block time, so the cost no longer grows with the length of the contract.
+
+    Parameters:
+        w3 (Web3): The connected Web3 instance.
+        contract_interface (dict): The ABI and bytecode of the contract for `mode`.
+        mode (str): FULL_TEXT_MODE or HASH_ANCHOR_MODE.
+        document_text (str): The extracted contract text.
+        account_address (str): The deploying account.
+        private_key (str): The signing key, or None for an unlocked account.
+
+    Returns:
+        dict: The mode, transaction hash, contract address, gas used and, in hash anchor mode, the hex digest.
+    """
+    constructor_args, digest = deployment_arguments(mode, document_text)
+    tx_hash, tx_receipt = deploy_contract(w3, contract_interface, constructor_args, account_address, private_key)
+
+    return {
+        "mode": mode,
+        "tx_hash": tx_hash.hex(),
+        "contract_address": tx_receipt.contractAddress,
+        "gas_used": tx_receipt.gasUsed,
+        "digest": digest.hex() if digest else None,
+    }
+
+
+def submit_document(service, contract_interface, mode, document_text):
+    """
+    Queues a contract for storage in the given storage mode and returns without waiting for a block.
+
+    Parameters:
+        service (TransactionService): The service that sends and tracks the deployment.
+        contract_interface (dict): The ABI and bytecode of the contract for `mode`.
+        mode (str): FULL_TEXT_MODE or HASH_ANCHOR_MODE.
+        document_text (str): The extracted contract text.
+
+    Returns:
+        int: The job id; the metadata of the job holds the mode and, in hash anchor mode, the hex digest.
+    """
+    constructor_args, digest = deployment_arguments(mode, document_text)
+    metadata = {"mode": mode, "digest": digest.hex() if digest else None}
+    return service.submit_deployment(contract_interface, constructor_args, metadata)
+
+
+def verify_document(w3, contract_interface, mode, contract_address, document_text):
+    """
+    Checks an uploaded contract against the copy stored on-chain.
+
+    In full text mode the stored text is fetched and both texts are normalized. In hash anchor mode the uploaded
+    contract is hashed locally and only the 32-byte digest is read from the chain.
+
+    Parameters:
+        w3 (Web3): The connected Web3 instance.
+        contract_interface (dict): The ABI of the contract for `mode`.
+        mode (str): FULL_TEXT_MODE or HASH_ANCHOR_MODE.
+        contract_address (str): The checksum address of the deployed contract.
+        document_text (str): The text extracted from the uploaded contract.
+
+    Returns:
+        dict: "matches" plus the normalized texts ("uploaded", "stored") in full text mode, or the hex digests and
+        the anchoring account, block time and text length in hash anchor mode.
+    """
+    contract = w3.eth.contract(address=contract_address, abi=contract_interface['abi'])
+
+    if mode == FULL_TEXT_MODE:
+        normalized_uploaded = normalize_text(document_text)
+        normalized_stored = normalize_text(contract.functions.getContractContent().call())
+        return {
+            "matches": normalized_uploaded == normalized_stored,
+            "uploaded": normalized_uploaded,
+            "stored": normalized_stored,
+        }
+
+    if mode == HASH_ANCHOR_MODE:
+        local_digest = document_digest(document_text)
+        anchored_digest, anchored_by, anchored_at, text_length = contract.functions.getAnchor().call()
+        return {
+            "matches": local_digest == anchored_digest,
+            "local_digest": local_digest.hex(),
+            "anchored_digest": anchored_digest.hex(),
+            "anchored_by": anchored_by,
+            "anchored_at": anchored_at,
+            "text_length": text_length,
+        }
+
+    raise ValueError(f"Unknown storage mode: {mode}")
+
+
+def batch_deployment_arguments(documents):
+    """
+    Builds the Merkle tree of a batch of contracts.
+
+    Parameters:
+        documents (list): (name, extracted text) pairs, in batch order.
+
+    Returns:
+        tuple: The MerkleAnchor constructor arguments and one inclusion receipt per document, whose
+        "contract_address" is filled in once the batch is deployed.
+    """
+    digests = [document_digest(document_text) for _, document_text in documents]
+    levels = build_merkle_tree(digests)
+    root = merkle_root(levels)
+
+    receipts = [
+        {
+            "name": name,
+            "contract_address": None,
+            "root": root.hex(),
+            "leaf_index": index,
+            "digest": digest.hex(),
+            "proof": merkle_proof(levels, index),
+        }
+        for index, ((name, _), digest) in enumerate(zip(documents, digests))
+    ]
+    return (root, len(digests)), receipts
+
+
+def upload_batch(w3, contract_interface, documents, account_address, private_key=None):
+    """
+    Anchors many contracts with a single transaction by storing the Merkle root of their digests.
+
+    Every document gets an inclusion receipt that proves, together with the on-chain root, that it was part of the
+    batch. The receipts are needed for verification and are not stored on-chain.
+
+    Parameters:
+        w3 (Web3): The connected Web3 instance.
+        contract_interface (dict): The ABI and bytecode of MerkleAnchor.
+        documents (list): (name, extracted text) pairs, in batch order.
+        account_address (str): The deploying account.
+        private_key (str): The signing key, or None for an unlocked account.
+
+    Returns:
+        dict: The transaction hash, contract address, gas used, hex root and one receipt per document with the keys
+        "name", "contract_address", "root", "leaf_index", "digest" and "proof".
+    """
+    constructor_args, receipts = batch_deployment_arguments(documents)
+    tx_hash, tx_receipt = deploy_contract(w3, contract_interface, constructor_args, account_address, private_key)
+    for receipt in receipts:
+        receipt["contract_address"] = tx_receipt.contractAddress
+
+    return {
+        "mode": MERKLE_BATCH_MODE,
+        "tx_hash": tx_hash.hex(),
+        "contract_address": tx_receipt.contractAddress,
+        "gas_used": tx_receipt.gasUsed,
+        "root": receipts[0]["root"],
+        "receipts": receipts,
+    }
+
+
+def submit_batch(service, contract_interface, documents):
+    """
+    Queues the Merkle anchor of a batch of contracts and returns without waiting for a block.
+
+    Parameters:
+        service (TransactionService): The service that sends and tracks the deployment.
+        contract_interface (dict): The ABI and bytecode of MerkleAnchor.
+        documents (list): (name, extracted text) pairs, in batch order.
+
+    Returns:
+        int: The job id; its metadata holds the hex root and the inclusion receipts, which get their
+        "contract_address" from batch_receipts once the job is confirmed.
+    """
+    constructor_args, receipts = batch_deployment_arguments(documents)
+    metadata = {"mode": MERKLE_BATCH_MODE, "root": receipts[0]["root"], "receipts": receipts}
+    return service.submit_deployment(contract_interface, constructor_args, metadata)
+
+
+def batch_receipts(job):
+    """
+    Returns the inclusion receipts of a confirmed batch job with the address of its MerkleAnchor filled in.
+    """
+    return [dict(receipt, contract_address=job["contract_address"]) for receipt in job["metadata"]["receipts"]]
+
+
+def verify_batch_document(w3, contract_interface, inclusion_receipt, document_text):
+    """
+    Checks an uploaded contract against a batch anchored with upload_batch.
+
+    The contract is hashed locally and its inclusion proof is evaluated against the root read from the chain, so
+    neither the other documents of the batch nor their digests are needed.
+
+    Parameters:
+        w3 (Web3): The connected Web3 instance.
+        contract_interface (dict): The ABI of MerkleAnchor.
+        inclusion_receipt (dict): The receipt of the document returned by upload_batch.
+        document_text (str): The text extracted from the uploaded contract.
+
+    Returns:
+        dict: "matches", the local digest, the anchored root, the anchoring account and block time and the number of
+        documents in the batch.
+    """
+    contract = w3.eth.contract(address=inclusion_receipt["contract_address"], abi=contract_interface['abi'])
+    anchored_root, anchored_by, anchored_at, document_count = contract.functions.getAnchor().call()
+
+    local_digest = document_digest(document_text)
+    return {
+        "matches": verify_merkle_proof(local_digest, inclusion_receipt["proof"], anchored_root),
+        "local_digest": local_digest.hex(),
+        "anchored_root": anchored_root.hex(),
+        "anchored_by": anchored_by,
+        "anchored_at": anchored_at,
+        "document_count": document_count,
+    }
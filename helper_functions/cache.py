@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def _encode_json(value):
+    return json.dumps(value).encode("utf-8")
+
+
+def _decode_json(data):
+    return json.loads(data.decode("utf-8"))
+
+
+class MemoryCache:
+    """
+    A thread-safe in-process LRU cache holding at most `max_entries` values.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value for `key` and marks it as most recently used, or None when absent.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        """
+        Stores `value` under `key`, evicting the least recently used entries beyond `max_entries`.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    A SQLite-backed cache of byte values with a time-to-live and a total size limit.
+
+    Expired entries are dropped when read, and the least recently used entries are evicted whenever the
+    stored bytes exceed `max_bytes`.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._connection.commit()
+
+    def get(self, key):
+        """
+        Returns the stored bytes for `key`, or None when the entry is absent or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+
+            self._connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            return bytes(value)
+
+    def set(self, key, value):
+        """
+        Stores the bytes `value` under `key` and evicts expired and least recently used entries as needed.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), now, now),
+            )
+            if self.ttl_seconds:
+                self._connection.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._evict_to_size()
+            self._connection.commit()
+
+    def _evict_to_size(self):
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._connection.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM entries")
+            self._connection.commit()
+
+
+class TieredCache:
+    """
+    Combines a MemoryCache with an optional DiskCache and keeps hit and miss statistics.
+
+    Values are kept as-is in memory and converted with `encode`/`decode` (JSON by default) for the disk tier.
+    Disk hits are promoted into the memory tier.
+    """
+
+    def __init__(self, memory, disk=None, encode=_encode_json, decode=_decode_json):
+        self.memory = memory
+        self.disk = disk
+        self.encode = encode
+        self.decode = decode
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        """
+        Returns the value cached under `key` from the fastest tier that holds it, or None.
+        """
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        if self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                value = self.decode(data)
+                self.memory.set(key, value)
+                self._count("disk_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        """
+        Stores `value` under `key` in every configured tier.
+        """
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, self.encode(value))
+        self._count("writes")
+
+    def stats(self):
+        """
+        Returns the hit, miss and write counters together with the overall hit rate.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
@@ -0,0 +1,205 @@
+from difflib import SequenceMatcher
+
+from helper_functions.text_chunking import split_into_clauses
+
+
+# Minimum similarity for a removed and an added clause to be reported as one modified clause
+MODIFIED_SIMILARITY = 0.6
+
+# Number of characters of a neighbouring clause shown as context for added and removed clauses
+CONTEXT_CHARS = 120
+
+
+def _clause_key(clause):
+    # PDF extraction wraps lines differently between versions, so clauses are compared on their words only
+    return " ".join(clause.split())
+
+
+def _similarity(first, second):
+    matcher = SequenceMatcher(None, first, second, autojunk=False)
+    if matcher.real_quick_ratio() < MODIFIED_SIMILARITY or matcher.quick_ratio() < MODIFIED_SIMILARITY:
+        return 0.0
+    return matcher.ratio()
+
+
+def diff_documents(original_text, new_text):
+    """
+    Computes a clause-level diff between two versions of a contract.
+
+    Both texts are split into clauses, aligned with a longest matching subsequence, and every clause is classified
+    as identical, modified, added, removed or moved. Removed and added clauses with the same wording are reported as
+    moved, and sufficiently similar ones as modified.
+
+    Parameters:
+        original_text (str): The original contract text.
+        new_text (str): The updated contract text.
+
+    Returns:
+        list: One dictionary per clause with the keys "status", "original", "new", "original_index", "new_index"
+        and "similarity", in the order of the updated contract followed by removed clauses.
+    """
+    original_clauses = split_into_clauses(original_text)
+    new_clauses = split_into_clauses(new_text)
+    original_keys = [_clause_key(clause) for clause in original_clauses]
+    new_keys = [_clause_key(clause) for clause in new_clauses]
+
+    hunks = {}
+    removed = []
+    added = []
+
+    matcher = SequenceMatcher(None, original_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                hunks[j1 + offset] = {
+                    "status": "identical",
+                    "original": original_clauses[i1 + offset],
+                    "new": new_clauses[j1 + offset],
+                    "original_index": i1 + offset,
+                    "new_index": j1 + offset,
+                    "similarity": 1.0,
+                }
+        else:
+            removed.extend(range(i1, i2))
+            added.extend(range(j1, j2))
+
+    # Clauses that disappear in one place and reappear verbatim elsewhere were moved
+    removed_by_key = {}
+    for index in removed:
+        removed_by_key.setdefault(original_keys[index], []).append(index)
+
+    unmatched_added = []
+    for index in added:
+        candidates = removed_by_key.get(new_keys[index])
+        if candidates:
+            original_index = candidates.pop(0)
+            removed.remove(original_index)
+            hunks[index] = {
+                "status": "moved",
+                "original": original_clauses[original_index],
+                "new": new_clauses[index],
+                "original_index": original_index,
+                "new_index": index,
+                "similarity": 1.0,
+            }
+        else:
+            unmatched_added.append(index)
+
+    # Pair the remaining clauses by similarity, best matches first
+    pairs = []
+    for original_index in removed:
+        for new_index in unmatched_added:
+            similarity = _similarity(original_keys[original_index], new_keys[new_index])
+            if similarity >= MODIFIED_SIMILARITY:
+                pairs.append((similarity, original_index, new_index))
+
+    paired_original = set()
+    paired_new = set()
+    for similarity, original_index, new_index in sorted(pairs, reverse=True):
+        if original_index in paired_original or new_index in paired_new:
+            continue
+        paired_original.add(original_index)
+        paired_new.add(new_index)
+        hunks[new_index] = {
+            "status": "modified",
+            "original": original_clauses[original_index],
+            "new": new_clauses[new_index],
+            "original_index": original_index,
+            "new_index": new_index,
+            "similarity": round(similarity, 3),
+        }
+
+    for new_index in unmatched_added:
+        if new_index not in paired_new:
+            hunks[new_index] = {
+                "status": "added",
+                "original": None,
+                "new": new_clauses[new_index],
+                "original_index": None,
+                "new_index": new_index,
+                "similarity": 0.0,
+            }
+
+    result = [hunks[index] for index in range(len(new_clauses))]
+    for original_index in removed:
+        if original_index not in paired_original:
+            result.append({
+                "status": "removed",
+                "original": original_clauses[original_index],
+                "new": None,
+                "original_index": original_index,
+                "new_index": None,
+                "similarity": 0.0,
+            })
+
+    return result
+
+
+def summarize_diff(document_diff):
+    """
+    Counts the clauses of a clause-level diff by status.
+
+    Parameters:
+        document_diff (list): The output of diff_documents.
+
+    Returns:
+        dict: The number of identical, modified, added, removed and moved clauses.
+    """
+    counts = {"identical": 0, "modified": 0, "added": 0, "removed": 0, "moved": 0}
+    for hunk in document_diff:
+        counts[hunk["status"]] += 1
+    return counts
+
+
+def _context(clauses, index):
+    if index is None or index < 0 or index >= len(clauses):
+        return None
+    return _clause_key(clauses[index])[:CONTEXT_CHARS]
+
+
+def format_diff_for_prompt(document_diff):
+    """
+    Renders only the changed clauses of a clause-level diff as text for the comparison prompt.
+
+    Added and removed clauses are preceded by the beginning of the neighbouring clause so the model can place them.
+
+    Parameters:
+        document_diff (list): The output of diff_documents.
+
+    Returns:
+        str: The changed hunks with minimal context, or a note that the documents match clause for clause.
+    """
+    original_clauses = {hunk["original_index"]: hunk["original"] for hunk in document_diff if hunk["original"] is not None}
+    new_clauses = {hunk["new_index"]: hunk["new"] for hunk in document_diff if hunk["new"] is not None}
+    original_list = [original_clauses[index] for index in sorted(original_clauses)]
+    new_list = [new_clauses[index] for index in sorted(new_clauses)]
+
+    sections = []
+    for hunk in document_diff:
+        status = hunk["status"]
+        if status == "identical":
+            continue
+
+        if status == "modified":
+            sections.append(
+                f"[MODIFIED clause {hunk['original_index'] + 1} -> {hunk['new_index'] + 1}]\n"
+                f"Original: {_clause_key(hunk['original'])}\nUpdated: {_clause_key(hunk['new'])}"
+            )
+        elif status == "moved":
+            sections.append(
+                f"[MOVED clause {hunk['original_index'] + 1} -> {hunk['new_index'] + 1}, wording unchanged]\n"
+                f"{_clause_key(hunk['new'])[:CONTEXT_CHARS]}"
+            )
+        elif status == "added":
+            context = _context(new_list, hunk["new_index"] - 1)
+            after = f"After: {context}\n" if context else ""
+            sections.append(f"[ADDED clause {hunk['new_index'] + 1}]\n{after}Added: {_clause_key(hunk['new'])}")
+        else:
+            context = _context(original_list, hunk["original_index"] - 1)
+            after = f"After: {context}\n" if context else ""
+            sections.append(f"[REMOVED clause {hunk['original_index'] + 1}]\n{after}Removed: {_clause_key(hunk['original'])}")
+
+    if not sections:
+        return "No differences were found; both versions contain the same clauses in the same order."
+
+    return "\n\n".join(sections)
@@ -0,0 +1,212 @@
+import json
+import os
+import re
+
+from helper_functions.metrics import increment
+
+
+# Clause library used to assemble drafts; a deployment can point this at its own, reviewed library
+CLAUSE_LIBRARY_PATH = os.environ.get(
+    "CLAUSE_LIBRARY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "clause_library.json")
+)
+
+# Wildcard for clauses that apply to every contract type or every country
+ANY = "*"
+
+_HEADING_MARKUP_RE = re.compile(r"^[#*\s]*(?:\d+(?:\.\d+)*\.?\s+)?|[*:\s]+$")
+
+
+def load_clause_library(path=CLAUSE_LIBRARY_PATH):
+    """
+    Loads a clause library and indexes its clauses by (contract type, country, clause kind).
+
+    Parameters:
+        path (str): The JSON file with the countries, the contract types and the clauses.
+
+    Returns:
+        dict: The facts of every country under "countries", the title, party roles and ordered clause kinds of every
+        contract type under "contract_types", and the clauses keyed by (contract type, country, kind) under "index".
+    """
+    with open(path, encoding="utf-8") as library_file:
+        library = json.load(library_file)
+
+    index = {}
+    for clause in library["clauses"]:
+        index[(clause["contract_type"], clause["country"], clause["kind"])] = clause
+
+    return {"countries": library["countries"], "contract_types": library["contract_types"], "index": index}
+
+
+_library = load_clause_library()
+
+
+def find_clause(contract_type, country, kind, library=None):
+    """
+    Returns the most specific clause of a kind: the one written for the contract type and country, then for the
+    contract type in any country, then for the country and any contract type, then the general one.
+
+    Returns:
+        dict: The clause with its title, its text paragraphs and, for clauses that depend on the key terms, the
+        "fill" description given to the model; None when the library has no clause of that kind.
+    """
+    index = (library or _library)["index"]
+    for key in ((contract_type, country, kind), (contract_type, ANY, kind), (ANY, country, kind), (ANY, ANY, kind)):
+        clause = index.get(key)
+        if clause is not None:
+            return clause
+    return None
+
+
+def build_skeleton(contract_type, party_one, party_two, country, library=None):
+    """
+    Lays out a contract from the clause library, with the parties, roles and country-specific law filled in.
+
+    Parameters:
+        contract_type (str): One of the contract types of the library, such as "NDA".
+        party_one (str): The name of the first party, who takes the first role of the contract type.
+        party_two (str): The name of the second party, who takes the second role.
+        country (str): One of the countries of the library.
+        library (dict): A library returned by load_clause_library; None uses the one at CLAUSE_LIBRARY_PATH.
+
+    Returns:
+        dict: The title, the two roles, the values substituted into the clauses and the sections in order. Every
+        section has its kind, title, markdown heading and library text; sections that depend on the key terms also
+        carry the "fill" description for the model, and their library text only stands in when the model does not
+        write them.
+
+    Raises:
+        ValueError: When the contract type or the country is not in the library.
+    """
+    library = library or _library
+    if contract_type not in library["contract_types"]:
+        raise ValueError(f"Unknown contract type {contract_type!r}; expected one of {', '.join(library['contract_types'])}")
+    if country not in library["countries"]:
+        raise ValueError(f"Unknown country {country!r}; expected one of {', '.join(library['countries'])}")
+
+    layout = library["contract_types"][contract_type]
+    role_one, role_two = layout["roles"]
+    values = dict(
+        library["countries"][country],
+        title=layout["title"],
+        contract_type=contract_type,
+        country=country,
+        role_one=role_one,
+        role_two=role_two,
+        party_one=party_one.strip() or f"[name of the {role_one}]",
+        party_two=party_two.strip() or f"[name of the {role_two}]",
+    )
+
+    sections = []
+    number = 0
+    for kind in layout["sections"]:
+        clause = find_clause(contract_type, country, kind, library)
+        if clause is None:
+            # A kind without any clause in the library is left entirely to the model
+            name = kind.replace("_", " ")
+            clause = {"title": name.title(), "text": ["[To be drafted.]"], "fill": f"The {name} clause."}
+
+        title = clause["title"].format_map(values)
+        if clause.get("numbered", True):
+            number += 1
+            heading = f"## {number}. {title}"
+        else:
+            heading = f"## {title}"
+
+        sections.append({
+            "kind": kind,
+            "title": title,
+            "heading": heading,
+            "text": "\n\n".join(clause["text"]).format_map(values),
+            "fill": clause.get("fill", "").format_map(values) or None,
+        })
+
+    return {"title": layout["title"], "roles": (role_one, role_two), "values": values, "sections": sections}
+
+
+def _heading_key(line):
+    # "### 2. Purpose", "**Purpose:**" and "Purpose" all become "purpose"
+    if len(line) > 120:
+        return None
+    return _HEADING_MARKUP_RE.sub("", line).strip().lower() or None
+
+
+def _lines(pieces):
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        *lines, buffer = buffer.split("\n")
+        yield from lines
+    if buffer:
+        yield buffer
+
+
+def assemble_draft(skeleton, generated_pieces):
+    """
+    Assembles a contract from the library sections of a skeleton and the sections the model wrote for it.
+
+    The model output is read line by line as it arrives. A line that names a section to fill starts that section;
+    everything up to the next such line is its body. Library sections in between are emitted as soon as the model
+    moves past them, so a draft streams from the first piece on. Sections the model skipped or left empty get
+    their library text, and text outside the requested sections, such as a preamble or a repeated library clause,
+    is dropped.
+
+    Parameters:
+        skeleton (dict): The skeleton returned by build_skeleton.
+        generated_pieces (iterable): The text written by the model, in pieces of any size; empty when there are no
+            key terms.
+
+    Yields:
+        str: Consecutive pieces of the markdown contract.
+    """
+    sections = skeleton["sections"]
+    fill_index = {_heading_key(section["title"]): index for index, section in enumerate(sections) if section["fill"]}
+    library_titles = {_heading_key(section["title"]) for section in sections if not section["fill"]}
+    sources = {"library": 0, "generated": 0, "default": 0}
+
+    def emit(start, stop):
+        for section in sections[start:stop]:
+            sources["default" if section["fill"] else "library"] += 1
+            yield f"{section['heading']}\n\n{section['text']}\n\n"
+
+    def close(index, has_body):
+        if has_body:
+            sources["generated"] += 1
+            yield "\n"
+        else:
+            sources["default"] += 1
+            yield f"{sections[index]['text']}\n\n"
+
+    yield f"# {skeleton['title']}\n\n"
+    next_section = 0
+    current = None
+    has_body = False
+
+    for line in _lines(generated_pieces):
+        key = _heading_key(line)
+        index = fill_index.get(key)
+        if index is not None and index >= next_section:
+            if current is not None:
+                yield from close(current, has_body)
+            yield from emit(next_section, index)
+            yield f"{sections[index]['heading']}\n\n"
+            current, has_body, next_section = index, False, index + 1
+            continue
+
+        if key in library_titles or key in fill_index:
+            # The model started a section it was not asked for, or one it already wrote; skip it
+            if current is not None:
+                yield from close(current, has_body)
+            current = None
+            continue
+
+        if current is None or (not has_body and not line.strip()):
+            continue
+        has_body = True
+        yield line.rstrip() + "\n"
+
+    if current is not None:
+        yield from close(current, has_body)
+    yield from emit(next_section, len(sections))
+
+    for source, count in sources.items():
+        increment("draft_sections", count, "Sections of assembled drafts, by where their text came from.", source=source)
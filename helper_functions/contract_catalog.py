@@ -0,0 +1,17 @@
+# Contract types offered by the drafting form and recognized by the local document classifier
+CONTRACT_TYPES = [
+    'NDA',
+    'Employment Agreement',
+    'Service Agreement',
+    'Sales Agreement',
+    'Lease Agreement',
+    'Partnership Agreement',
+    'Loan Agreement',
+    'Franchise Agreement',
+    'Settlement Agreement',
+    'Indemnity Agreement',
+    'Licensing Agreement',
+]
+
+# Jurisdictions offered by the drafting form
+COUNTRIES = ['Australia', 'Canada', 'United Arab Emirates', 'United Kingdom', 'United States']
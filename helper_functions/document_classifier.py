@@ -0,0 +1,378 @@
+import argparse
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from helper_functions.contract_catalog import CONTRACT_TYPES
+
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Predictions at or above this confidence are answered locally instead of by Watsonx
+CONFIDENCE_THRESHOLD = float(os.environ.get("CLASSIFIER_CONFIDENCE_THRESHOLD", "0.8"))
+
+# ... and only when they lead the runner-up type by this much confidence
+CONFIDENCE_MARGIN = float(os.environ.get("CLASSIFIER_CONFIDENCE_MARGIN", "0.5"))
+
+# A trained model answers locally only when its held-out accuracy at the threshold reached this
+MIN_LOCAL_ACCURACY = float(os.environ.get("CLASSIFIER_MIN_LOCAL_ACCURACY", "0.95"))
+
+# Share of the labeled corpus the `train` command holds out to evaluate the model before saving it
+HOLDOUT_SHARE = 0.2
+
+# Label for documents that are not any of the contract types; a corpus can include examples of it, and it is never
+# answered locally
+OTHER_LABEL = "Other"
+
+# A model trained with the `train` command is picked up from here when present
+MODEL_PATH = os.environ.get("CLASSIFIER_MODEL_PATH", os.path.join(_ROOT_DIR, "models", "document_classifier.npz"))
+
+# Softmax temperature applied to cosine similarities; lower values give sharper confidences
+SIMILARITY_TEMPERATURE = 0.05
+
+# Documents are classified on their beginning, where titles, recitals and defining clauses appear
+MAX_CLASSIFIED_CHARS = 20000
+
+# Characteristic vocabulary of each contract type. The profiles are not calibrated, so they only serve to try the
+# `evaluate` command before a corpus is available and are never used to answer locally
+SEED_PROFILES = {
+    "NDA": "non-disclosure agreement confidentiality agreement confidential information disclosing party receiving party "
+           "non-disclosure disclose trade secrets proprietary information permitted purpose return or destroy",
+    "Employment Agreement": "employment agreement employer employee salary position duties probation working hours "
+                            "annual leave benefits termination of employment notice period job title",
+    "Service Agreement": "service agreement services agreement service provider statement of work deliverables "
+                         "service levels fees for services client customer performance of services",
+    "Sales Agreement": "sales agreement purchase agreement seller buyer goods purchase price delivery title risk of loss "
+                       "shipment inspection warranty of goods bill of sale",
+    "Lease Agreement": "lease agreement landlord tenant lessor lessee premises rent security deposit lease term "
+                       "rental property repairs and maintenance occupancy",
+    "Partnership Agreement": "partnership agreement partners partnership capital contributions profits and losses "
+                             "distributions general partner limited partner dissolution management of the partnership",
+    "Loan Agreement": "loan agreement lender borrower principal amount interest rate repayment schedule promissory note "
+                      "collateral default acceleration prepayment",
+    "Franchise Agreement": "franchise agreement franchisor franchisee franchise fee royalties territory trademarks "
+                           "operations manual franchised business system standards",
+    "Settlement Agreement": "settlement agreement release settlement payment claims dispute release of claims "
+                            "without admission of liability full and final settlement covenant not to sue",
+    "Indemnity Agreement": "indemnity agreement indemnify indemnifier indemnitee hold harmless losses liabilities "
+                           "defend claims indemnification obligations third party claims",
+    "Licensing Agreement": "license agreement licensing agreement licensor licensee license grant royalties "
+                           "intellectual property licensed technology licensed software sublicense",
+}
+
+_TOKEN_RE = re.compile(r"[a-z][a-z\-]+")
+
+# Function words carry no evidence of a contract type and would show up as key terms
+STOPWORDS = frozenset(
+    "a an and any are as at be been by for from has have in into is it its may no not of on or other shall such "
+    "than that the their then there these this those to under upon was were which will with without".split()
+)
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase word unigrams and bigrams, leaving out stopwords.
+
+    Parameters:
+        text (str): The text to tokenize.
+
+    Returns:
+        list: The unigram and bigram terms in document order.
+    """
+    words = [word for word in _TOKEN_RE.findall(text[:MAX_CLASSIFIED_CHARS].lower()) if word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+class DocumentClassifier:
+    """
+    A nearest-centroid TF-IDF classifier over contract types, implemented with NumPy.
+    """
+
+    def __init__(self, labels, vocabulary, idf, centroids, local_accuracy=None):
+        self.labels = list(labels)
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.centroids = centroids
+
+        # Accuracy of the local answers on held-out documents, None until the model has been evaluated
+        self.local_accuracy = local_accuracy
+        self._terms = None
+
+    @classmethod
+    def fit(cls, texts, labels):
+        """
+        Trains a classifier from example documents.
+
+        Parameters:
+            texts (list): The document texts.
+            labels (list): The contract type of each document.
+
+        Returns:
+            DocumentClassifier: The trained classifier.
+        """
+        tokenized = [tokenize(text) for text in texts]
+
+        vocabulary = {}
+        for tokens in tokenized:
+            for token in tokens:
+                vocabulary.setdefault(token, len(vocabulary))
+
+        # Document frequency of every term, counted once per document
+        document_frequency = np.zeros(len(vocabulary))
+        for tokens in tokenized:
+            document_frequency[np.unique([vocabulary[token] for token in tokens])] += 1
+        idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+
+        class_labels = sorted(set(labels))
+        centroids = np.zeros((len(class_labels), len(vocabulary)))
+        classifier = cls(class_labels, vocabulary, idf, centroids)
+        for tokens, label in zip(tokenized, labels):
+            centroids[class_labels.index(label)] += classifier._vectorize(tokens)
+
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        classifier.centroids = centroids / np.where(norms == 0, 1, norms)
+        return classifier
+
+    @classmethod
+    def from_seed_profiles(cls):
+        """
+        Builds a classifier from the built-in keyword profiles of the contract types offered by the drafting form.
+        """
+        labels = [label for label in CONTRACT_TYPES if label in SEED_PROFILES]
+        return cls.fit([SEED_PROFILES[label] for label in labels], labels)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a classifier saved with `save`.
+        """
+        data = np.load(path, allow_pickle=False)
+        terms = list(data["terms"])
+        local_accuracy = float(data["local_accuracy"]) if "local_accuracy" in data else None
+        return cls(
+            list(data["labels"]), {term: index for index, term in enumerate(terms)}, data["idf"], data["centroids"],
+            local_accuracy,
+        )
+
+    def save(self, path):
+        """
+        Saves the classifier as a compressed NumPy archive.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        evaluation = {} if self.local_accuracy is None else {"local_accuracy": np.array(self.local_accuracy)}
+        np.savez_compressed(
+            path, labels=np.array(self.labels), terms=np.array(terms), idf=self.idf, centroids=self.centroids, **evaluation
+        )
+
+    def _vectorize(self, tokens):
+        indices = [self.vocabulary[token] for token in tokens if token in self.vocabulary]
+        vector = np.bincount(np.array(indices, dtype=np.int64), minlength=len(self.vocabulary)).astype(float)
+
+        # Sublinear term frequency keeps repeated boilerplate from dominating
+        np.log1p(vector, out=vector)
+        vector *= self.idf
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def predict(self, text, top_terms=5):
+        """
+        Predicts the contract type of a document.
+
+        Parameters:
+            text (str): The document text.
+            top_terms (int): The number of terms to return as evidence for the prediction.
+
+        Returns:
+            tuple: The predicted label, its confidence between 0 and 1, its lead in confidence over the runner-up
+            label, and the terms that contributed most.
+        """
+        vector = self._vectorize(tokenize(text))
+        similarities = self.centroids @ vector
+        if not similarities.any():
+            return None, 0.0, 0.0, []
+
+        scaled = similarities / SIMILARITY_TEMPERATURE
+        probabilities = np.exp(scaled - scaled.max())
+        probabilities /= probabilities.sum()
+
+        best = int(np.argmax(probabilities))
+        runner_up = float(np.partition(probabilities, -2)[-2]) if len(probabilities) > 1 else 0.0
+        contributions = vector * self.centroids[best]
+        if self._terms is None:
+            self._terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        order = np.argsort(contributions)[::-1][:top_terms]
+        evidence = [self._terms[index] for index in order if contributions[index] > 0]
+
+        return self.labels[best], float(probabilities[best]), float(probabilities[best]) - runner_up, evidence
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+_classifier_stats = {"local": 0, "fallback": 0}
+
+
+def get_classifier():
+    """
+    Returns the process-wide classifier: the trained model, when one exists and its held-out accuracy reached
+    MIN_LOCAL_ACCURACY, and None otherwise, so every document goes to Watsonx.
+    """
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None and os.path.exists(MODEL_PATH):
+            classifier = DocumentClassifier.load(MODEL_PATH)
+            if classifier.local_accuracy is not None and classifier.local_accuracy >= MIN_LOCAL_ACCURACY:
+                _classifier = classifier
+        return _classifier
+
+
+def classify_document(document_text, threshold=CONFIDENCE_THRESHOLD, margin=CONFIDENCE_MARGIN):
+    """
+    Classifies a document locally when an evaluated classifier is confident enough.
+
+    Parameters:
+        document_text (str): The text of the document to be categorized.
+        threshold (float): The minimum confidence for a local answer.
+        margin (float): The minimum lead in confidence over the runner-up label.
+
+    Returns:
+        tuple: The label, confidence and evidence terms, or None when the document should go to Watsonx.
+    """
+    classifier = get_classifier()
+    label, confidence, lead, evidence = classifier.predict(document_text) if classifier else (None, 0.0, 0.0, [])
+
+    with _classifier_lock:
+        if label not in (None, OTHER_LABEL) and confidence >= threshold and lead >= margin:
+            _classifier_stats["local"] += 1
+            return label, confidence, evidence
+        _classifier_stats["fallback"] += 1
+        return None
+
+
+def get_classifier_stats():
+    """
+    Returns how many categorizations were answered locally and how many fell back to Watsonx.
+    """
+    with _classifier_lock:
+        stats = dict(_classifier_stats)
+    total = stats["local"] + stats["fallback"]
+    stats["llm_calls_avoided"] = stats["local"] / total if total else 0.0
+    return stats
+
+
+def _load_labeled_folder(folder):
+    """
+    Reads a labeled corpus laid out as one subfolder per contract type containing PDF or text files.
+    """
+    from helper_functions.pdf_text_extractor import extract_text_from_pdf
+
+    texts = []
+    labels = []
+    for label in sorted(os.listdir(folder)):
+        label_folder = os.path.join(folder, label)
+        if not os.path.isdir(label_folder):
+            continue
+        for name in sorted(os.listdir(label_folder)):
+            path = os.path.join(label_folder, name)
+            if name.lower().endswith(".pdf"):
+                with open(path, "rb") as pdf_file:
+                    texts.append(extract_text_from_pdf(pdf_file))
+            elif name.lower().endswith(".txt"):
+                with open(path, encoding="utf-8") as text_file:
+                    texts.append(text_file.read())
+            else:
+                continue
+            labels.append(label)
+    return texts, labels
+
+
+def evaluate(classifier, texts, labels, threshold=CONFIDENCE_THRESHOLD, margin=CONFIDENCE_MARGIN):
+    """
+    Measures the classifier against labeled documents.
+
+    Parameters:
+        classifier (DocumentClassifier): The classifier to evaluate.
+        texts (list): The document texts.
+        labels (list): The true contract type of each document.
+        threshold (float): The confidence threshold for local answers.
+        margin (float): The lead over the runner-up label required for local answers.
+
+    Returns:
+        dict: Per-label precision and recall over all predictions, the accuracy of the answers given locally,
+        the fraction of LLM calls avoided and the mean prediction latency in milliseconds.
+    """
+    predictions = []
+    started = time.perf_counter()
+    for text in texts:
+        label, confidence, lead, _ = classifier.predict(text)
+        predictions.append((label, confidence if lead >= margin and label != OTHER_LABEL else 0.0))
+    latency_ms = (time.perf_counter() - started) * 1000 / max(len(texts), 1)
+
+    per_label = {}
+    for label in sorted(set(labels) | set(classifier.labels)):
+        true_positive = sum(1 for (predicted, _), actual in zip(predictions, labels) if predicted == label and actual == label)
+        predicted_count = sum(1 for predicted, _ in predictions if predicted == label)
+        actual_count = sum(1 for actual in labels if actual == label)
+        per_label[label] = {
+            "precision": true_positive / predicted_count if predicted_count else 0.0,
+            "recall": true_positive / actual_count if actual_count else 0.0,
+            "support": actual_count,
+        }
+
+    local = [(predicted, actual) for (predicted, confidence), actual in zip(predictions, labels) if confidence >= threshold]
+    return {
+        "per_label": per_label,
+        "local_accuracy": sum(1 for predicted, actual in local if predicted == actual) / len(local) if local else 0.0,
+        "llm_calls_avoided": len(local) / len(labels) if labels else 0.0,
+        "latency_ms": latency_ms,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or evaluate the local document type classifier.")
+    parser.add_argument("command", choices=["train", "evaluate"])
+    parser.add_argument("folder", help="Labeled corpus with one subfolder of PDF/TXT files per contract type")
+    parser.add_argument("--model", default=MODEL_PATH, help="Model file to write (train) or read (evaluate)")
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD, help="Confidence for local answers")
+    parser.add_argument("--margin", type=float, default=CONFIDENCE_MARGIN, help="Lead over the runner-up for local answers")
+    args = parser.parse_args()
+
+    corpus_texts, corpus_labels = _load_labeled_folder(args.folder)
+
+    if args.command == "train":
+        # Evaluate on every fifth document with a model trained on the others, then train on the whole corpus; the
+        # held-out accuracy is saved with the model and decides whether it may answer locally
+        held_out = set(range(0, len(corpus_texts), round(1 / HOLDOUT_SHARE)))
+        trial = DocumentClassifier.fit(
+            [text for index, text in enumerate(corpus_texts) if index not in held_out],
+            [label for index, label in enumerate(corpus_labels) if index not in held_out],
+        )
+        report = evaluate(
+            trial, [corpus_texts[index] for index in sorted(held_out)], [corpus_labels[index] for index in sorted(held_out)],
+            args.threshold, args.margin,
+        )
+
+        model = DocumentClassifier.fit(corpus_texts, corpus_labels)
+        model.local_accuracy = report["local_accuracy"] if report["llm_calls_avoided"] else None
+        model.save(args.model)
+        print(f"Trained on {len(corpus_texts)} documents across {len(model.labels)} types, saved to {args.model}")
+        if model.local_accuracy is None:
+            print("No held-out document was answered locally, so every document will go to Watsonx")
+        else:
+            print(f"Held-out accuracy of local answers: {model.local_accuracy:.2%}")
+            if model.local_accuracy < MIN_LOCAL_ACCURACY:
+                print(f"Below CLASSIFIER_MIN_LOCAL_ACCURACY ({MIN_LOCAL_ACCURACY:.0%}), so every document will go to Watsonx")
+    else:
+        model = DocumentClassifier.load(args.model) if os.path.exists(args.model) else DocumentClassifier.from_seed_profiles()
+        report = evaluate(model, corpus_texts, corpus_labels, args.threshold, args.margin)
+        for name, scores in report["per_label"].items():
+            print(f"{name:<25} precision {scores['precision']:.2f}  recall {scores['recall']:.2f}  support {scores['support']}")
+        print(f"Accuracy of local answers: {report['local_accuracy']:.2%}")
+        print(f"LLM calls avoided at threshold {args.threshold}: {report['llm_calls_avoided']:.2%}")
+        print(f"Mean prediction latency: {report['latency_ms']:.2f} ms")
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import types
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SQLite file holding the jobs, shared by every session and process of the app
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", os.path.join(_ROOT_DIR, "build", "jobs.sqlite3"))
+
+# Number of jobs running at the same time in one process
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "8"))
+
+# Finished jobs are deleted after this many seconds
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", str(30 * 24 * 3600)))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_OWNER_HOST = socket.gethostname()
+
+
+def job_key(operation, documents, parameters):
+    """
+    Computes the key under which identical requests are coalesced.
+
+    Parameters:
+        operation (str): The operation, such as "review_contract".
+        documents (list): The document texts the operation works on.
+        parameters (dict): Every other input that changes the result, such as max_tokens.
+
+    Returns:
+        str: A SHA-256 hex digest of the operation, the hashes of the documents and the parameters.
+    """
+    payload = json.dumps(
+        {
+            "operation": operation,
+            "documents": [hashlib.sha256(document.encode("utf-8")).hexdigest() for document in documents],
+            "parameters": parameters,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _owner_alive(owner):
+    host, _, pid = owner.rpartition(":")
+    if host != _OWNER_HOST:
+        # Processes on other hosts cannot be checked; their jobs are left alone
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class JobStore:
+    """
+    Runs analyses as jobs in a thread pool and keeps their status and results in SQLite.
+
+    A job is keyed by its operation, the hashes of its documents and its parameters. Submitting a request that is
+    identical to a queued or running job returns that job instead of starting a second one, so a double click or a
+    refresh never pays for the same Watsonx call twice. Results are kept by job id, so any session can read them
+    after the one that started the job has ended.
+
+    Jobs whose function returns a generator, such as the stream_* features, expose the text produced so far while
+    they run.
+    """
+
+    def __init__(self, path=JOB_STORE_PATH, max_workers=JOB_WORKERS):
+        self.path = path
+        self.owner = f"{_OWNER_HOST}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._partial = {}
+        self._stats = {"submitted": 0, "coalesced": 0, "done": 0, "failed": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Autocommit, with an explicit write transaction where a check and an insert must not interleave
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, key TEXT NOT NULL, operation TEXT NOT NULL, status TEXT NOT NULL, "
+            "result TEXT, error TEXT, owner TEXT NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_key_status ON jobs (key, status)")
+        self._recover()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def _recover(self):
+        # Jobs of a process that exited will never finish; they are failed so identical requests start afresh
+        now = time.time()
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            for job_id, owner in rows:
+                if not _owner_alive(owner):
+                    self._connection.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                        (FAILED, "Interrupted by a restart", now, job_id),
+                    )
+            if JOB_RETENTION_SECONDS:
+                self._connection.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                    (DONE, FAILED, now - JOB_RETENTION_SECONDS),
+                )
+
+    def submit(self, operation, function, args, documents=(), parameters=None):
+        """
+        Starts `function(*args)` as a job, or returns the queued or running job of an identical request.
+
+        Parameters:
+            operation (str): The operation, also used to show the job on the right page.
+            function (callable): The feature function; its result must be JSON serializable, or a generator of
+                text pieces.
+            args (tuple): The arguments of `function`.
+            documents (list): The document texts, hashed into the job key.
+            parameters (dict): The other inputs that change the result, part of the job key.
+
+        Returns:
+            str: The job id.
+        """
+        key = job_key(operation, list(documents), parameters or {})
+        now = time.time()
+
+        with self._lock:
+            # The write lock is taken up front, so two processes cannot both miss the other's job and insert one
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT id FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY created_at DESC LIMIT 1",
+                    (key, QUEUED, RUNNING),
+                ).fetchone()
+                if row is not None:
+                    self._stats["coalesced"] += 1
+                    return row[0]
+
+                job_id = uuid.uuid4().hex
+                self._connection.execute(
+                    "INSERT INTO jobs (id, key, operation, status, owner, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, key, operation, QUEUED, self.owner, now),
+                )
+            finally:
+                self._connection.execute("COMMIT")
+            self._stats["submitted"] += 1
+
+        self._executor.submit(self._run, job_id, function, args)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _run(self, job_id, function, args):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = function(*args)
+            if isinstance(result, types.GeneratorType):
+                pieces = self._partial.setdefault(job_id, [])
+                for piece in result:
+                    pieces.append(piece)
+                result = "".join(pieces)
+            result = json.dumps(result, ensure_ascii=False)
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=f"{type(e).__name__}: {e}", finished_at=time.time())
+            with self._lock:
+                self._stats["failed"] += 1
+        else:
+            self._update(job_id, status=DONE, result=result, finished_at=time.time())
+            with self._lock:
+                self._stats["done"] += 1
+        finally:
+            self._partial.pop(job_id, None)
+
+    def get(self, job_id):
+        """
+        Returns a job by id.
+
+        Returns:
+            dict: The id, operation, status (queued, running, done or failed), result, error, timestamps and, while
+            a streaming job runs in this process, the text produced so far under "partial"; None for an unknown id.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, operation, status, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(zip(("id", "operation", "status", "result", "error", "created_at", "started_at", "finished_at"), row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["partial"] = "".join(self._partial.get(job_id, ()))
+        return job
+
+    def wait(self, job_id, timeout=None, poll_seconds=0.1):
+        """
+        Blocks until a job is done or failed, for scripts that have nothing else to do.
+
+        Returns:
+            dict: The final job, or its current state when the timeout expires.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in (DONE, FAILED):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_seconds)
+
+    def stats(self):
+        """
+        Returns the number of jobs started, requests coalesced onto a running job, and jobs done and failed in this
+        process.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        """
+        Waits for the running jobs and closes the database.
+        """
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._connection.close()
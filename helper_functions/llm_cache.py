@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import time
+
+from helper_functions.cache import DiskCache, MemoryCache, TieredCache
+from helper_functions.metrics import TOKEN_BUCKETS, increment, observe, span
+from helper_functions.prompt_budget import estimate_tokens
+from helper_functions.resilience import call_with_resilience, stream_with_resilience
+
+
+# Deterministic mode switches every feature to greedy decoding, which is what makes cached answers legitimate. It is
+# opt-in: by default the features keep sampling with their own temperature, top_k and top_p, and are not cached
+DETERMINISTIC_MODE = os.environ.get("LLM_DETERMINISTIC", "false").lower() in ("1", "true", "yes")
+
+# Sampling-only parameters that have no effect under greedy decoding
+_SAMPLING_PARAMETERS = ("temperature", "top_k", "top_p")
+
+
+def _build_response_cache():
+    """
+    Builds the process-wide response cache from environment settings.
+
+    LLM_CACHE_MEMORY_ENTRIES bounds the in-process LRU tier. When LLM_CACHE_DIR is set, an SQLite tier is added
+    in that directory, bounded by LLM_CACHE_TTL_SECONDS and LLM_CACHE_MAX_BYTES.
+
+    Returns:
+        TieredCache: The configured cache.
+    """
+    memory = MemoryCache(max_entries=int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", "256")))
+
+    disk = None
+    cache_dir = os.environ.get("LLM_CACHE_DIR")
+    if cache_dir:
+        disk = DiskCache(
+            os.path.join(cache_dir, "llm_responses.sqlite3"),
+            ttl_seconds=int(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            max_bytes=int(os.environ.get("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
+
+    return TieredCache(memory, disk)
+
+
+_response_cache = _build_response_cache()
+
+
+def apply_decoding_mode(parameters):
+    """
+    Returns the decoding parameters to use, switching to greedy decoding when deterministic mode is enabled.
+
+    Parameters:
+        parameters (dict): The decoding parameters defined by a feature.
+
+    Returns:
+        dict: The parameters unchanged, or a greedy copy without sampling-only settings.
+    """
+    if not DETERMINISTIC_MODE:
+        return parameters
+
+    greedy_parameters = {
+        name: value for name, value in parameters.items() if name not in _SAMPLING_PARAMETERS
+    }
+    greedy_parameters["decoding_method"] = "greedy"
+    return greedy_parameters
+
+
+def response_cache_key(model_id, parameters, prompt):
+    """
+    Computes the content address of a generation request.
+
+    Parameters:
+        model_id (str): The identifier of the Watsonx foundation model.
+        parameters (dict): The decoding parameters for generation.
+        prompt (str): The fully rendered prompt.
+
+    Returns:
+        str: A SHA-256 hex digest of the model id, decoding parameters and prompt.
+    """
+    payload = json.dumps(
+        {"model_id": model_id, "parameters": parameters, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _record_generation(watsonx_llm, response):
+    observe(
+        "completion_tokens", estimate_tokens(response), TOKEN_BUCKETS, "Estimated tokens generated by Watsonx.",
+        model=watsonx_llm.model_id,
+    )
+
+
+def _invoke(watsonx_llm, prompt, rate_limiter=None):
+    """
+    Calls Watsonx through the resilience layer, recording the latency and the generated tokens.
+    """
+    with span("watsonx_generation", model=watsonx_llm.model_id):
+        response = call_with_resilience(
+            watsonx_llm.model_id, lambda: watsonx_llm.invoke(prompt), rate_limiter=rate_limiter
+        )
+    _record_generation(watsonx_llm, response)
+    return response
+
+
+def _stream(watsonx_llm, prompt):
+    """
+    Streams from Watsonx through the resilience layer, recording the time to the first piece, the latency and the
+    generated tokens.
+    """
+    pieces = []
+    with span("watsonx_generation", model=watsonx_llm.model_id):
+        started = time.perf_counter()
+        for piece in stream_with_resilience(watsonx_llm.model_id, lambda: watsonx_llm.stream(prompt)):
+            if not pieces:
+                observe(
+                    "first_token_seconds", time.perf_counter() - started,
+                    description="Seconds until Watsonx streamed the first piece of an answer.",
+                    model=watsonx_llm.model_id,
+                )
+            pieces.append(piece)
+            yield piece
+    _record_generation(watsonx_llm, "".join(pieces))
+
+
+def _count_request(cache):
+    increment("llm_requests", cache=cache, description="LLM requests, by response cache result.")
+
+
+def cached_invoke(watsonx_llm, prompt, rate_limiter=None):
+    """
+    Invokes a WatsonxLLM instance through the response cache.
+
+    Only greedy requests are cached. Sampled generations are not reproducible, so they always go to Watsonx.
+
+    Parameters:
+        watsonx_llm (WatsonxLLM): The model instance to call on a cache miss.
+        prompt (str): The fully rendered prompt.
+        rate_limiter (RateLimiter): An optional limiter acquired before every request sent to Watsonx; cache hits
+            do not take a slot.
+
+    Returns:
+        str: The generated text, served from the cache when an identical request was answered before.
+    """
+    parameters = watsonx_llm.params or {}
+    if parameters.get("decoding_method") != "greedy":
+        _count_request("bypass")
+        return _invoke(watsonx_llm, prompt, rate_limiter)
+
+    key = response_cache_key(watsonx_llm.model_id, parameters, prompt)
+    response = _response_cache.get(key)
+    if response is None:
+        _count_request("miss")
+        response = _invoke(watsonx_llm, prompt, rate_limiter)
+        _response_cache.set(key, response)
+    else:
+        _count_request("hit")
+    return response
+
+
+def cached_stream(watsonx_llm, prompt):
+    """
+    Streams a WatsonxLLM generation through the response cache.
+
+    A cached response is yielded in one piece. Otherwise the text deltas are passed through as Watsonx produces
+    them, and the full response is stored once the stream has completed.
+
+    Parameters:
+        watsonx_llm (WatsonxLLM): The model instance to stream from on a cache miss.
+        prompt (str): The fully rendered prompt.
+
+    Yields:
+        str: Consecutive pieces of the generated text.
+    """
+    parameters = watsonx_llm.params or {}
+    if parameters.get("decoding_method") != "greedy":
+        _count_request("bypass")
+        yield from _stream(watsonx_llm, prompt)
+        return
+
+    key = response_cache_key(watsonx_llm.model_id, parameters, prompt)
+    response = _response_cache.get(key)
+    if response is not None:
+        _count_request("hit")
+        yield response
+        return
+
+    _count_request("miss")
+    pieces = []
+    for piece in _stream(watsonx_llm, prompt):
+        pieces.append(piece)
+        yield piece
+
+    # Only complete generations are cached; an abandoned stream never reaches this point
+    _response_cache.set(key, "".join(pieces))
+
+
+def get_cache_stats():
+    """
+    Returns the hit and miss statistics of the LLM response cache.
+
+    Returns:
+        dict: Memory and disk hits, misses, writes, hit rate and the number of entries in memory.
+    """
+    return _response_cache.stats()
+
+
+def clear_response_cache():
+    """
+    Removes every cached response from all tiers.
+    """
+    _response_cache.clear()
@@ -0,0 +1,92 @@
+import hashlib
+
+
+# Leaves and inner nodes are hashed with different prefixes, so an inner node can never pass as a document
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def _hash_leaf(digest):
+    return hashlib.sha256(_LEAF_PREFIX + digest).digest()
+
+
+def _hash_node(left, right):
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+def build_merkle_tree(digests):
+    """
+    Builds a Merkle tree over document digests.
+
+    A node without a sibling is carried up to the next level unchanged instead of being paired with a copy of itself.
+
+    Parameters:
+        digests (list): The 32-byte digests of the documents, in batch order.
+
+    Returns:
+        list: The levels of the tree from the hashed leaves up to a level holding only the root.
+    """
+    if not digests:
+        raise ValueError("A Merkle tree needs at least one document")
+
+    levels = [[_hash_leaf(digest) for digest in digests]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_hash_node(level[index], level[index + 1]) for index in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+
+    return levels
+
+
+def merkle_root(levels):
+    """
+    Returns the 32-byte root of a tree built with build_merkle_tree.
+    """
+    return levels[-1][0]
+
+
+def merkle_proof(levels, index):
+    """
+    Collects the sibling hashes that connect one document to the root.
+
+    Parameters:
+        levels (list): The tree returned by build_merkle_tree.
+        index (int): The position of the document in the batch.
+
+    Returns:
+        list: One {"sibling": hex, "position": "left" or "right"} step per level where the node has a sibling.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling_index = index ^ 1
+        if sibling_index < len(level):
+            proof.append({
+                "sibling": level[sibling_index].hex(),
+                "position": "left" if sibling_index < index else "right",
+            })
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(digest, proof, root):
+    """
+    Checks that a document digest is part of the tree with the given root.
+
+    Parameters:
+        digest (bytes): The 32-byte digest of the document.
+        proof (list): The steps returned by merkle_proof.
+        root (bytes): The 32-byte root, typically read from the chain.
+
+    Returns:
+        bool: True when the proof leads from the digest to the root.
+    """
+    node = _hash_leaf(digest)
+    for step in proof:
+        sibling = bytes.fromhex(step["sibling"])
+        if step["position"] == "left":
+            node = _hash_node(sibling, node)
+        else:
+            node = _hash_node(node, sibling)
+    return node == root
@@ -0,0 +1,298 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Prefix of every exported metric name
+METRIC_PREFIX = "legalease"
+
+# Histogram bucket upper bounds for durations in seconds, token counts and gas
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+GAS_BUCKETS = (25000, 50000, 100000, 200000, 500000, 1000000, 2000000, 5000000, 10000000)
+
+# When set, the Prometheus text is served on this port at /metrics
+METRICS_PORT = os.environ.get("METRICS_PORT")
+
+# When set, the Prometheus text is written to this file, for node_exporter's textfile collector
+METRICS_FILE = os.environ.get("METRICS_FILE")
+
+# Minimum number of seconds between two writes of METRICS_FILE
+METRICS_FILE_INTERVAL_SECONDS = float(os.environ.get("METRICS_FILE_INTERVAL_SECONDS", "15"))
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_descriptions = {}
+_server = None
+_last_file_write = 0.0
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets, keeping their sum, like a Prometheus histogram.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by interpolating inside the bucket that contains it.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def observe(name, value, buckets=DURATION_BUCKETS, description="", **labels):
+    """
+    Records one observation in a histogram.
+
+    Parameters:
+        name (str): The metric name without the prefix, such as "prompt_tokens".
+        value (float): The observed value.
+        buckets (tuple): The bucket upper bounds, used when the histogram is created.
+        description (str): The help text of the metric.
+        labels: The label values of the series, such as feature="review_contract".
+    """
+    with _lock:
+        key = _key(name, labels)
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+        if description:
+            _descriptions.setdefault(name, description)
+    _maybe_write_file()
+
+
+def increment(name, amount=1, description="", **labels):
+    """
+    Adds to a counter.
+
+    Parameters:
+        name (str): The metric name without the prefix and the "_total" suffix.
+        amount (float): The amount to add.
+        description (str): The help text of the metric.
+        labels: The label values of the series.
+    """
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + amount
+        if description:
+            _descriptions.setdefault(name, description)
+
+
+@contextmanager
+def span(stage, **labels):
+    """
+    Times a block of code as one stage, recorded in the "stage_seconds" histogram with its stage name, its labels and
+    whether it raised.
+
+    Parameters:
+        stage (str): The stage name, such as "pdf_extraction" or "watsonx_generation".
+        labels: Further label values, such as the feature or the model.
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        observe(
+            "stage_seconds", time.perf_counter() - started,
+            description="Duration of each processing stage in seconds.",
+            stage=stage, outcome=outcome, **labels,
+        )
+
+
+def timed(stage, **labels):
+    """
+    Decorates a function so that every call is recorded as a span. For generator functions the span covers the
+    whole iteration, so streamed answers are timed until their last piece.
+    """
+    def decorator(function):
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                with span(stage, **labels):
+                    yield from function(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage, **labels):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def get_metrics():
+    """
+    Summarizes the recorded histograms and counters, for the admin page.
+
+    Returns:
+        dict: Under "histograms", one entry per series with its name, labels, count, sum, mean and estimated
+        median and 95th percentile; under "counters", one entry per series with its name, labels and value.
+    """
+    with _lock:
+        histograms = [
+            {
+                "name": name,
+                "labels": dict(labels),
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+            }
+            for (name, labels), histogram in sorted(_histograms.items())
+        ]
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+    return {"histograms": histograms, "counters": counters}
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (label, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for label, value in pairs
+    )
+    return "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+
+def render_prometheus():
+    """
+    Renders every metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics, one HELP and TYPE header per metric name followed by its series.
+    """
+    lines = []
+    with _lock:
+        described = set()
+        for (name, labels), histogram in sorted(_histograms.items()):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {full_name} {_descriptions.get(name, name)}")
+                lines.append(f"# TYPE {full_name} histogram")
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in sorted(_counters.items()):
+            full_name = f"{METRIC_PREFIX}_{name}_total"
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {full_name} {_descriptions.get(name, name)}")
+                lines.append(f"# TYPE {full_name} counter")
+            lines.append(f"{full_name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path=METRICS_FILE):
+    """
+    Writes the Prometheus text to a file, replacing it atomically so a collector never reads half a file.
+
+    Parameters:
+        path (str): The file to write.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as metrics_file:
+        metrics_file.write(render_prometheus())
+    os.replace(temporary_path, path)
+
+
+def _maybe_write_file():
+    global _last_file_write
+    if not METRICS_FILE:
+        return
+    now = time.monotonic()
+    with _lock:
+        if now - _last_file_write < METRICS_FILE_INTERVAL_SECONDS:
+            return
+        _last_file_write = now
+    write_metrics_file(METRICS_FILE)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """
+    Serves the Prometheus text at /metrics from a background thread; later calls reuse the running server.
+
+    Parameters:
+        port (int): The port to listen on; nothing is started when it is None.
+
+    Returns:
+        ThreadingHTTPServer: The running server, or None.
+    """
+    global _server
+    if port is None:
+        return None
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
+
+
+def reset_metrics():
+    """
+    Clears every recorded histogram and counter.
+    """
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
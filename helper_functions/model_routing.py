@@ -0,0 +1,307 @@
+import copy
+import json
+import os
+import re
+import threading
+import time
+
+from helper_functions.llm_cache import cached_invoke, cached_stream
+from helper_functions.metrics import TOKEN_BUCKETS, increment, observe
+from helper_functions.prompt_budget import estimate_tokens
+
+
+# Model tiers and the route of every feature through them. A JSON file named by MODEL_ROUTING_CONFIG is merged
+# over these defaults, tier by tier and feature by feature, so a deployment only has to list what it changes.
+#
+# A tier names a Watsonx model and its list price per 1000 tokens, used to report the cost of each tier.
+# A route lists the tiers tried in order; a tier with "max_input_tokens" is skipped for longer inputs. The answer
+# of every tier but the last one is validated, and a failed check escalates the request to the next tier.
+# The generation budget grows with the input from "min" by "per_input_token" up to "max", and never exceeds the
+# max_tokens asked for by the caller.
+DEFAULT_ROUTING = {
+    "tiers": {
+        "small": {"model_id": os.environ.get("LLM_SMALL_MODEL", "ibm/granite-3-8b-instruct"), "cost_per_1k_tokens": 0.0002},
+        "large": {"model_id": os.environ.get("LLM_LARGE_MODEL", "ibm/granite-13b-chat-v2"), "cost_per_1k_tokens": 0.0006},
+    },
+    "features": {
+        "categorize_document": {
+            "tiers": [{"tier": "small", "max_input_tokens": 6000}, {"tier": "large"}],
+            "max_new_tokens": {"min": 150, "max": 250, "per_input_token": 0.0},
+            # Any document type is a valid answer, so only the answer's format is checked
+            "validation": {"min_words": 8, "pattern": r"^\W*document type\W*:\W*\w"},
+        },
+        "suggest_clauses": {
+            "tiers": [{"tier": "small", "max_input_tokens": 3000}, {"tier": "large"}],
+            "max_new_tokens": {"min": 300, "max": 800, "per_input_token": 0.2},
+            "validation": {"min_words": 60, "required_terms": [["clause"]]},
+        },
+        "monitor_compliance": {
+            "tiers": [{"tier": "small", "max_input_tokens": 3000}, {"tier": "large"}],
+            "max_new_tokens": {"min": 300, "max": 800, "per_input_token": 0.2},
+            "validation": {"min_words": 60, "required_terms": [["complian"]]},
+        },
+        "compare_documents": {
+            "tiers": [{"tier": "small", "max_input_tokens": 2000}, {"tier": "large"}],
+            "max_new_tokens": {"min": 200, "max": 800, "per_input_token": 0.3},
+            "validation": {"min_words": 40, "required_terms": [["change", "difference", "modified", "added", "removed"]]},
+        },
+        "review_contract": {
+            "tiers": [{"tier": "large"}],
+            "max_new_tokens": {"min": 400, "max": 1000, "per_input_token": 0.25},
+        },
+        "draft_contract": {
+            "tiers": [{"tier": "large"}],
+            "max_new_tokens": {"min": 250, "max": 800, "per_input_token": 1.0},
+        },
+    },
+}
+
+# Route of features that are not configured
+DEFAULT_ROUTE = {
+    "tiers": [{"tier": "large"}],
+    "max_new_tokens": {"min": 100, "max": 1000, "per_input_token": 0.25},
+}
+
+# Answers in which fewer than this share of the three word sequences are distinct are stuck in a loop. Legal prose
+# repeats single words a lot, so whole sequences are counted.
+MIN_DISTINCT_TRIGRAM_SHARE = 0.5
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+_stats_lock = threading.Lock()
+_tier_stats = {}
+
+
+def _merge(defaults, overrides):
+    merged = copy.deepcopy(defaults)
+    for name, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(name), dict):
+            merged[name] = _merge(merged[name], value)
+        else:
+            merged[name] = value
+    return merged
+
+
+def load_routing_config(path=None):
+    """
+    Returns the routing configuration: DEFAULT_ROUTING with the JSON file at `path` merged over it.
+
+    Parameters:
+        path (str): The configuration file; None uses MODEL_ROUTING_CONFIG, and without either the defaults apply.
+
+    Returns:
+        dict: The tiers under "tiers" and the routes under "features".
+    """
+    path = path or os.environ.get("MODEL_ROUTING_CONFIG")
+    if not path:
+        return copy.deepcopy(DEFAULT_ROUTING)
+    with open(path, encoding="utf-8") as config_file:
+        return _merge(DEFAULT_ROUTING, json.load(config_file))
+
+
+_routing = load_routing_config()
+
+
+def set_routing_config(config):
+    """
+    Replaces the routing configuration of the process, such as with the result of load_routing_config.
+    """
+    global _routing
+    _routing = config
+
+
+def _generation_budget(budget, input_tokens, max_tokens):
+    tokens = budget["min"] + budget.get("per_input_token", 0.0) * input_tokens
+    tokens = int(min(budget["max"], tokens))
+    if max_tokens is not None:
+        tokens = min(tokens, int(max_tokens))
+    return max(1, tokens)
+
+
+def plan_route(feature, input_text, max_tokens=None):
+    """
+    Chooses the model tiers and the generation budget of a request from the routing configuration.
+
+    Parameters:
+        feature (str): The feature, such as "categorize_document".
+        input_text (str): The document or other input that dominates the prompt; its size selects the tiers.
+        max_tokens (int): The most tokens the caller wants generated, or None to leave it to the route.
+
+    Returns:
+        dict: The feature, the estimated input tokens, the tiers to try in order with their model ids under
+        "tiers" and "models", and the max_new_tokens shared by every tier.
+    """
+    route = _routing["features"].get(feature, DEFAULT_ROUTE)
+    input_tokens = estimate_tokens(input_text)
+
+    # Tiers that are limited to short inputs are left out for long ones; the last tier always remains
+    steps = route["tiers"]
+    tiers = [
+        step["tier"] for step in steps[:-1]
+        if step.get("max_input_tokens") is None or input_tokens <= step["max_input_tokens"]
+    ]
+    tiers.append(steps[-1]["tier"])
+
+    return {
+        "feature": feature,
+        "input_tokens": input_tokens,
+        "tiers": tiers,
+        "models": [_routing["tiers"][tier]["model_id"] for tier in tiers],
+        "max_new_tokens": _generation_budget(route["max_new_tokens"], input_tokens, max_tokens),
+    }
+
+
+def validate_response(feature, response):
+    """
+    Checks whether an answer is good enough to be returned without asking a larger model.
+
+    An answer fails when it has fewer than the configured "min_words", when it keeps repeating the same passage,
+    when no word in it starts with any term of one of the "required_terms" groups, so "clause" also finds "clauses",
+    or when no line matches the regular expression "pattern", compared case-insensitively.
+
+    Parameters:
+        feature (str): The feature whose validation settings apply.
+        response (str): The generated answer.
+
+    Returns:
+        str: None for an acceptable answer, otherwise the reason it failed.
+    """
+    validation = _routing["features"].get(feature, DEFAULT_ROUTE).get("validation", {})
+    words = _WORD_RE.findall(response.lower())
+
+    if len(words) < validation.get("min_words", 1):
+        return "too_short"
+    trigrams = list(zip(words, words[1:], words[2:]))
+    if trigrams and len(set(trigrams)) < MIN_DISTINCT_TRIGRAM_SHARE * len(trigrams):
+        return "repetitive"
+    present = set(words)
+    for terms in validation.get("required_terms", ()):
+        if not any(word.startswith(term) for word in present for term in terms):
+            return "missing_terms"
+    if "pattern" in validation and not re.search(validation["pattern"], response, re.IGNORECASE | re.MULTILINE):
+        return "wrong_format"
+    return None
+
+
+def _record_tier(route, tier, prompt, response, seconds, outcome):
+    model_cost = _routing["tiers"][tier].get("cost_per_1k_tokens", 0.0)
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(response) if response else 0
+    cost = (prompt_tokens + completion_tokens) / 1000 * model_cost
+    labels = {"feature": route["feature"], "tier": tier}
+
+    observe("tier_seconds", seconds, description="Seconds spent on a model tier.", outcome=outcome, **labels)
+    observe("tier_completion_tokens", completion_tokens, TOKEN_BUCKETS, "Estimated tokens generated by a model tier.", **labels)
+    increment("tier_calls", description="Calls to a model tier, by outcome.", outcome=outcome, **labels)
+    increment("tier_tokens", prompt_tokens + completion_tokens, "Estimated prompt and generated tokens per model tier.", **labels)
+    increment("tier_cost", cost, "Estimated cost of the calls to a model tier at list price.", **labels)
+
+    with _stats_lock:
+        stats = _tier_stats.setdefault((route["feature"], tier), {
+            "calls": 0, "accepted": 0, "escalated": 0, "failed": 0, "seconds": 0.0,
+            "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0,
+        })
+        stats["calls"] += 1
+        stats[outcome] += 1
+        stats["seconds"] += seconds
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["cost"] += cost
+
+
+def _try_tier(route, tier, watsonx_llm, prompt, is_last, rate_limiter=None):
+    """
+    Calls one tier of a route and returns its answer, or None when the request has to go to the next tier.
+    """
+    started = time.perf_counter()
+    try:
+        response = cached_invoke(watsonx_llm, prompt, rate_limiter)
+    except Exception:
+        _record_tier(route, tier, prompt, None, time.perf_counter() - started, "failed")
+        if is_last:
+            raise
+        reason = "error"
+        response = None
+    else:
+        reason = None if is_last else validate_response(route["feature"], response)
+        outcome = "escalated" if reason else "accepted"
+        _record_tier(route, tier, prompt, response, time.perf_counter() - started, outcome)
+
+    if reason is None:
+        return response
+    increment("tier_escalations", description="Requests passed on to the next model tier, by reason.", feature=route["feature"], tier=tier, reason=reason)
+    return None
+
+
+def routed_invoke(route, watsonx_llms, prompt, rate_limiter=None):
+    """
+    Sends a prompt through the tiers of a route, from the smallest model to the largest, until one gives an
+    acceptable answer.
+
+    Parameters:
+        route (dict): The route returned by plan_route.
+        watsonx_llms (list): One WatsonxLLM instance per tier of the route, in the same order.
+        prompt (str): The fully rendered prompt.
+        rate_limiter (RateLimiter): An optional limiter acquired before every Watsonx request of every tier.
+
+    Returns:
+        str: The first answer that passes validate_response, or the answer of the last tier.
+    """
+    for index, (tier, watsonx_llm) in enumerate(zip(route["tiers"], watsonx_llms)):
+        response = _try_tier(route, tier, watsonx_llm, prompt, index == len(route["tiers"]) - 1, rate_limiter)
+        if response is not None:
+            return response
+
+
+def routed_stream(route, watsonx_llms, prompt):
+    """
+    Streams the answer of routed_invoke.
+
+    The answers of the smaller tiers have to be validated before they are shown, so they are generated in full and
+    yielded in one piece; only the last tier is streamed as it is generated.
+
+    Parameters:
+        route (dict): The route returned by plan_route.
+        watsonx_llms (list): One WatsonxLLM instance per tier of the route, in the same order.
+        prompt (str): The fully rendered prompt.
+
+    Yields:
+        str: Consecutive pieces of the answer.
+    """
+    for tier, watsonx_llm in zip(route["tiers"][:-1], watsonx_llms[:-1]):
+        response = _try_tier(route, tier, watsonx_llm, prompt, False)
+        if response is not None:
+            yield response
+            return
+
+    tier = route["tiers"][-1]
+    pieces = []
+    started = time.perf_counter()
+    try:
+        for piece in cached_stream(watsonx_llms[-1], prompt):
+            pieces.append(piece)
+            yield piece
+    except Exception:
+        _record_tier(route, tier, prompt, "".join(pieces), time.perf_counter() - started, "failed")
+        raise
+    _record_tier(route, tier, prompt, "".join(pieces), time.perf_counter() - started, "accepted")
+
+
+def get_routing_stats():
+    """
+    Returns what every model tier did per feature.
+
+    Returns:
+        dict: Keyed by (feature, tier), the calls, the calls whose answer was accepted, escalated to the next tier or
+        failed, the seconds spent, the estimated prompt and generated tokens and their estimated cost.
+    """
+    with _stats_lock:
+        return {key: dict(stats) for key, stats in _tier_stats.items()}
+
+
+def reset_routing_stats():
+    """
+    Clears the recorded tier statistics.
+    """
+    with _stats_lock:
+        _tier_stats.clear()
@@ -1,20 +1,76 @@
-import markdown
-from bs4 import BeautifulSoup
-
 import re
 
-def normalize_text(text):
+from helper_functions.metrics import timed
+
+
+# A line break as markdown sees it
+_NEWLINE = r'(?:\r\n|\r(?!\n)|\n)'
+
+# The content of a line that counts as blank; code blocks run on across lines of any whitespace
+_BLANK = r'[^\S\r\n]*'
+
+_LIST_MARKER = r'[ \t]*(?:\d+\.|[*+-])[ \t]'
+
+# Markdown syntax is everything that markdown.markdown followed by BeautifulSoup.get_text turns into something other
+# than the same text with different whitespace. Text without any of it is normalized by collapsing whitespace alone,
+# which gives a byte-identical result; text with any of it goes through markdown as before. Each pattern starts with
+# a literal or a character class so the regex engine can skip ahead to candidates.
+
+# Emphasis, code spans, escapes, HTML and control characters
+_SYNTAX_CHARACTERS = re.compile(r'[*`\\<\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+# Character references, which get_text decodes even without a semicolon
+_CHARACTER_REFERENCE = re.compile(r'&(?:#|[a-zA-Z0-9]+;)')
+
+# Underscores that can open or close emphasis, also next to a line break, which becomes a <br /> placeholder
+_EMPHASIS_UNDERSCORE = re.compile(r'[^\s_]_|_[^\s_]|_[ \t]+[\r\n]|[ \t][\r\n]+[ \t]*_')
+
+# Headings, block quotes, horizontal rules, setext underlines and lists after a blank line or a code block, matched
+# from the end of the line break before them
+_BLOCK_SYNTAX = re.compile(
+    r'(?:\n|\r(?!\n))(?:'
+    r'[ \t]*[#>]'
+    r'|[ \t]*[-=_*][-=_* \t]*(?=[\r\n]|\Z)'
+    rf'|{_BLANK}{_NEWLINE}(?:{_BLANK}{_NEWLINE})*{_LIST_MARKER}'
+    rf'|(?:[ ]{{4}}|[ ]{{0,3}}\t)[^\r\n]*{_NEWLINE}{_LIST_MARKER}'
+    r')'
+)
+
+_UNDERSCORES = re.compile(r'_+')
+
+
+def _has_markdown_syntax(text):
     """
-    Converts markdown text to plain text and normalizes it by removing special characters,
-    excessive spaces, and standardizing the format for case-insensitive comparison.
+    Checks text for markdown syntax. The text must start with the line break, or the line and line break, that
+    precede it, since whether a line starts a block depends on the line before; a document starts like after a
+    blank line.
+    """
+    return (
+        _SYNTAX_CHARACTERS.search(text) is not None
+        or ("&" in text and _CHARACTER_REFERENCE.search(text) is not None)
+        or ("_" in text and _EMPHASIS_UNDERSCORE.search(text) is not None)
+        or "](" in text
+        or "]:" in text
+        or _BLOCK_SYNTAX.search(text) is not None
+    )
 
-    Parameters:
-        text (str): The markdown text to be normalized.
 
-    Returns:
-        str: The normalized plain text.
+def _collapse(text):
+    # Same whitespace set as re's \s, so this equals re.sub(r'\s+', ' ', text).strip()
+    plain_text = " ".join(text.split()).lower()
+    if "_" in plain_text:
+        plain_text = _UNDERSCORES.sub('[underscore]', plain_text)
+    return plain_text
 
+
+def _normalize_markdown(text):
+    """
+    Normalizes text that contains markdown syntax by rendering it and extracting the text again.
     """
+    # Only documents with markdown syntax need these, so they are imported on first use
+    import markdown
+    from bs4 import BeautifulSoup
+
     # Convert markdown to plain text
     html_content = markdown.markdown(text)
 
@@ -31,4 +87,121 @@ def normalize_text(text):
     # replace sequences of underscore with a placeholder
     plain_text = re.sub(r'_+', '[underscore]', plain_text)
 
-    return plain_text
\ No newline at end of file
+    return plain_text
+
+
+@timed("normalization")
+def normalize_text(text):
+    """
+    Converts markdown text to plain text and normalizes it by removing special characters,
+    excessive spaces, and standardizing the format for case-insensitive comparison.
+
+    Text extracted from PDFs rarely contains markdown syntax; such text is normalized in a single pass without
+    rendering it, with the same result.
+
+    Parameters:
+        text (str): The markdown text to be normalized.
+
+    Returns:
+        str: The normalized plain text.
+
+    """
+    if _has_markdown_syntax("\n\n" + text):
+        return _normalize_markdown(text)
+
+    return _collapse(text)
+
+
+class StreamingNormalizer:
+    """
+    Normalizes a document page by page, returning the normalized text of every completed line as soon as it arrives.
+
+    The chunks returned by `feed` and `finish` concatenate to normalize_text of the whole document. Once markdown
+    syntax, or a "[" that a later reference definition could turn into a link, is seen, nothing more is returned
+    until `finish` normalizes the rest from the complete text.
+    """
+
+    def __init__(self):
+        self._pages = []
+        self._pending = ""
+        self._last_line = None
+        self._streaming = True
+        self._emitted_length = 0
+
+    def _context(self):
+        # Whether a line starts a new block depends on the line before it; the document starts like after a blank line
+        if self._last_line is None:
+            return "\n\n"
+        return "\n" + self._last_line + "\n"
+
+    def _emit(self, plain_text):
+        if not plain_text:
+            return ""
+        if self._emitted_length:
+            plain_text = " " + plain_text
+        self._emitted_length += len(plain_text)
+        return plain_text
+
+    def feed(self, page_text):
+        """
+        Adds the next page of the document.
+
+        Parameters:
+            page_text (str): The text of the page, as extracted.
+
+        Returns:
+            str: The normalized text that became final with this page, possibly empty.
+        """
+        self._pages.append(page_text)
+        if not self._streaming:
+            return ""
+
+        # Lines are only emitted once complete, since headings, rules and lists are recognized by whole lines
+        text = self._pending + page_text
+        line_end = text.rfind("\n") + 1
+        complete, self._pending = text[:line_end], text[line_end:]
+        if not complete:
+            return ""
+
+        if "[" in complete or _has_markdown_syntax(self._context() + complete):
+            self._streaming = False
+            return ""
+
+        self._last_line = complete[complete.rfind("\n", 0, len(complete) - 1) + 1:-1]
+
+        return self._emit(_collapse(complete))
+
+    def finish(self):
+        """
+        Completes the document.
+
+        Returns:
+            str: The rest of the normalized text.
+        """
+        if self._streaming:
+            if not _has_markdown_syntax(self._context() + self._pending):
+                return self._emit(_collapse(self._pending))
+
+        plain_text = normalize_text("".join(self._pages))
+        return plain_text[self._emitted_length:]
+
+
+def normalize_pages(pages):
+    """
+    Normalizes a document given as a sequence of pages, yielding normalized text as pages arrive.
+
+    Parameters:
+        pages (iterable): The text of each page, for example from iter_page_texts.
+
+    Yields:
+        str: Chunks that concatenate to normalize_text of the joined pages.
+    """
+    normalizer = StreamingNormalizer()
+    for page_text in pages:
+        plain_text = normalizer.feed(page_text)
+        if plain_text:
+            yield plain_text
+
+    plain_text = normalizer.finish()
+    if plain_text:
+        yield plain_text
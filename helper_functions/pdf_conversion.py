@@ -1,4 +1,7 @@
+import hashlib
+import os
 from io import BytesIO
+from itertools import islice
 
 import markdown2
 
@@ -9,28 +12,20 @@ from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_LEFT
 from bs4 import BeautifulSoup
 
-def save_to_pdf(markdown_text):
-    """
-    Converts markdown text to a PDF document using ReportLab.
+from helper_functions.cache import DiskCache, MemoryCache, TieredCache
 
-    Parameters:
-        markdown_text (str): The input text in markdown format to be converted to a PDF.
 
-    Returns:
-        BytesIO: A file-like object containing the generated PDF, ready for saving or further processing.
-    """
+# Markdown is converted in blocks of about this many characters, so large documents are never held as HTML at once
+MARKDOWN_BLOCK_CHARS = int(os.environ.get("PDF_MARKDOWN_BLOCK_CHARS", "20000"))
 
-    # Convert markdown to HTML
-    html_text = markdown2.markdown(markdown_text)
-    
-    # Parse the HTML to plain text while keeping the tags
-    soup = BeautifulSoup(html_text, "html.parser")
+# Paragraphs handed to ReportLab at a time
+STORY_WINDOW = 256
 
-    # Create a ReportLab document
-    pdf_output = BytesIO()
-    doc = SimpleDocTemplate(pdf_output, pagesize=letter)
 
-    # Define ReportLab styles
+def _build_styles():
+    """
+    Builds the ReportLab paragraph styles once per process.
+    """
     styles = getSampleStyleSheet()
     custom_style = ParagraphStyle(
         name="Custom",
@@ -40,34 +35,169 @@ def save_to_pdf(markdown_text):
         spaceAfter=10,  # Space after each paragraph
         preserveWhiteSpace=True  # Preserve spaces
     )
+    return {"h1": styles["Heading1"], "heading": styles["Heading2"], "body": custom_style}
+
+
+_styles = _build_styles()
+
+
+def _build_pdf_cache():
+    """
+    Builds the process-wide cache of rendered PDFs from environment settings.
+
+    PDF_CACHE_ENTRIES bounds the in-memory tier. When PDF_CACHE_DIR is set, an SQLite tier is added in that
+    directory, bounded by PDF_CACHE_TTL_SECONDS and PDF_CACHE_MAX_BYTES.
+
+    Returns:
+        TieredCache: The configured cache.
+    """
+    memory = MemoryCache(max_entries=int(os.environ.get("PDF_CACHE_ENTRIES", "16")))
+
+    disk = None
+    cache_dir = os.environ.get("PDF_CACHE_DIR")
+    if cache_dir:
+        disk = DiskCache(
+            os.path.join(cache_dir, "rendered_pdfs.sqlite3"),
+            ttl_seconds=int(os.environ.get("PDF_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            max_bytes=int(os.environ.get("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
+
+    return TieredCache(memory, disk, encode=bytes, decode=bytes)
 
-    # Create a list to hold the content
-    story = []
 
-    # Convert each part of the HTML content to a ReportLab Paragraph
-    for element in soup:
-        if element.name in ["h1", "h2", "h3", "h4", "h5", "h6"]:
-            style = styles["Heading1"] if element.name == "h1" else styles["Heading2"]
-        else:
-            style = custom_style
+# Rendered PDF bytes keyed by the SHA-256 of the markdown, so a draft is rendered once however often the page reruns
+_pdf_cache = _build_pdf_cache()
 
-        text = str(element)
 
-        # Handle multiple newlines by adding Spacer elements
-        if element.name == 'br':
-            story.append(Spacer(1, 12))
-        else:
-            paragraphs = text.split('\n')
-            for para in paragraphs:
+def _markdown_blocks(markdown_text):
+    """
+    Splits markdown into blocks of about MARKDOWN_BLOCK_CHARS characters at blank lines outside fenced code.
+    """
+    block = []
+    size = 0
+    in_fence = False
+    for line in markdown_text.splitlines(keepends=True):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        block.append(line)
+        size += len(line)
+        if size >= MARKDOWN_BLOCK_CHARS and not in_fence and not line.strip():
+            yield "".join(block)
+            block = []
+            size = 0
+    if block:
+        yield "".join(block)
+
+
+def _iter_flowables(markdown_text):
+    """
+    Yields the ReportLab flowables of a markdown document, converting one block at a time.
+    """
+    for markdown_block in _markdown_blocks(markdown_text):
+        # Convert markdown to HTML
+        html_text = markdown2.markdown(markdown_block)
+
+        # Parse the HTML to plain text while keeping the tags
+        soup = BeautifulSoup(html_text, "html.parser")
+
+        # Convert each part of the HTML content to a ReportLab Paragraph
+        for element in soup:
+            if element.name == "h1":
+                style = _styles["h1"]
+            elif element.name in ["h2", "h3", "h4", "h5", "h6"]:
+                style = _styles["heading"]
+            else:
+                style = _styles["body"]
+
+            # Handle multiple newlines by adding Spacer elements
+            if element.name == 'br':
+                yield Spacer(1, 12)
+                continue
+
+            for para in str(element).split('\n'):
                 if para.strip():  # If the paragraph has content
-                    story.append(Paragraph(para, style))
+                    yield Paragraph(para, style)
                 else:
-                    story.append(Spacer(1, 12))  # Add space for empty lines
+                    yield Spacer(1, 12)  # Add space for empty lines
+
+
+class _StoryWindow(list):
+    """
+    The story passed to ReportLab, holding only the next STORY_WINDOW flowables.
+
+    ReportLab consumes the story from the front and checks its length before every flowable; the window is refilled
+    from the generator at that point, so memory stays bounded and removing the first flowable stays cheap.
+    """
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._flowables = flowables
+        self._refill()
+
+    def _refill(self):
+        self.extend(islice(self._flowables, STORY_WINDOW - list.__len__(self)))
+
+    def __len__(self):
+        if list.__len__(self) < STORY_WINDOW // 2:
+            self._refill()
+        return list.__len__(self)
+
+
+def render_pdf(markdown_text):
+    """
+    Renders markdown text to PDF bytes with ReportLab, without caching.
+
+    Parameters:
+        markdown_text (str): The input text in markdown format.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    # Create a ReportLab document
+    pdf_output = BytesIO()
+    doc = SimpleDocTemplate(pdf_output, pagesize=letter)
 
     # Build the PDF document
-    doc.build(story)
+    doc.build(_StoryWindow(_iter_flowables(markdown_text)))
+
+    return pdf_output.getvalue()
+
+
+def save_to_pdf(markdown_text):
+    """
+    Converts markdown text to a PDF document using ReportLab.
+
+    Rendered documents are cached by the SHA-256 of the markdown, so showing the download button again after a rerun
+    does not render the document again.
+
+    Parameters:
+        markdown_text (str): The input text in markdown format to be converted to a PDF.
+
+    Returns:
+        BytesIO: A file-like object containing the generated PDF, ready for saving or further processing.
+    """
+    key = hashlib.sha256(markdown_text.encode("utf-8")).hexdigest()
+    pdf_bytes = _pdf_cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = render_pdf(markdown_text)
+        _pdf_cache.set(key, pdf_bytes)
 
-    # Move the pointer to the start of the file
-    pdf_output.seek(0)
+    # Every caller gets its own file object positioned at the start
+    return BytesIO(pdf_bytes)
 
-    return pdf_output
\ No newline at end of file
+
+def get_pdf_cache_stats():
+    """
+    Returns the hit and miss statistics of the rendered PDF cache.
+
+    Returns:
+        dict: Memory and disk hits, misses, writes, hit rate and the number of documents held in memory.
+    """
+    return _pdf_cache.stats()
+
+
+def clear_pdf_cache():
+    """
+    Removes every cached PDF from all tiers.
+    """
+    _pdf_cache.clear()
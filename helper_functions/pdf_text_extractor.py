@@ -1,6 +1,206 @@
-from PyPDF2 import PdfReader
+import hashlib
+import os
+import threading
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 
+from PyPDF2 import PdfReader
+
+from helper_functions.cache import DiskCache, MemoryCache, TieredCache
+from helper_functions.metrics import increment, span
+
+
+# Documents with at least this many pages are extracted by a pool of worker processes
+PARALLEL_PAGE_THRESHOLD = int(os.environ.get("PDF_PARALLEL_PAGE_THRESHOLD", "64"))
+
+# Number of worker processes used for large documents
+EXTRACTION_WORKERS = int(os.environ.get("PDF_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _build_extraction_cache():
+    """
+    Builds the process-wide cache of extracted page texts from environment settings.
+
+    EXTRACTION_CACHE_ENTRIES bounds the in-memory tier. When EXTRACTION_CACHE_DIR is set, an SQLite tier is added
+    in that directory, bounded by EXTRACTION_CACHE_TTL_SECONDS and EXTRACTION_CACHE_MAX_BYTES.
+
+    Returns:
+        TieredCache: The configured cache.
+    """
+    memory = MemoryCache(max_entries=int(os.environ.get("EXTRACTION_CACHE_ENTRIES", "64")))
+
+    disk = None
+    cache_dir = os.environ.get("EXTRACTION_CACHE_DIR")
+    if cache_dir:
+        disk = DiskCache(
+            os.path.join(cache_dir, "pdf_extractions.sqlite3"),
+            ttl_seconds=int(os.environ.get("EXTRACTION_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+            max_bytes=int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+        )
+
+    return TieredCache(memory, disk)
+
+
+# Extracted pages keyed by the SHA-256 of the PDF bytes, shared by every feature, rerun and session
+_extraction_cache = _build_extraction_cache()
+
+
+def _get_process_pool():
+    """
+    Returns the shared extraction process pool, starting it on first use.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+        return _process_pool
+
+
+def _read_pdf_bytes(file):
+    """
+    Returns the full content of an uploaded file without creating an intermediate copy when possible.
+    """
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return file.read()
+
+
+def _extract_page_range(pdf_bytes, start, stop):
+    """
+    Extracts the text of pages [start, stop) in a worker process.
+    """
+    pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    return [pdf_reader.pages[page_num].extract_text() or "" for page_num in range(start, stop)]
+
+
+def pdf_digest(pdf_bytes):
+    """
+    Computes the content hash that identifies a PDF in the extraction cache.
+
+    Parameters:
+        pdf_bytes (bytes): The raw PDF document.
+
+    Returns:
+        str: The SHA-256 hex digest of the document.
+    """
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def iter_page_texts(file):
+    """
+    Yields the text of a PDF page by page, so streaming consumers can start before the whole document is parsed.
+
+    Documents that were extracted before are served from the extraction cache.
+
+    Parameters:
+        file (file-like object): A file-like object containing the PDF, readable in binary mode.
+
+    Yields:
+        str: The extracted text of each page in order, an empty string for pages without text.
+    """
+    pdf_bytes = _read_pdf_bytes(file)
+    cached_pages = _extraction_cache.get(pdf_digest(pdf_bytes))
+    if cached_pages is not None:
+        yield from cached_pages
+        return
+
+    pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    for page in pdf_reader.pages:
+        yield page.extract_text() or ""
+
+
+def extract_pages(file):
+    """
+    Extracts the text of every page of a PDF, fanning large documents out across worker processes.
+
+    Results are cached by the SHA-256 of the PDF bytes, so a document is parsed once no matter how many features,
+    reruns or sessions use it.
+
+    Parameters:
+        file (file-like object): A file-like object containing the PDF, readable in binary mode.
+
+    Returns:
+        list: The extracted text of each page in order.
+    """
+    pdf_bytes = _read_pdf_bytes(file)
+    digest = pdf_digest(pdf_bytes)
+
+    cached_pages = _extraction_cache.get(digest)
+    if cached_pages is not None:
+        increment("pdf_extractions", cache="hit", description="PDF extractions, by extraction cache result.")
+        return list(cached_pages)
+
+    increment("pdf_extractions", cache="miss", description="PDF extractions, by extraction cache result.")
+    with span("pdf_extraction"):
+        pages = _extract_pages_uncached(pdf_bytes)
+    _extraction_cache.set(digest, pages)
+    return pages
+
+
+def _extract_pages_uncached(pdf_bytes):
+    """
+    Parses the PDF bytes and extracts every page, in worker processes for large documents.
+    """
+    pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    page_count = len(pdf_reader.pages)
+
+    if page_count < PARALLEL_PAGE_THRESHOLD or EXTRACTION_WORKERS < 2:
+        return [page.extract_text() or "" for page in pdf_reader.pages]
+
+    # Contiguous page ranges keep the per-task overhead of re-opening the PDF small
+    range_size = -(-page_count // EXTRACTION_WORKERS)
+    ranges = [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+
+    pool = _get_process_pool()
+    futures = [pool.submit(_extract_page_range, pdf_bytes, start, stop) for start, stop in ranges]
+
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def extract_text_with_pages(file):
+    """
+    Extracts the text of a PDF together with the character offset at which each page starts.
+
+    Parameters:
+        file (file-like object): A file-like object containing the PDF, readable in binary mode.
+
+    Returns:
+        tuple: The text of the entire PDF and a list with the start offset of every page in that text.
+    """
+    pages = extract_pages(file)
+
+    page_offsets = []
+    offset = 0
+    for page_text in pages:
+        page_offsets.append(offset)
+        offset += len(page_text)
+
+    return "".join(pages), page_offsets
+
+
+def page_for_offset(page_offsets, offset):
+    """
+    Finds the page a character of the extracted text belongs to.
+
+    Parameters:
+        page_offsets (list): The page start offsets returned by extract_text_with_pages.
+        offset (int): A character offset in the extracted text.
+
+    Returns:
+        int: The 1-based page number.
+    """
+    return max(bisect_right(page_offsets, offset), 1)
+
+
 def extract_text_from_pdf(file):
     """
     Extracts text from a PDF file using PyPDF2.
@@ -12,9 +212,22 @@ def extract_text_from_pdf(file):
         str: A string containing the extracted text from the entire PDF.
 
     """
-    pdf_reader = PdfReader(BytesIO(file.read()))
-    text = ""
-    for page_num in range(len(pdf_reader.pages)):
-        page = pdf_reader.pages[page_num]
-        text += page.extract_text() or ""
-    return text
\ No newline at end of file
+    # Page texts are joined once instead of growing one string page by page
+    return "".join(extract_pages(file))
+
+
+def get_extraction_cache_stats():
+    """
+    Returns the hit and miss statistics of the extraction cache.
+
+    Returns:
+        dict: Memory and disk hits, misses, writes, hit rate and the number of documents held in memory.
+    """
+    return _extraction_cache.stats()
+
+
+def clear_extraction_cache():
+    """
+    Removes every cached extraction from all tiers.
+    """
+    _extraction_cache.clear()
@@ -0,0 +1,291 @@
+import math
+import os
+import re
+import threading
+from collections import defaultdict, deque
+
+from helper_functions.metrics import TOKEN_BUCKETS, observe, span
+
+
+# Context window shared by the prompt and the generated tokens; 8192 is that of ibm/granite-13b-chat-v2, the smallest
+# of the default model tiers
+CONTEXT_WINDOW_TOKENS = int(os.environ.get("PROMPT_CONTEXT_TOKENS", "8192"))
+
+# Characters per token assumed by the estimate; legal English averages a little above four, so this errs on the safe side
+CHARS_PER_TOKEN = float(os.environ.get("PROMPT_CHARS_PER_TOKEN", "4"))
+
+# Tokens kept free for the inaccuracy of the estimate
+SAFETY_MARGIN_TOKENS = int(os.environ.get("PROMPT_SAFETY_MARGIN_TOKENS", "256"))
+
+# Short lines repeated at least this often, once per page, are page headers or footers
+REPEATED_LINE_MIN_COUNT = 3
+REPEATED_LINE_MAX_CHARS = 100
+
+# Lines between two occurrences of a header or page number are at least this many, and the longest such gap is at
+# most PAGE_GAP_RATIO times the shortest; lines repeated closer together or irregularly, such as "By:" and "Name:"
+# in signature blocks, are content
+MIN_PAGE_LINES = 10
+PAGE_GAP_RATIO = 3
+
+# Paragraphs of at least this many characters that occur again later are boilerplate
+BOILERPLATE_MIN_CHARS = 200
+
+# Share of the budget given to the beginning of a document that has to be trimmed; the rest keeps its end
+TRIM_HEAD_SHARE = 0.7
+
+# "Page 3", "Page 3 of 12", "3 of 12" and "- 3 -" are always page numbers
+_PAGE_NUMBER_RE = re.compile(
+    r"^(?:page\s+\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?|\d{1,4}\s+of\s+\d{1,4}|[-–]\s*\d{1,4}\s*[-–])$", re.IGNORECASE
+)
+
+# A bare number is only a page number when it counts up page by page, see _page_number_lines
+_BARE_NUMBER_RE = re.compile(r"^\d{1,4}$")
+_HYPHENATION_RE = re.compile(r"(\w)-[ \t]*\n[ \t]*([a-z])")
+_HORIZONTAL_SPACE_RE = re.compile(r"[ \t\xa0]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+_stats_lock = threading.Lock()
+_feature_stats = {}
+_recent_calls = deque(maxlen=100)
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of tokens of a text without a tokenizer.
+
+    Parameters:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated token count, rounded up.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _spaced_like_pages(positions):
+    """
+    Tells whether line positions recur about once per page: far enough apart and at roughly regular intervals.
+    """
+    if len(positions) < REPEATED_LINE_MIN_COUNT:
+        return False
+    gaps = [later - earlier for earlier, later in zip(positions, positions[1:])]
+    return min(gaps) >= MIN_PAGE_LINES and max(gaps) <= PAGE_GAP_RATIO * min(gaps)
+
+
+def _page_number_lines(lines):
+    """
+    Finds the bare numbers that count up by one about once per page, unlike years, amounts or clause numbers that
+    happen to stand on a line of their own.
+
+    Returns:
+        set: The indices of the lines that are page numbers.
+    """
+    # Every run of consecutive numbers, keyed by the number that would continue it
+    runs = {}
+    for index, line in enumerate(lines):
+        if _BARE_NUMBER_RE.match(line):
+            number = int(line)
+            run = runs.pop(number, None)
+            if run is not None and index - run[-1] < MIN_PAGE_LINES:
+                # Too close to be on the next page; the run may still continue further down
+                runs[number] = run
+                run = None
+            run = (run or []) + [index]
+            if len(run) >= len(runs.get(number + 1, ())):
+                runs[number + 1] = run
+
+    page_lines = set()
+    for run in runs.values():
+        if _spaced_like_pages(run):
+            page_lines.update(run)
+    return page_lines
+
+
+def clean_extracted_text(text):
+    """
+    Removes the noise PDF extraction leaves in contract text: page numbers, headers and footers repeated on every
+    page, words hyphenated across line breaks and runs of whitespace.
+
+    Page boundaries are not marked in extracted text, so a line counts as a header, a footer or a page number when
+    it recurs at page-like intervals throughout the document.
+
+    Parameters:
+        text (str): The extracted text.
+
+    Returns:
+        str: The cleaned text, with its line structure kept so clauses can still be told apart.
+    """
+    # Join words hyphenated at the end of a line ("termi-\nnation")
+    text = _HYPHENATION_RE.sub(r"\1\2", text)
+
+    lines = [_HORIZONTAL_SPACE_RE.sub(" ", line).strip() for line in text.splitlines()]
+
+    # Short lines that repeat page after page are running headers and footers; only their first occurrence is kept
+    positions = defaultdict(list)
+    for index, line in enumerate(lines):
+        if line and len(line) <= REPEATED_LINE_MAX_CHARS:
+            positions[line].append(index)
+    repeated = {line for line, indices in positions.items() if _spaced_like_pages(indices)}
+    page_numbers = _page_number_lines(lines)
+
+    kept = []
+    seen_repeated = set()
+    for index, line in enumerate(lines):
+        if _PAGE_NUMBER_RE.match(line) or index in page_numbers:
+            continue
+        if line in repeated:
+            if line in seen_repeated:
+                continue
+            seen_repeated.add(line)
+        kept.append(line)
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(kept)).strip()
+
+
+def remove_boilerplate(text):
+    """
+    Drops paragraphs that repeat an earlier paragraph word for word, such as notices or definitions pasted into
+    several schedules. Paragraphs are separated by blank lines; short ones are always kept.
+
+    Parameters:
+        text (str): The cleaned text.
+
+    Returns:
+        str: The text with every long paragraph kept only at its first occurrence.
+    """
+    seen = set()
+    kept = []
+    for paragraph in text.split("\n\n"):
+        key = " ".join(paragraph.split()).lower()
+        if len(key) >= BOILERPLATE_MIN_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(paragraph)
+    return "\n\n".join(kept)
+
+
+def compress_document(text):
+    """
+    Applies clean_extracted_text and remove_boilerplate to an extracted document.
+    """
+    return remove_boilerplate(clean_extracted_text(text))
+
+
+def trim_to_tokens(text, max_tokens):
+    """
+    Shortens a text to an estimated `max_tokens` tokens, keeping its beginning and its end at line boundaries.
+
+    Contracts name the parties and the subject at the start and governing law and signatures at the end, so the
+    middle is cut and replaced by a note that tells the model text was left out.
+
+    Parameters:
+        text (str): The text to shorten.
+        max_tokens (int): The estimated token budget of the result.
+
+    Returns:
+        str: The text unchanged when it fits, otherwise its beginning, the note and its end.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    max_chars = max(0, int(max_tokens * CHARS_PER_TOKEN) - 80)
+    head_chars = int(max_chars * TRIM_HEAD_SHARE)
+    tail_chars = max_chars - head_chars
+
+    head = text[:head_chars]
+    if "\n" in head:
+        head = head[:head.rfind("\n")]
+    tail = text[len(text) - tail_chars:] if tail_chars else ""
+    if "\n" in tail:
+        tail = tail[tail.find("\n") + 1:]
+
+    omitted = len(text) - len(head) - len(tail)
+    return f"{head}\n[... {omitted} characters omitted to fit the model's context window ...]\n{tail}"
+
+
+def fit_prompt(feature, render, document_text, max_new_tokens, compress=True, compressed_text=None):
+    """
+    Renders a prompt around a document so that prompt and answer fit into the model's context window.
+
+    The document is cleaned of extraction noise and repeated boilerplate, then trimmed to what is left of
+    CONTEXT_WINDOW_TOKENS after `max_new_tokens`, the rest of the prompt and SAFETY_MARGIN_TOKENS. This happens
+    before any request is sent, so an oversized prompt no longer fails only after a round trip to Watsonx. The
+    tokens saved are recorded per feature, see get_budget_stats.
+
+    Parameters:
+        feature (str): The name the call is recorded under, such as "review".
+        render (callable): Builds the prompt from the document text.
+        document_text (str): The document placed into the prompt.
+        max_new_tokens (int): The generation budget of the call.
+        compress (bool): Whether to clean and deduplicate the document; text that is not extracted from a PDF,
+            such as a diff, is only trimmed.
+        compressed_text (str): The result of compress_document for the document, when the caller already has it.
+
+    Returns:
+        str: The rendered prompt.
+    """
+    with span("prompt_rendering", feature=feature):
+        original_tokens = estimate_tokens(render(document_text))
+
+        if compressed_text is not None:
+            document_text = compressed_text
+        elif compress:
+            document_text = compress_document(document_text)
+        compressed_tokens = estimate_tokens(render(document_text))
+
+        template_tokens = estimate_tokens(render(""))
+        document_budget = CONTEXT_WINDOW_TOKENS - int(max_new_tokens) - template_tokens - SAFETY_MARGIN_TOKENS
+        prompt = render(trim_to_tokens(document_text, max(0, document_budget)))
+        prompt_tokens = estimate_tokens(prompt)
+
+    _record(feature, original_tokens, compressed_tokens, prompt_tokens, int(max_new_tokens))
+    return prompt
+
+
+def _record(feature, original_tokens, compressed_tokens, prompt_tokens, max_new_tokens):
+    call = {
+        "feature": feature,
+        "original_tokens": original_tokens,
+        "prompt_tokens": prompt_tokens,
+        "compressed_tokens": original_tokens - compressed_tokens,
+        "trimmed_tokens": max(0, compressed_tokens - prompt_tokens),
+        "max_new_tokens": max_new_tokens,
+    }
+    observe("prompt_tokens", prompt_tokens, TOKEN_BUCKETS, "Estimated tokens of the prompts sent.", feature=feature)
+    with _stats_lock:
+        _recent_calls.append(call)
+        stats = _feature_stats.setdefault(feature, {
+            "calls": 0, "original_tokens": 0, "prompt_tokens": 0, "compressed_tokens": 0, "trimmed_tokens": 0,
+            "trimmed_calls": 0,
+        })
+        stats["calls"] += 1
+        stats["original_tokens"] += original_tokens
+        stats["prompt_tokens"] += prompt_tokens
+        stats["compressed_tokens"] += call["compressed_tokens"]
+        stats["trimmed_tokens"] += call["trimmed_tokens"]
+        stats["trimmed_calls"] += 1 if call["trimmed_tokens"] else 0
+
+
+def get_budget_stats():
+    """
+    Returns the estimated tokens saved by the pre-flight step.
+
+    Returns:
+        dict: Under "features", per feature the number of calls, the estimated tokens of the prompts as given and as
+        sent, the tokens removed by compression and by trimming and the number of trimmed calls; under "recent", the
+        same figures for the latest calls.
+    """
+    with _stats_lock:
+        return {
+            "features": {feature: dict(values) for feature, values in _feature_stats.items()},
+            "recent": list(_recent_calls),
+        }
+
+
+def reset_budget_stats():
+    """
+    Clears the recorded pre-flight statistics.
+    """
+    with _stats_lock:
+        _feature_stats.clear()
+        _recent_calls.clear()
@@ -0,0 +1,29 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    A thread-safe limiter that spaces calls evenly so that no more than `requests_per_minute` start per minute.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until the caller may start its next request.
+        """
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,333 @@
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from helper_functions.metrics import increment
+
+
+# Attempts per call, the first one included, for errors that are likely to go away on their own
+RETRY_ATTEMPTS = int(os.environ.get("LLM_RETRY_ATTEMPTS", "3"))
+
+# Backoff before retry n is drawn uniformly from [0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2**n)]
+RETRY_BASE_SECONDS = float(os.environ.get("LLM_RETRY_BASE_SECONDS", "0.5"))
+RETRY_MAX_SECONDS = float(os.environ.get("LLM_RETRY_MAX_SECONDS", "8"))
+
+# HTTP statuses that mean "try again later" rather than "this request is wrong"
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Hedging sends a second, identical request when the first one is slower than the HEDGE_QUANTILE of recent calls.
+# It costs extra Watsonx usage, so it is off unless enabled, and at most HEDGE_MAX_FRACTION of calls are hedged.
+HEDGE_ENABLED = os.environ.get("LLM_HEDGE", "false").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.environ.get("LLM_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+HEDGE_MAX_FRACTION = float(os.environ.get("LLM_HEDGE_MAX_FRACTION", "0.1"))
+LATENCY_WINDOW = 200
+
+# After this many transient failures in a row calls to the endpoint fail at once, until CIRCUIT_RESET_SECONDS have
+# passed and a trial call succeeds
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_TRANSIENT_MESSAGE_RE = re.compile(
+    r"\b(?:408|425|429|500|502|503|504)\b|timed? ?out|temporarily unavailable|too many requests|connection (?:reset|aborted|refused)",
+    re.IGNORECASE,
+)
+
+_endpoints_lock = threading.Lock()
+_endpoints = {}
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("LLM_HEDGE_WORKERS", "32")), thread_name_prefix="llm-call")
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of calling an endpoint whose circuit breaker is open.
+    """
+
+
+def is_transient(error):
+    """
+    Tells whether an error is worth retrying: network errors, timeouts, rate limiting and server errors.
+
+    Parameters:
+        error (Exception): The error raised by a call.
+
+    Returns:
+        bool: True for errors that are likely to go away on their own.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+
+    # The Watsonx SDK and requests carry the HTTP status on the error or on its response
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        return int(status_code) in TRANSIENT_STATUS_CODES
+
+    # requests' errors derive from OSError; other SDK errors only say what happened in their message
+    return isinstance(error, OSError) or bool(_TRANSIENT_MESSAGE_RE.search(str(error)))
+
+
+def backoff_seconds(attempt):
+    """
+    Returns the jittered delay before retry `attempt` (0 for the first retry).
+    """
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while an endpoint keeps failing.
+
+    The breaker opens after `failure_threshold` transient failures in a row. While open every call is rejected
+    with CircuitOpenError; after `reset_seconds` one trial call is let through, which closes the breaker when it
+    succeeds and opens it again when it fails.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Raises CircuitOpenError when the call must not be made.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+
+        increment("llm_circuit_rejections", description="LLM calls rejected by an open circuit breaker.", endpoint=self.name)
+        raise CircuitOpenError(
+            f"Watsonx ({self.name}) is failing; calls are paused for another {max(remaining, 0):.0f}s"
+        )
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    increment("llm_circuit_opened", description="Times a circuit breaker opened.", endpoint=self.name)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class _Endpoint:
+    def __init__(self, name):
+        self.breaker = CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+        # Durations of whole invoke calls, which the hedge delay is taken from
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedges_won": 0, "failures": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def hedge_delay(self):
+        # The delay is the recent tail latency; without enough samples, or above the hedge budget, there is none
+        with self.lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            if self.stats["hedges"] >= HEDGE_MAX_FRACTION * self.stats["calls"]:
+                return None
+            ordered = sorted(self.latencies)
+        return max(HEDGE_MIN_DELAY_SECONDS, ordered[min(len(ordered) - 1, int(HEDGE_QUANTILE * len(ordered)))])
+
+
+def _get_endpoint(name):
+    with _endpoints_lock:
+        endpoint = _endpoints.get(name)
+        if endpoint is None:
+            endpoint = _endpoints[name] = _Endpoint(name)
+        return endpoint
+
+
+def _timed_call(endpoint, function, rate_limiter=None):
+    # Every request sent takes a slot, retries and hedges included
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    started = time.perf_counter()
+    result = function()
+    with endpoint.lock:
+        endpoint.latencies.append(time.perf_counter() - started)
+    return result
+
+
+def _hedged_call(endpoint, function, rate_limiter=None):
+    """
+    Calls `function`, and once more in parallel when the first call outlives the hedge delay; the first success
+    wins. The losing request cannot be cancelled and is left to finish in the background.
+    """
+    delay = endpoint.hedge_delay()
+    if delay is None:
+        return _timed_call(endpoint, function, rate_limiter)
+
+    # The slots are taken here, so waiting for one does not count towards the hedge delay
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    primary = _hedge_pool.submit(_timed_call, endpoint, function)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    endpoint.count("hedges")
+    increment("llm_hedges", description="Duplicate LLM requests sent for slow calls.", endpoint=endpoint.breaker.name)
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    hedge = _hedge_pool.submit(_timed_call, endpoint, function)
+
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    endpoint.count("hedges_won")
+                    increment("llm_hedges_won", description="Hedged LLM requests that answered first.", endpoint=endpoint.breaker.name)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _retry_or_raise(endpoint, error, attempt):
+    # Only transient errors count against the endpoint; a rejected prompt shows that it answers
+    if not is_transient(error):
+        endpoint.breaker.record_success()
+        raise error
+    endpoint.breaker.record_failure()
+    endpoint.count("failures")
+    if attempt == RETRY_ATTEMPTS - 1:
+        raise error
+    endpoint.count("retries")
+    increment("llm_retries", description="LLM calls retried after a transient error.", endpoint=endpoint.breaker.name)
+    time.sleep(backoff_seconds(attempt))
+
+
+def call_with_resilience(name, function, hedge=None, rate_limiter=None):
+    """
+    Calls an endpoint with retries, an optional hedged duplicate request and a circuit breaker.
+
+    Parameters:
+        name (str): The endpoint, such as the model id; breaker and latency statistics are kept per endpoint.
+        function (callable): Makes the call without arguments.
+        hedge (bool): Whether slow calls are hedged; None uses HEDGE_ENABLED.
+        rate_limiter (RateLimiter): An optional limiter acquired right before every request, retries and hedged
+            duplicates included.
+
+    Returns:
+        The result of the first successful call.
+
+    Raises:
+        CircuitOpenError: When the endpoint's breaker is open.
+    """
+    endpoint = _get_endpoint(name)
+    hedge = HEDGE_ENABLED if hedge is None else hedge
+    endpoint.count("calls")
+
+    for attempt in range(RETRY_ATTEMPTS):
+        endpoint.breaker.allow()
+        try:
+            if hedge:
+                result = _hedged_call(endpoint, function, rate_limiter)
+            else:
+                result = _timed_call(endpoint, function, rate_limiter)
+        except Exception as e:
+            _retry_or_raise(endpoint, e, attempt)
+            continue
+        endpoint.breaker.record_success()
+        return result
+
+
+def stream_with_resilience(name, function):
+    """
+    Streams from an endpoint with retries and a circuit breaker.
+
+    A stream is only retried until its first piece arrived; after that a retry would repeat text that was already
+    shown, so later errors are raised. Streams are not hedged.
+
+    Parameters:
+        name (str): The endpoint, such as the model id.
+        function (callable): Starts the stream without arguments and returns an iterator of pieces.
+
+    Yields:
+        The pieces of the first stream that started successfully.
+    """
+    endpoint = _get_endpoint(name)
+    endpoint.count("calls")
+
+    for attempt in range(RETRY_ATTEMPTS):
+        endpoint.breaker.allow()
+        try:
+            pieces = iter(function())
+            first = next(pieces, None)
+        except Exception as e:
+            _retry_or_raise(endpoint, e, attempt)
+            continue
+        # Streams are not timed here: their time to the first piece would pull down the whole-call tail latency that
+        # hedges invoke calls, and llm_cache already records it as first_token_seconds
+        endpoint.breaker.record_success()
+        break
+
+    if first is None:
+        return
+    yield first
+    try:
+        yield from pieces
+    except Exception as e:
+        if is_transient(e):
+            endpoint.breaker.record_failure()
+            endpoint.count("failures")
+        raise
+
+
+def get_resilience_stats():
+    """
+    Returns per endpoint the breaker state, the number of calls, retries, hedges, hedges that answered first and
+    transient failures.
+    """
+    with _endpoints_lock:
+        endpoints = dict(_endpoints)
+    stats = {}
+    for name, endpoint in endpoints.items():
+        with endpoint.lock:
+            stats[name] = dict(endpoint.stats, state=endpoint.breaker.state)
+    return stats
+
+
+def reset_resilience():
+    """
+    Forgets every endpoint with its breaker, latencies and counters.
+    """
+    with _endpoints_lock:
+        _endpoints.clear()
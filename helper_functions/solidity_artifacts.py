@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+
+import solcx
+
+
+SOLC_VERSION = '0.8.0'
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Solidity sources shipped with the app
+CONTRACTS_DIR = os.path.join(_ROOT_DIR, "contracts")
+
+# Compiled ABI and bytecode, one file per contract, compiler version and source hash
+ARTIFACTS_DIR = os.environ.get("CONTRACT_ARTIFACTS_DIR", os.path.join(_ROOT_DIR, "build", "contracts"))
+
+
+def _artifact_path(contract_name, source, solc_version):
+    source_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(ARTIFACTS_DIR, f"{contract_name}-solc{solc_version}-{source_hash}.json")
+
+
+def _compile(contract_name, source, solc_version):
+    """
+    Compiles a Solidity source with the requested compiler, installing the compiler when it is missing.
+    """
+    try:
+        compiled_sol = solcx.compile_source(source, output_values=["abi", "bin"], solc_version=solc_version)
+    except solcx.exceptions.SolcNotInstalled:
+        solcx.install_solc(solc_version)
+        compiled_sol = solcx.compile_source(source, output_values=["abi", "bin"], solc_version=solc_version)
+
+    contract_interface = compiled_sol[f'<stdin>:{contract_name}']
+    return {"abi": contract_interface["abi"], "bin": contract_interface["bin"]}
+
+
+def load_contract_interface(contract_name, solc_version=SOLC_VERSION):
+    """
+    Returns the ABI and bytecode of a contract from contracts/, compiling it only when no artifact exists for the
+    current source and compiler version.
+
+    Parameters:
+        contract_name (str): The contract name, which is also the name of its .sol file in contracts/.
+        solc_version (str): The Solidity compiler version.
+
+    Returns:
+        dict: The contract interface with the keys "abi" and "bin".
+    """
+    with open(os.path.join(CONTRACTS_DIR, f"{contract_name}.sol"), encoding="utf-8") as source_file:
+        source = source_file.read()
+
+    artifact_path = _artifact_path(contract_name, source, solc_version)
+    if os.path.exists(artifact_path):
+        with open(artifact_path, encoding="utf-8") as artifact_file:
+            return json.load(artifact_file)
+
+    contract_interface = _compile(contract_name, source, solc_version)
+
+    # Write to a temporary file first so a concurrent reader never sees a partial artifact
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    temporary_path = f"{artifact_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as artifact_file:
+        json.dump(contract_interface, artifact_file)
+    os.replace(temporary_path, artifact_path)
+
+    return contract_interface
+
+
+if __name__ == "__main__":
+    # Build step: compile every contract ahead of the first app start
+    for file_name in sorted(os.listdir(CONTRACTS_DIR)):
+        if file_name.endswith(".sol"):
+            name = file_name[:-len(".sol")]
+            load_contract_interface(name)
+            print(f"Built {name}")
@@ -0,0 +1,103 @@
+import re
+
+
+# Patterns for lines that open a new clause or section in typical contract layouts
+_CLAUSE_START_PATTERNS = (
+    # "ARTICLE IV", "Section 12", "Schedule 2"
+    re.compile(r"^\s*(?:article|section|clause|schedule|annex|exhibit)\s+[0-9ivxlc]+\b", re.IGNORECASE),
+    # "7.2 Termination", "12. Governing Law"
+    re.compile(r"^\s*\d+(?:\.\d+)*[.)]?\s+[A-Z]"),
+    # "(a) The Supplier shall"
+    re.compile(r"^\s*\([a-z0-9]{1,3}\)\s+\S"),
+    # All-caps headings such as "GOVERNING LAW"
+    re.compile(r"^\s*[A-Z][A-Z0-9 ,&'/-]{3,}$"),
+)
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.;:!?])\s+")
+
+
+def _is_clause_start(line):
+    return any(pattern.match(line) for pattern in _CLAUSE_START_PATTERNS)
+
+
+def split_into_clauses(text):
+    """
+    Splits contract text into clauses along heading and numbering boundaries.
+
+    Parameters:
+        text (str): The contract text, as returned by the PDF text extractor.
+
+    Returns:
+        list: The clause texts in document order. Joining them with newlines reproduces the input lines.
+    """
+    clauses = []
+    current = []
+
+    for line in text.splitlines():
+        if current and line.strip() and _is_clause_start(line):
+            clauses.append("\n".join(current))
+            current = []
+        current.append(line)
+
+    if current:
+        clauses.append("\n".join(current))
+
+    return [clause for clause in clauses if clause.strip()]
+
+
+def _split_oversized(clause, max_chars):
+    """
+    Splits a single clause that is longer than `max_chars` at sentence boundaries, falling back to hard cuts.
+    """
+    pieces = []
+    current = ""
+
+    for sentence in _SENTENCE_END_RE.split(clause):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+
+    if current:
+        pieces.append(current)
+
+    return pieces
+
+
+def chunk_text(text, max_chars):
+    """
+    Groups the clauses of a contract into chunks of at most `max_chars` characters without splitting clauses.
+
+    Clauses that are longer than `max_chars` on their own are split at sentence boundaries.
+
+    Parameters:
+        text (str): The contract text to chunk.
+        max_chars (int): The maximum number of characters per chunk.
+
+    Returns:
+        list: The chunk texts in document order.
+    """
+    chunks = []
+    current = ""
+
+    for clause in split_into_clauses(text):
+        pieces = [clause] if len(clause) <= max_chars else _split_oversized(clause, max_chars)
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+
+    if current:
+        chunks.append(current)
+
+    return chunks
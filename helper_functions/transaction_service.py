@@ -0,0 +1,319 @@
+import itertools
+import os
+import queue
+import threading
+import time
+
+from web3.exceptions import TransactionNotFound
+
+from helper_functions.blockchain import record_gas_used, send_deployment
+from helper_functions.metrics import observe, span
+
+
+# Seconds between two receipt checks of the pending transactions
+RECEIPT_POLL_SECONDS = float(os.environ.get("TX_RECEIPT_POLL_SECONDS", "1.0"))
+
+# A signed transaction without a receipt after this many seconds is sent again, in case the node dropped it
+REBROADCAST_AFTER_SECONDS = float(os.environ.get("TX_REBROADCAST_AFTER_SECONDS", "60"))
+
+# A transaction without a receipt after this many seconds is reported as failed
+RECEIPT_TIMEOUT_SECONDS = float(os.environ.get("TX_RECEIPT_TIMEOUT_SECONDS", "600"))
+
+# Confirmed and failed jobs are forgotten this many seconds after they finished
+JOB_RETENTION_SECONDS = float(os.environ.get("TX_JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+QUEUED = "queued"
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+
+class NonceManager:
+    """
+    Hands out consecutive nonces per account from a local counter, so concurrent submissions never share a nonce.
+
+    The counter starts from the node's pending transaction count and is re-read from the node after any failure that
+    may have left it out of step, which closes the gap a nonce that was allocated but never used would leave.
+    """
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self._next_nonce = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, account_address):
+        """
+        Returns the next nonce of an account and reserves it.
+        """
+        with self._lock:
+            if account_address not in self._next_nonce:
+                self._next_nonce[account_address] = self.w3.eth.get_transaction_count(account_address, 'pending')
+            nonce = self._next_nonce[account_address]
+            self._next_nonce[account_address] = nonce + 1
+            return nonce
+
+    def resync(self, account_address):
+        """
+        Forgets the local counter of an account, so the next nonce is read from the node again.
+        """
+        with self._lock:
+            self._next_nonce.pop(account_address, None)
+
+
+def _is_nonce_error(error):
+    # Nodes word this differently: "nonce too low", "invalid transaction nonce", "already known", ...
+    message = str(error).lower()
+    return "nonce" in message or "already known" in message or "underpriced" in message
+
+
+class TransactionService:
+    """
+    Sends contract deployments from one account in the background and tracks them until they are mined.
+
+    `submit_deployment` returns a job id at once. A sender thread allocates nonces and sends the jobs in order, and a
+    poller thread collects receipts, so callers only read `status` instead of blocking until a block is mined.
+    """
+
+    def __init__(self, w3, account_address, private_key=None, poll_seconds=RECEIPT_POLL_SECONDS,
+                 rebroadcast_after=REBROADCAST_AFTER_SECONDS, receipt_timeout=RECEIPT_TIMEOUT_SECONDS,
+                 job_retention=JOB_RETENTION_SECONDS):
+        self.w3 = w3
+        self.account_address = account_address
+        self.private_key = private_key
+        self.poll_seconds = poll_seconds
+        self.rebroadcast_after = rebroadcast_after
+        self.receipt_timeout = receipt_timeout
+        self.job_retention = job_retention
+        self.nonces = NonceManager(w3)
+
+        self._jobs = {}
+        self._pending = []
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+
+        # Web3 providers are not guaranteed to be thread-safe, so the sender and the poller take turns
+        self._w3_lock = threading.Lock()
+
+        self._stats = {"submitted": 0, "confirmed": 0, "failed": 0, "nonce_resyncs": 0, "rebroadcasts": 0}
+
+        self._sender = threading.Thread(target=self._send_loop, name="tx-sender", daemon=True)
+        self._poller = threading.Thread(target=self._poll_loop, name="tx-poller", daemon=True)
+        self._sender.start()
+        self._poller.start()
+
+    def submit_deployment(self, contract_interface, constructor_args, metadata=None):
+        """
+        Queues a contract deployment.
+
+        Parameters:
+            contract_interface (dict): The contract ABI and bytecode.
+            constructor_args (tuple): The constructor arguments.
+            metadata (dict): Caller data kept with the job, such as the storage mode or the anchored digest.
+
+        Returns:
+            int: The job id to pass to `status`.
+        """
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": QUEUED,
+                "metadata": dict(metadata or {}),
+                "tx_hash": None,
+                "nonce": None,
+                "contract_address": None,
+                "gas_used": None,
+                "error": None,
+                "submitted_at": time.time(),
+                "sent_at": None,
+                "confirmed_at": None,
+            }
+            self._stats["submitted"] += 1
+
+        self._queue.put((job_id, contract_interface, tuple(constructor_args)))
+        return job_id
+
+    def status(self, job_id):
+        """
+        Returns a snapshot of a job: its status (queued, pending, confirmed or failed), transaction hash, nonce,
+        contract address, gas used, error and timestamps.
+
+        Raises:
+            KeyError: When the job id is unknown, or the job finished more than `job_retention` seconds ago.
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            return dict(job, metadata=dict(job["metadata"]))
+
+    def wait(self, job_id, timeout=None):
+        """
+        Blocks until a job is confirmed or failed, for scripts that have nothing else to do.
+
+        Returns:
+            dict: The final status of the job, or its current one when the timeout expires.
+
+        Raises:
+            KeyError: When the job id is unknown, or the job finished more than `job_retention` seconds ago.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while self._jobs[job_id]["status"] in (QUEUED, PENDING):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+        return self.status(job_id)
+
+    def stats(self):
+        """
+        Returns the number of submitted, confirmed and failed jobs, the jobs still queued or pending, and how often
+        nonces were re-read and transactions sent again.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queued"] = sum(1 for job in self._jobs.values() if job["status"] == QUEUED)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def shutdown(self):
+        """
+        Stops the background threads; jobs that were not sent yet stay queued.
+        """
+        self._stopped.set()
+        self._queue.put(None)
+        self._sender.join()
+        self._poller.join()
+
+    def _update(self, job_id, **fields):
+        with self._changed:
+            self._jobs[job_id].update(fields)
+            self._changed.notify_all()
+
+    def _send_loop(self):
+        while not self._stopped.is_set():
+            item = self._queue.get()
+            if item is None:
+                break
+            self._send(*item)
+
+    def _send(self, job_id, contract_interface, constructor_args):
+        # A nonce error means the local counter fell out of step with the node, for example because another
+        # process used the account; the nonce is re-read and the job sent once more
+        for attempt in range(2):
+            nonce = None
+            try:
+                with self._w3_lock, span("transaction_send"):
+                    nonce = self.nonces.allocate(self.account_address)
+                    tx_hash, raw_transaction = send_deployment(
+                        self.w3, contract_interface, constructor_args, self.account_address, self.private_key, nonce
+                    )
+            except Exception as e:
+                if nonce is not None:
+                    # The nonce was not used, so the counter is re-read rather than leaving a gap
+                    self.nonces.resync(self.account_address)
+                    with self._lock:
+                        self._stats["nonce_resyncs"] += 1
+                if attempt == 0 and _is_nonce_error(e):
+                    continue
+                self._fail(job_id, f"{type(e).__name__}: {e}")
+                return
+
+            now = time.time()
+            self._update(job_id, status=PENDING, tx_hash=tx_hash.hex(), nonce=nonce, sent_at=now)
+            with self._lock:
+                self._pending.append({
+                    "job_id": job_id, "tx_hash": tx_hash, "raw": raw_transaction, "sent_at": now, "last_sent_at": now,
+                })
+            return
+
+    def _fail(self, job_id, error):
+        now = time.time()
+        self._update(job_id, status=FAILED, error=error, confirmed_at=now)
+        self._record_receipt_wait(job_id, now, "error")
+        with self._lock:
+            self._stats["failed"] += 1
+
+    def _record_receipt_wait(self, job_id, now, outcome):
+        # Measured from the first send, so rebroadcasts count towards the wait; jobs that never left the queue have none
+        with self._lock:
+            sent_at = self._jobs[job_id]["sent_at"]
+        if sent_at is not None:
+            observe(
+                "stage_seconds", now - sent_at, description="Duration of each processing stage in seconds.",
+                stage="receipt_wait", outcome=outcome,
+            )
+
+    def _poll_loop(self):
+        while not self._stopped.wait(self.poll_seconds):
+            with self._lock:
+                pending = list(self._pending)
+            for transaction in pending:
+                self._check(transaction)
+            self._evict_finished()
+
+    def _evict_finished(self):
+        # Only finished jobs are dropped; queued and pending ones are kept however old they are
+        cutoff = time.time() - self.job_retention
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job["status"] in (CONFIRMED, FAILED) and job["confirmed_at"] < cutoff]:
+                del self._jobs[job_id]
+
+    def _check(self, transaction):
+        job_id = transaction["job_id"]
+        try:
+            with self._w3_lock:
+                tx_receipt = self.w3.eth.get_transaction_receipt(transaction["tx_hash"])
+        except TransactionNotFound:
+            tx_receipt = None
+        except Exception:
+            # The node is unreachable for now; the transaction is checked again on the next poll
+            return
+
+        if tx_receipt is None:
+            # The timeout runs from the first send, so rebroadcasts cannot keep a lost transaction pending forever
+            now = time.time()
+            if now - transaction["sent_at"] > self.receipt_timeout:
+                self._forget(transaction)
+                self.nonces.resync(self.account_address)
+                self._fail(job_id, f"No receipt after {self.receipt_timeout:.0f}s")
+            elif transaction["raw"] is not None and now - transaction["last_sent_at"] > self.rebroadcast_after:
+                self._rebroadcast(transaction)
+            return
+
+        self._forget(transaction)
+        if tx_receipt.status == 1:
+            now = time.time()
+            self._update(
+                job_id,
+                status=CONFIRMED,
+                contract_address=tx_receipt.contractAddress,
+                gas_used=tx_receipt.gasUsed,
+                confirmed_at=now,
+            )
+            self._record_receipt_wait(job_id, now, "ok")
+            record_gas_used(tx_receipt.gasUsed)
+            with self._lock:
+                self._stats["confirmed"] += 1
+        else:
+            self._fail(job_id, "Transaction reverted")
+
+    def _rebroadcast(self, transaction):
+        # A dropped transaction would hold back every later nonce of the account, so the same signed bytes are sent
+        # again; nodes that still have it answer "already known", which is harmless
+        try:
+            with self._w3_lock:
+                self.w3.eth.send_raw_transaction(transaction["raw"])
+        except Exception:
+            pass
+        transaction["last_sent_at"] = time.time()
+        with self._lock:
+            self._stats["rebroadcasts"] += 1
+
+    def _forget(self, transaction):
+        with self._lock:
+            if transaction in self._pending:
+                self._pending.remove(transaction)
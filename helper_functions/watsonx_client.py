@@ -0,0 +1,155 @@
+import os
+import threading
+
+from ibm_watsonx_ai import APIClient, Credentials
+from langchain_ibm import WatsonxLLM
+
+from helper_functions.cache import MemoryCache
+
+
+# Most WatsonxLLM instances kept; generation budgets vary with the input, so distinct parameter sets are unbounded
+MAX_LLM_INSTANCES = int(os.environ.get("WATSONX_MAX_LLM_INSTANCES", "64"))
+
+# Guards the registries and counters; held only for lookups, never while talking to IBM Cloud
+_registry_lock = threading.Lock()
+
+# One lock per (url, project_id), held while its client authenticates or its models are built, so concurrent
+# Streamlit sessions never build the same client twice and other endpoints do not wait for it
+_endpoint_locks = {}
+
+# Authenticated API clients keyed by (url, project_id). Each client owns one pooled HTTP session.
+_api_clients = {}
+
+# WatsonxLLM instances keyed by (model_id, url, project_id, decoding parameters), least recently used evicted first.
+# They are cheap to rebuild, since the expensive part, the authenticated APIClient, is shared
+_llm_instances = MemoryCache(max_entries=MAX_LLM_INSTANCES)
+
+_registry_stats = {
+    "client_hits": 0,
+    "client_misses": 0,
+    "llm_hits": 0,
+    "llm_misses": 0,
+    "token_refreshes": 0,
+}
+
+
+def _parameters_key(parameters):
+    """
+    Converts a decoding parameter dictionary into a hashable, order-independent key.
+
+    Parameters:
+        parameters (dict): The decoding parameters passed to WatsonxLLM.
+
+    Returns:
+        tuple: A sorted tuple of (name, value) pairs.
+    """
+    return tuple(sorted((parameters or {}).items()))
+
+
+def _endpoint_lock(url, project_id):
+    with _registry_lock:
+        return _endpoint_locks.setdefault((url, project_id), threading.Lock())
+
+
+def _get_api_client(url, project_id):
+    """
+    Returns the shared authenticated APIClient for a Watsonx endpoint and project, creating it on first use.
+
+    The access token is read before the client is handed out. The SDK refreshes the token when it is close
+    to expiry, so doing it here moves the IAM round trip out of the generation request itself. The caller holds
+    the lock of the endpoint.
+
+    Parameters:
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+
+    Returns:
+        APIClient: An authenticated client with a pooled HTTP session.
+    """
+    key = (url, project_id)
+    with _registry_lock:
+        api_client = _api_clients.get(key)
+        _registry_stats["client_misses" if api_client is None else "client_hits"] += 1
+
+    if api_client is None:
+        api_key = os.environ.get("WATSONX_APIKEY")
+        if not api_key:
+            raise RuntimeError("WATSONX_APIKEY is not set; it is needed to call Watsonx")
+        credentials = Credentials(url=url, api_key=api_key)
+        api_client = APIClient(credentials, project_id=project_id)
+        with _registry_lock:
+            _api_clients[key] = api_client
+        return api_client
+
+    # Touching the token triggers the SDK's refresh-ahead-of-expiry logic
+    previous_token = getattr(api_client._auth_method, "_token", None)
+    api_client.token
+    if getattr(api_client._auth_method, "_token", None) != previous_token:
+        with _registry_lock:
+            _registry_stats["token_refreshes"] += 1
+
+    return api_client
+
+
+def get_watsonx_llm(model_id, url, project_id, parameters):
+    """
+    Returns a process-wide WatsonxLLM instance for the given model, endpoint, project and decoding parameters.
+
+    Instances are reused across calls, Streamlit reruns and sessions, so credential exchange and HTTP session
+    setup are only paid once per endpoint and project instead of on every request. At most MAX_LLM_INSTANCES
+    instances are kept.
+
+    Parameters:
+        model_id (str): The identifier of the Watsonx foundation model.
+        url (str): The API endpoint URL to access the WatsonxLLM service.
+        project_id (str): The project identifier for the WatsonxLLM instance.
+        parameters (dict): The decoding parameters for generation.
+
+    Returns:
+        WatsonxLLM: A ready to use WatsonxLLM instance bound to a shared APIClient.
+    """
+    key = (model_id, url, project_id, _parameters_key(parameters))
+
+    with _endpoint_lock(url, project_id):
+        api_client = _get_api_client(url, project_id)
+        cached = _llm_instances.get(key)
+
+        with _registry_lock:
+            _registry_stats["llm_misses" if cached is None else "llm_hits"] += 1
+        if cached is not None:
+            return cached
+
+        watsonx_llm = WatsonxLLM(
+            model_id=model_id,
+            watsonx_client=api_client,
+            project_id=project_id,
+            params=dict(parameters),
+        )
+        _llm_instances.set(key, watsonx_llm)
+        return watsonx_llm
+
+
+def get_registry_stats():
+    """
+    Returns the reuse counters of the Watsonx client registry.
+
+    Returns:
+        dict: Hit and miss counts for API clients and WatsonxLLM instances, the number of proactive token
+        refreshes and the number of currently registered clients and models.
+    """
+    with _registry_lock:
+        stats = dict(_registry_stats)
+        stats["clients"] = len(_api_clients)
+        stats["llms"] = len(_llm_instances)
+    return stats
+
+
+def clear_registry():
+    """
+    Drops every registered client and model instance and resets the counters.
+    """
+    _llm_instances.clear()
+    with _registry_lock:
+        _api_clients.clear()
+        for name in _registry_stats:
+            _registry_stats[name] = 0
@@ -0,0 +1,340 @@
+import html
+from bisect import bisect_left
+from collections import Counter
+
+
+# Words of unchanged text shown before and after every change
+CONTEXT_WORDS = 8
+
+# Changes shown at most; the rest are only counted
+MAX_HUNKS = 50
+
+# Words of one side of a change shown at most
+MAX_HUNK_WORDS = 200
+
+# Words compared at most for one diff; regions not aligned by then are reported as replaced as a whole
+MAX_DIFF_WORK = 10_000_000
+
+# Comparisons charged for every region, as the cost of looking for anchors in it
+REGION_WORK = 100
+
+
+def _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, max_work):
+    """
+    Finds the middle snake of Myers' linear-space algorithm: a run of equal words on an optimal edit path that
+    splits it into two halves with half the edit distance each. Both ranges must be non-empty.
+
+    Returns:
+        tuple: The start and end (x, y) of the snake relative to the ranges, or None when it is not found within
+        `max_work` comparisons, and the number of comparisons made.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    delta = n - m
+    odd = delta & 1
+    offset = n + m + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    work = 0
+
+    for d in range((n + m + 1) // 2 + 1):
+        if work > max_work:
+            return None, work
+
+        # Furthest reaching paths from the start, on diagonals k = x - y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            work += x - x_start + 1
+            if odd and -(d - 1) <= delta - k <= d - 1 and x + backward[offset + delta - k] >= n:
+                return (x_start, y_start, x, y), work
+
+        # Furthest reaching paths from the end, in reversed coordinates
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            work += x - x_start + 1
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return (n - x, m - y, n - x_start, m - y_start), work
+
+    return None, work
+
+
+def _trim(a, a_lo, a_hi, b, b_lo, b_hi):
+    # Equal words at both ends of a region are always part of an optimal alignment
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        a_lo += 1
+        b_lo += 1
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+    return a_lo, a_hi, b_lo, b_hi
+
+
+def _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi):
+    """
+    Pairs the words that occur exactly once in both ranges and keeps the longest run of pairs in the same order in
+    both, as patience diff does. Contracts repeat boilerplate, but section numbers, names and amounts are unique
+    enough to align long documents without comparing every pair of words.
+    """
+    a_counts = Counter(a[a_lo:a_hi])
+    b_positions = {}
+    for j in range(b_lo, b_hi):
+        word = b[j]
+        if a_counts.get(word) == 1:
+            b_positions[word] = None if word in b_positions else j
+
+    pairs = [(i, b_positions[a[i]]) for i in range(a_lo, a_hi) if b_positions.get(a[i]) is not None]
+
+    # Longest increasing subsequence of the positions in b, by patience sorting
+    tails, tail_pairs, previous = [], [], []
+    for pair in pairs:
+        pile = bisect_left(tails, pair[1])
+        previous.append(tail_pairs[pile - 1] if pile else None)
+        if pile == len(tails):
+            tails.append(pair[1])
+            tail_pairs.append(len(previous) - 1)
+        else:
+            tails[pile] = pair[1]
+            tail_pairs[pile] = len(previous) - 1
+
+    anchors = []
+    index = tail_pairs[-1] if tail_pairs else None
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def diff_words(original_words, new_words):
+    """
+    Aligns two word sequences with a minimal number of inserted and deleted words in regions between unique anchors.
+
+    The sequences are first split at words that occur once in both (patience diff), and the regions in between are
+    aligned with Myers' algorithm in linear space. Once MAX_DIFF_WORK words have been compared, the regions not yet
+    aligned are reported as replaced as a whole, which keeps the time bounded for documents that share almost nothing.
+
+    Parameters:
+        original_words (list): The words of the original text.
+        new_words (list): The words of the new text.
+
+    Returns:
+        list: difflib-style opcodes (tag, i1, i2, j1, j2) with the tags "equal", "replace", "delete" and "insert".
+    """
+    return _align(original_words, new_words)[0]
+
+
+def _align(a, b):
+    """
+    Does the work of diff_words.
+
+    Returns:
+        tuple: The opcodes, and whether MAX_DIFF_WORK cut the alignment short, in which case some replaced regions
+        are larger than the actual changes.
+    """
+    matches = []
+    work = 0
+    truncated = False
+    # Regions are aligned front to back, so a diff cut short by the work limit still shows the first changes
+    stack = [(0, len(a), 0, len(b))]
+    while stack and work <= MAX_DIFF_WORK:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        trimmed_a_lo, trimmed_a_hi, trimmed_b_lo, trimmed_b_hi = _trim(a, a_lo, a_hi, b, b_lo, b_hi)
+        if trimmed_a_lo > a_lo:
+            matches.append((a_lo, b_lo, trimmed_a_lo - a_lo))
+        if trimmed_a_hi < a_hi:
+            matches.append((trimmed_a_hi, trimmed_b_hi, a_hi - trimmed_a_hi))
+        a_lo, a_hi, b_lo, b_hi = trimmed_a_lo, trimmed_a_hi, trimmed_b_lo, trimmed_b_hi
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        # Every region also costs a fixed amount, for the many small regions between anchors
+        work += a_hi - a_lo + b_hi - b_lo + REGION_WORK
+        anchors = _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi)
+        if anchors:
+            regions = []
+            previous_i, previous_j = a_lo, b_lo
+            for i, j in anchors:
+                matches.append((i, j, 1))
+                regions.append((previous_i, i, previous_j, j))
+                previous_i, previous_j = i + 1, j + 1
+            regions.append((previous_i, a_hi, previous_j, b_hi))
+            stack.extend(reversed(regions))
+            continue
+
+        snake, snake_work = _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, MAX_DIFF_WORK - work)
+        work += snake_work
+        if snake is None:
+            truncated = True
+            continue
+        x_start, y_start, x_end, y_end = snake
+        if x_end > x_start:
+            matches.append((a_lo + x_start, b_lo + y_start, x_end - x_start))
+        stack.append((a_lo + x_end, a_hi, b_lo + y_end, b_hi))
+        stack.append((a_lo, a_lo + x_start, b_lo, b_lo + y_start))
+
+    opcodes = []
+    i = j = 0
+    for match_i, match_j, size in sorted(matches) + [(len(a), len(b), 0)]:
+        if i < match_i and j < match_j:
+            opcodes.append(("replace", i, match_i, j, match_j))
+        elif i < match_i:
+            opcodes.append(("delete", i, match_i, j, match_j))
+        elif j < match_j:
+            opcodes.append(("insert", i, match_i, j, match_j))
+        if size:
+            if opcodes and opcodes[-1][0] == "equal":
+                opcodes[-1] = ("equal", opcodes[-1][1], match_i + size, opcodes[-1][3], match_j + size)
+            else:
+                opcodes.append(("equal", match_i, match_i + size, match_j, match_j + size))
+        i, j = match_i + size, match_j + size
+
+    # Regions still on the stack were never aligned
+    return opcodes, truncated or bool(stack)
+
+
+def _segment(tag, a, i1, i2, b, j1, j2, budget):
+    # Each side keeps at most `budget` words; the rest of it is only counted
+    original_words = a[i1:min(i2, i1 + budget)]
+    new_words = b[j1:min(j2, j1 + budget)] if tag != "equal" else original_words
+    segment = {
+        "tag": tag,
+        "original": {"words": original_words, "omitted": i2 - i1 - len(original_words)},
+        "new": {"words": new_words, "omitted": j2 - j1 - len(new_words)},
+    }
+    return segment, max(len(original_words), len(new_words))
+
+
+def word_diff(original_text, new_text, context_words=CONTEXT_WORDS, max_hunks=MAX_HUNKS):
+    """
+    Computes a compact word-level diff of two texts, such as two normalized contracts.
+
+    Only the changed regions are kept, each with a few words of unchanged context and at most MAX_HUNK_WORDS words,
+    so the result stays small however long the documents are. When the alignment was cut short by MAX_DIFF_WORK,
+    "truncated" is set: the counts then include unaligned text reported as replaced and are an upper bound.
+
+    Parameters:
+        original_text (str): The reference text, for example the contract stored on-chain.
+        new_text (str): The text compared with it, for example the uploaded contract.
+        context_words (int): Unchanged words kept before and after every change.
+        max_hunks (int): Changed regions kept; later ones are only counted.
+
+    Returns:
+        dict: "hunks", a list of changed regions that are lists of segments with the keys "tag", "original" and
+        "new" (each {"words", "omitted"}); "total_hunks"; the numbers of "removed_words" and "added_words"; and
+        "truncated".
+    """
+    a = original_text.split()
+    b = new_text.split()
+    opcodes, truncated = _align(a, b)
+
+    hunks = []
+    total_hunks = removed_words = added_words = 0
+    hunk = None
+    budget = 0
+    for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == "equal":
+            if hunk is None:
+                continue
+            # Short unchanged runs between two changes stay inside the region
+            if index < len(opcodes) - 1 and i2 - i1 <= 2 * context_words:
+                segment, shown = _segment(tag, a, i1, i2, b, j1, j2, budget)
+            else:
+                segment, shown = _segment(tag, a, i1, min(i2, i1 + context_words), b, j1, min(j2, j1 + context_words), budget)
+            if shown:
+                hunk.append(segment)
+                budget -= shown
+            if i2 - i1 > 2 * context_words or index == len(opcodes) - 1:
+                hunk = None
+            continue
+
+        removed_words += i2 - i1
+        added_words += j2 - j1
+        if hunk is None:
+            total_hunks += 1
+            hunk = []
+            # Regions beyond the limit are only counted
+            budget = MAX_HUNK_WORDS if total_hunks <= max_hunks else 0
+            if budget:
+                hunks.append(hunk)
+            if index:
+                _, context_i1, context_i2, context_j1, context_j2 = opcodes[index - 1]
+                context_i1 = max(context_i1, context_i2 - context_words)
+                context_j1 = max(context_j1, context_j2 - context_words)
+                segment, shown = _segment("equal", a, context_i1, context_i2, b, context_j1, context_j2, budget)
+                if shown:
+                    hunk.append(segment)
+                    budget -= shown
+        segment, shown = _segment(tag, a, i1, i2, b, j1, j2, budget)
+        # Once a region reaches MAX_HUNK_WORDS words, its further segments are left out
+        if shown:
+            hunk.append(segment)
+            budget -= shown
+
+    return {
+        "hunks": hunks,
+        "total_hunks": total_hunks,
+        "removed_words": removed_words,
+        "added_words": added_words,
+        "truncated": truncated,
+    }
+
+
+def _words_html(side):
+    text = html.escape(" ".join(side["words"]))
+    if side["omitted"]:
+        text += f" … ({side['omitted']} more words)"
+    return text
+
+
+def format_diff_html(document_diff):
+    """
+    Renders a word-level diff as HTML, with removed words struck through in red and added words in green.
+
+    Parameters:
+        document_diff (dict): The output of word_diff.
+
+    Returns:
+        str: One paragraph per changed region, followed by a note on regions that were not shown, and a notice first
+        when the documents were too different to be aligned completely.
+    """
+    paragraphs = []
+    if document_diff.get("truncated"):
+        paragraphs.append(
+            "<p><em>The documents differ too much to be compared word by word everywhere; some regions are shown as "
+            "replaced as a whole, so the changes may be smaller than shown.</em></p>"
+        )
+    for hunk in document_diff["hunks"]:
+        parts = []
+        for segment in hunk:
+            if segment["tag"] == "equal":
+                parts.append(_words_html(segment["original"]))
+                continue
+            if segment["original"]["words"]:
+                parts.append(f'<del style="background-color:#fdd;">{_words_html(segment["original"])}</del>')
+            if segment["new"]["words"]:
+                parts.append(f'<ins style="background-color:#dfd;">{_words_html(segment["new"])}</ins>')
+        paragraphs.append(f"<p>… {' '.join(parts)} …</p>")
+
+    hidden = document_diff["total_hunks"] - len(document_diff["hunks"])
+    if hidden:
+        paragraphs.append(f"<p><em>{hidden} more changed regions not shown.</em></p>")
+
+    return "\n".join(paragraphs)
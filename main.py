@@ -1,22 +1,34 @@
 from dotenv import load_dotenv
-import solcx
+import functools
+import json
 import os
+import time
 import streamlit as st
 from web3 import Web3
-from solcx import compile_source
-import difflib
 
 from helper_functions.pdf_text_extractor import extract_text_from_pdf
-from helper_functions.normalization import normalize_text
-from helper_functions.pdf_text_extractor import extract_text_from_pdf
+from helper_functions.solidity_artifacts import load_contract_interface
+from helper_functions.blockchain import FULL_TEXT_MODE, HASH_ANCHOR_MODE, MERKLE_BATCH_MODE, MODE_CONTRACTS
+from helper_functions.blockchain import batch_receipts, submit_batch, submit_document, verify_batch_document, verify_document
+from helper_functions.transaction_service import (
+    FAILED as TRANSACTION_FAILED, PENDING as TRANSACTION_PENDING, QUEUED as TRANSACTION_QUEUED, TransactionService,
+)
+from helper_functions.job_store import DONE, FAILED, QUEUED, JobStore
 
-from features.draft_generation import draft_contract
+from features.draft_generation import stream_draft_contract
 from helper_functions.pdf_conversion import save_to_pdf
-from features.contract_clause_suggestion import suggest_clauses
-from features.contract_compliance_monitoring import monitor_compliance
-from features.contract_review import review_contract
-from features.document_comparison import compare_documents
-from features.legal_document_categorization import categorize_document
+from helper_functions.prompt_budget import get_budget_stats
+from helper_functions.metrics import get_metrics, render_prometheus, start_metrics_server
+from helper_functions.model_routing import get_routing_stats
+from features.contract_clause_suggestion import stream_suggest_clauses
+from features.contract_compliance_monitoring import stream_monitor_compliance
+from features.contract_review import stream_review_contract
+from features.document_comparison import stream_compare_documents
+from helper_functions.clause_diff import diff_documents, summarize_diff
+from helper_functions.word_diff import format_diff_html, word_diff
+from helper_functions.contract_catalog import CONTRACT_TYPES, COUNTRIES
+from features.legal_document_categorization import stream_categorize_document
+from features.full_analysis import ANALYSES, run_full_analysis, summarize_latency
 
 # Load environment variables
 load_dotenv()
@@ -26,18 +38,11 @@ st.set_page_config(
     page_icon="📝", 
 )
 
-# Retrieve IBM API credentials from environment variables
-ibm_key = os.environ["WATSONX_APIKEY"]
+# Retrieve IBM API credentials from environment variables; the API key is read when the first Watsonx client is
+# created, so pages that do not call Watsonx work without it
 ibm_project_id = os.environ.get('PROJECT_ID')
 ibm_url = os.environ.get('WATSONX_URL')
 
-try:
-    solcx.set_solc_version('0.8.0')
-except solcx.exceptions.SolcNotInstalled:
-    st.write("Solc is not installed. Installing Solc 0.8.0...")
-    solcx.install_solc('0.8.0')
-    solcx.set_solc_version('0.8.0')
-
 # Ethereum blockchain configuration
 eth_provider = os.environ.get("WEB3_PROVIDER")
 private_key = os.environ.get("PRIVATE_KEY")
@@ -45,26 +50,106 @@ account_address = os.environ.get("DEFAULT_ACCOUNT")
 
 w3 = Web3(Web3.HTTPProvider(eth_provider))
 
-# Solidity source code
-contract_source_code = '''
-// SPDX-License-Identifier: MIT
-pragma solidity ^0.8.0;
-
-contract ContractStorage {
-    string public contractContent;
-
-    constructor(string memory _content) {
-        contractContent = _content;
-    }
-
-    function getContractContent() public view returns (string memory) {
-        return contractContent;
-    }
+# The metrics admin page is only offered when enabled, since it shows usage across all sessions
+show_metrics_page = os.environ.get("SHOW_METRICS_PAGE", "false").lower() in ("1", "true", "yes")
+
+# Compiled contract interfaces, loaded from their build artifacts; solc only runs when a source changes
+@st.cache_resource
+def get_contract_interface(contract_name):
+    return load_contract_interface(contract_name)
+
+# Deployments are sent and tracked in the background, shared by all sessions so nonces are allocated in one place
+@st.cache_resource
+def get_transaction_service():
+    return TransactionService(w3, account_address, private_key)
+
+# Prometheus text served at /metrics on METRICS_PORT, started once per server process
+@st.cache_resource
+def get_metrics_server():
+    return start_metrics_server()
+
+get_metrics_server()
+
+# Analyses run as jobs shared by all sessions, so a double click or a refresh joins the running job
+@st.cache_resource
+def get_job_store():
+    return JobStore()
+
+def submit_job(operation, function, args, documents, parameters):
+    job_id = get_job_store().submit(operation, function, args, documents, parameters)
+    st.session_state.setdefault('jobs', {})[operation] = job_id
+    # The job id in the URL brings the result back after a refresh or in another session
+    st.query_params['job'] = job_id
+    return job_id
+
+# Progress and result of the job of a page, polled instead of blocking the script
+@st.fragment(run_every=1)
+def show_job(operation, result_key):
+    job = get_job_store().get(st.session_state['jobs'][operation])
+    if job is None:
+        st.error('This result is no longer available.')
+    elif job['status'] == DONE:
+        st.write(job['result'])
+        if st.session_state.get(result_key) != job['result']:
+            # Rerun the page once, so elements that depend on the result, such as downloads, are shown
+            st.session_state[result_key] = job['result']
+            st.rerun()
+    elif job['status'] == FAILED:
+        st.error(f"An error occurred: {job['error']}")
+    elif job['status'] == QUEUED:
+        st.info('Waiting for a free worker, this page updates by itself...')
+    else:
+        st.info('Working on it, this page updates by itself...')
+        if job['partial']:
+            st.write(job['partial'])
+
+# Status of the uploads of this session, refreshed until they are mined without rerunning the whole page
+@st.fragment(run_every=2)
+def show_upload_jobs():
+    service = get_transaction_service()
+    for job_id in reversed(st.session_state['upload_jobs']):
+        try:
+            job = service.status(job_id)
+        except KeyError:
+            # Finished jobs are forgotten after a day
+            st.info(f"Upload {job_id}: finished and no longer tracked.")
+            continue
+        metadata = job['metadata']
+
+        if job['status'] == TRANSACTION_QUEUED:
+            st.info(f"Upload {job_id}: waiting to be sent.")
+        elif job['status'] == TRANSACTION_PENDING:
+            st.info(f"Upload {job_id}: sent with transaction hash {job['tx_hash']}, waiting for it to be mined.")
+        elif job['status'] == TRANSACTION_FAILED:
+            st.error(f"Upload {job_id} failed: {job['error']}")
+        elif metadata['mode'] == MERKLE_BATCH_MODE:
+            receipts = batch_receipts(job)
+            st.success(f"{len(receipts)} contracts anchored with transaction hash: {job['tx_hash']} and contract address: {job['contract_address']}.")
+            st.write(f"Gas used: {job['gas_used']} ({job['gas_used'] // len(receipts)} per contract)")
+            st.write(f"Merkle root: {metadata['root']}")
+
+            # Each contract needs its inclusion receipt to be verified later; the receipts are not stored on-chain
+            st.write('Keep the inclusion receipt of every contract safe for future verification.')
+            for receipt in receipts:
+                st.download_button(
+                    label=f"Download receipt for {receipt['name']}",
+                    data=json.dumps(receipt, indent=2),
+                    file_name=f"{os.path.splitext(receipt['name'])[0]}.receipt.json",
+                    mime="application/json",
+                    key=f"receipt-{job_id}-{receipt['leaf_index']}",
+                )
+        else:
+            st.success(f"Contract successfully deployed to Ethereum with transaction hash: {job['tx_hash']} and contract address: {job['contract_address']}.\n Keep your contract address safe for future use. ")
+            st.write(f"Gas used: {job['gas_used']}")
+            if metadata['digest']:
+                st.write(f"Anchored SHA-256: {metadata['digest']}")
+
+# Storage modes offered on the upload and verify pages
+STORAGE_MODES = {
+    'Full text': FULL_TEXT_MODE,
+    'Hash anchor (SHA-256 of the normalized text)': HASH_ANCHOR_MODE,
+    'Merkle batch (many contracts in one transaction)': MERKLE_BATCH_MODE,
 }
-'''
-
-compiled_sol = compile_source(contract_source_code)
-contract_interface = compiled_sol['<stdin>:ContractStorage']
 
 
 # Streamlit UI setup
@@ -93,6 +178,25 @@ with st.sidebar:
         st.session_state.operation = 'categorize_document'
     if st.button('Verify Contract'):
         st.session_state.operation = 'verify_contract'
+    if st.button('Full Analysis'):
+        st.session_state.operation = 'full_analysis'
+    if show_metrics_page and st.button('Metrics'):
+        st.session_state.operation = 'metrics'
+
+    # Estimated prompt tokens saved by cleaning and trimming documents before they are sent to Watsonx
+    budget_stats = get_budget_stats()['features']
+    if budget_stats:
+        with st.expander('Prompt tokens'):
+            for feature, stats in budget_stats.items():
+                saved = stats['original_tokens'] - stats['prompt_tokens']
+                st.write(f"{feature}: {stats['prompt_tokens']} of {stats['original_tokens']} tokens sent in {stats['calls']} calls, {saved} saved, {stats['trimmed_calls']} calls trimmed")
+
+# A job id in the URL opens the page of that job with its result
+if st.session_state.operation is None and 'job' in st.query_params:
+    restored_job = get_job_store().get(st.query_params['job'])
+    if restored_job is not None:
+        st.session_state.operation = restored_job['operation']
+        st.session_state.setdefault('jobs', {})[restored_job['operation']] = restored_job['id']
 
 
 # Contract Drafting Feature
@@ -123,14 +227,14 @@ if st.session_state.operation == 'contract_drafting':
     with st.form(key='contract_form'):
         st.session_state['contract_type'] = st.selectbox(
             'Select Contract Type', 
-            ['NDA', 'Employment Agreement', 'Service Agreement', 'Sales Agreement', 'Lease Agreement', 'Partnership Agreement', 'Loan Agreement', 'Franchise Agreement', 'Settlement Agreement', 'Indemnity Agreement', 'Licensing Agreement'], 
-            index=['NDA', 'Employment Agreement', 'Service Agreement', 'Sales Agreement', 'Lease Agreement', 'Partnership Agreement', 'Loan Agreement', 'Franchise Agreement', 'Settlement Agreement', 'Indemnity Agreement', 'Licensing Agreement'].index(st.session_state['contract_type'])
+            CONTRACT_TYPES, 
+            index=CONTRACT_TYPES.index(st.session_state['contract_type'])
         )
 
         st.session_state['country'] = st.selectbox(
             'Select Country', 
-            ['Australia', 'Canada', 'United Arab Emirates','United Kingdom', 'United States'], 
-            index=['Australia', 'Canada', 'United Arab Emirates','United Kingdom', 'United States'].index(st.session_state['country'])
+            COUNTRIES, 
+            index=COUNTRIES.index(st.session_state['country'])
         )
 
         st.session_state['party_one'] = st.text_input('Enter the name of Party One', value=st.session_state['party_one'])
@@ -138,16 +242,18 @@ if st.session_state.operation == 'contract_drafting':
         st.session_state['contract_terms'] = st.text_area('Enter the key terms and conditions', value=st.session_state['contract_terms'])
 
         btn = st.form_submit_button('Draft')
-        if btn: 
-            with st.spinner('Drafting contract...'):
-                response = draft_contract(ibm_url, ibm_project_id, st.session_state['contract_type'], st.session_state['country'], st.session_state['party_one'], st.session_state['party_two'], st.session_state['contract_terms'])
-
-                st.session_state['generated_contract'] = response  # Store response in session state
 
     # Display the generated contract and download button outside the form
-    if st.session_state['generated_contract']:
+    if btn:
+        draft_inputs = {name: st.session_state[name] for name in ('contract_type', 'party_one', 'party_two', 'contract_terms', 'country')}
+        submit_job('contract_drafting', functools.partial(stream_draft_contract, **draft_inputs), (ibm_url, ibm_project_id), [], draft_inputs)
+
+    # Render the draft while it is being generated; the final text is kept in session state
+    if 'contract_drafting' in st.session_state.get('jobs', {}):
         st.header('Generated Contract')
-        st.write(st.session_state['generated_contract'])
+        show_job('contract_drafting', 'generated_contract')
+
+    if st.session_state['generated_contract']:
         pdf_file = save_to_pdf(st.session_state['generated_contract'])
         st.download_button(label="Download Contract", data=pdf_file, file_name="draft.pdf", mime="application/pdf")
 
@@ -182,11 +288,11 @@ elif st.session_state.operation == 'suggest_clauses':
 
             st.session_state['contract_text'] = contract_text
 
-            response = suggest_clauses(ibm_url, ibm_project_id, int(max_tokens), st.session_state['contract_text'])
-            st.session_state['suggested_clauses'] = response  # Store response in session state
+        submit_job('suggest_clauses', stream_suggest_clauses, (ibm_url, ibm_project_id, int(max_tokens), st.session_state['contract_text']), [st.session_state['contract_text']], {'max_tokens': int(max_tokens)})
 
+    if 'suggest_clauses' in st.session_state.get('jobs', {}):
         st.header("Suggested Clauses")
-        st.write(st.session_state['suggested_clauses'])
+        show_job('suggest_clauses', 'suggested_clauses')
 
 
 # Contract Compliance Monitoring
@@ -217,11 +323,11 @@ elif st.session_state.operation == 'monitor_compliance':
             text_extracted = extract_text_from_pdf(contract_file)
             st.session_state['contract_text'] = text_extracted
 
-            response = monitor_compliance(ibm_url, ibm_project_id, int(max_tokens), st.session_state['contract_text'], st.session_state['conditions'])
+        submit_job('monitor_compliance', stream_monitor_compliance, (ibm_url, ibm_project_id, int(max_tokens), st.session_state['contract_text'], st.session_state['conditions']), [st.session_state['contract_text']], {'max_tokens': int(max_tokens), 'conditions': st.session_state['conditions']})
 
-            st.session_state['compliance_summary'] = response  # Store response in session state
+    if 'monitor_compliance' in st.session_state.get('jobs', {}):
         st.header("Generated Summary")
-        st.write(st.session_state['compliance_summary'])
+        show_job('monitor_compliance', 'compliance_summary')
 
 
 # Contract Review
@@ -247,10 +353,89 @@ elif st.session_state.operation == 'review_contract':
             text_extracted = extract_text_from_pdf(contract_file)
             st.session_state['contract_text'] = text_extracted
 
-            response = review_contract(ibm_url, ibm_project_id, int(max_tokens), st.session_state['contract_text'])
-            st.session_state['review_summary'] = response
+        submit_job('review_contract', stream_review_contract, (ibm_url, ibm_project_id, int(max_tokens), st.session_state['contract_text']), [st.session_state['contract_text']], {'max_tokens': int(max_tokens)})
+
+    if 'review_contract' in st.session_state.get('jobs', {}):
         st.header('Generated Summary')
-        st.write(st.session_state['review_summary'])
+        show_job('review_contract', 'review_summary')
+
+
+# Full Analysis
+
+elif st.session_state.operation == 'full_analysis':
+    if 'full_analysis' not in st.session_state:
+        st.session_state['full_analysis'] = {}
+
+    st.header('Full Analysis')
+    st.write('<p style="font-size:20px;">Review, suggest clauses, check compliance and categorize a contract in one go.</p>', unsafe_allow_html=True)
+
+    st.write('<p style="font-size:16px; margin-top:20px">Adjust the maximum tokens. Larger max token value will result in a detailed report.</p>', unsafe_allow_html=True)
+    max_tokens = st.slider('Max Tokens', 100, 1000 )
+
+    contract_file = st.file_uploader('Upload a contract file', type=['pdf'])
+    conditions = st.text_area('Enter the terms and conditions to check compliance (optional)')
+    btn = st.button('Run Full Analysis')
+
+    if contract_file and btn and max_tokens:
+        # The contract is extracted once and shared by every analysis
+        with st.spinner('Extracting contract...'):
+            contract_text = extract_text_from_pdf(contract_file)
+
+        # One placeholder per analysis, filled as soon as that analysis finishes
+        placeholders = {}
+        for analysis, title in ANALYSES.items():
+            if analysis == 'monitor_compliance' and not conditions:
+                continue
+            st.header(title)
+            placeholders[analysis] = st.empty()
+            placeholders[analysis].info('Running...')
+
+        started = time.perf_counter()
+        results = []
+        for result in run_full_analysis(ibm_url, ibm_project_id, int(max_tokens), contract_text, conditions):
+            results.append(result)
+            with placeholders[result['analysis']].container():
+                if result['error'] is not None:
+                    st.error(f"{result['title']} failed: {result['error']}")
+                else:
+                    st.write(result['result'])
+                st.caption(f"Finished after {result['seconds']:.1f}s")
+
+        latency = summarize_latency(results, time.perf_counter() - started)
+        st.info(f"All analyses finished in {latency['total_seconds']:.1f}s; one after another they would have taken {latency['sum_of_parts_seconds']:.1f}s ({latency['speedup']:.1f}x faster).")
+        st.session_state['full_analysis'] = {result['analysis']: result['result'] for result in results}
+
+
+# Metrics
+
+elif st.session_state.operation == 'metrics' and show_metrics_page:
+    st.header('Metrics')
+    st.write('<p style="font-size:20px;">Where time and tokens go, per stage, since the server started.</p>', unsafe_allow_html=True)
+
+    metrics = get_metrics()
+    for name in sorted({histogram['name'] for histogram in metrics['histograms']}):
+        st.subheader(name)
+        st.dataframe([
+            dict(histogram['labels'], count=histogram['count'], mean=round(histogram['mean'], 3),
+                 p50=round(histogram['p50'], 3), p95=round(histogram['p95'], 3), total=round(histogram['sum'], 3))
+            for histogram in metrics['histograms'] if histogram['name'] == name
+        ])
+    # Calls, time, tokens and cost of every model tier, to tune the routes in MODEL_ROUTING_CONFIG
+    routing_stats = get_routing_stats()
+    if routing_stats:
+        st.subheader('model tiers')
+        st.dataframe([
+            dict(feature=feature, tier=tier, calls=stats['calls'], accepted=stats['accepted'], escalated=stats['escalated'],
+                 failed=stats['failed'], mean_seconds=round(stats['seconds'] / stats['calls'], 3),
+                 prompt_tokens=stats['prompt_tokens'], completion_tokens=stats['completion_tokens'], cost=round(stats['cost'], 4))
+            for (feature, tier), stats in sorted(routing_stats.items())
+        ])
+
+    if metrics['counters']:
+        st.subheader('counters')
+        st.dataframe([dict(counter['labels'], name=counter['name'], value=counter['value']) for counter in metrics['counters']])
+
+    st.download_button(label='Download Prometheus metrics', data=render_prometheus(), file_name='metrics.prom', mime='text/plain')
 
 
 # Smart Contract
@@ -259,28 +444,31 @@ elif st.session_state.operation == 'smart_contract':
     st.header('Upload to Blockchain')
     st.write('<p style="font-size:20px;">Secure your contracts by uploading it to blockchain.</p>', unsafe_allow_html=True)
 
-    contract_file = st.file_uploader('Upload a contract file', type=['pdf'])
-    bt = st.button('Upload')
+    # Hash anchoring stores only a digest, so its cost does not grow with the length of the contract
+    storage_mode = STORAGE_MODES[st.radio('Storage mode', list(STORAGE_MODES))]
+
+    if storage_mode == MERKLE_BATCH_MODE:
+        contract_files = st.file_uploader('Upload the contract files', type=['pdf'], accept_multiple_files=True)
+        bt = st.button('Upload Batch')
+    else:
+        contract_file = st.file_uploader('Upload a contract file', type=['pdf'])
+        bt = st.button('Upload')
 
 
-    if bt:
+    if storage_mode == MERKLE_BATCH_MODE:
+        if bt and contract_files:
+            documents = [(contract_file.name, extract_text_from_pdf(contract_file)) for contract_file in contract_files]
+            contract_interface = get_contract_interface(MODE_CONTRACTS[storage_mode])
+            job_id = submit_batch(get_transaction_service(), contract_interface, documents)
+            st.session_state.setdefault('upload_jobs', []).append(job_id)
+    elif bt:
         contract_textd = extract_text_from_pdf(contract_file)
-        Contract = w3.eth.contract(abi=contract_interface['abi'], bytecode=contract_interface['bin'])
-        nonce = w3.eth.get_transaction_count(account_address)
-        gas_estimate = Contract.constructor(contract_textd).estimate_gas({
-            'from': account_address})
-        print(f"Estimated Gas: {gas_estimate}")
-        transaction = Contract.constructor(contract_textd).build_transaction({
-        'from':account_address,  
-                'gas': gas_estimate + 100000,
-                'gasPrice': w3.to_wei('50', 'gwei'),
-                'nonce': nonce,
-        })
+        contract_interface = get_contract_interface(MODE_CONTRACTS[storage_mode])
+        job_id = submit_document(get_transaction_service(), contract_interface, storage_mode, contract_textd)
+        st.session_state.setdefault('upload_jobs', []).append(job_id)
 
-        signed_txn = w3.eth.account.sign_transaction(transaction, private_key=os.getenv('PRIVATE_KEY'))
-        tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-        tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        st.success(f"Contract successfully deployed to Ethereum with transaction hash: {tx_hash.hex()} and contract address: {tx_receipt.contractAddress}.\n Keep your contract address safe for future use. ")
+    if st.session_state.get('upload_jobs'):
+        show_upload_jobs()
 
 
 
@@ -301,6 +489,9 @@ elif st.session_state.operation == 'compare_documents':
     if 'comparison_summary' not in st.session_state:
         st.session_state['comparison_summary'] = ''
 
+    if 'document_diff' not in st.session_state:
+        st.session_state['document_diff'] = []
+
     st.write('<p style="font-size:16px; margin-top:20px">Adjust the maximum tokens. Larger max token value will result in a detailed report.</p>', unsafe_allow_html=True)
 
     max_tokens = st.slider('Max Tokens', 100, 1000 )
@@ -317,11 +508,28 @@ elif st.session_state.operation == 'compare_documents':
             new_contract = extract_text_from_pdf(contract_file_second)
             st.session_state['new_contract'] = new_contract
 
-            response = compare_documents(ibm_url, ibm_project_id, int(max_tokens), st.session_state['original_contract'], st.session_state['new_contract'])
-
-            st.session_state['comparison_summary'] = response  # Store response in session state
+            # Align the clauses locally; only the changed ones are sent to the model
+            document_diff = diff_documents(st.session_state['original_contract'], st.session_state['new_contract'])
+            st.session_state['document_diff'] = document_diff  # Store the structured diff in session state
+
+        counts = summarize_diff(st.session_state['document_diff'])
+        st.header('Clause Differences')
+        st.write(f"{counts['identical']} identical, {counts['modified']} modified, {counts['added']} added, {counts['removed']} removed and {counts['moved']} moved clauses.")
+        for hunk in st.session_state['document_diff']:
+            if hunk['status'] == 'identical':
+                continue
+            title = (hunk['new'] or hunk['original']).strip().splitlines()[0][:80]
+            with st.expander(f"{hunk['status'].capitalize()}: {title}"):
+                if hunk['original'] is not None and hunk['status'] != 'moved':
+                    st.text(f"Original:\n{hunk['original']}")
+                if hunk['new'] is not None:
+                    st.text(f"Updated:\n{hunk['new']}")
+
+        submit_job('compare_documents', stream_compare_documents, (ibm_url, ibm_project_id, int(max_tokens), st.session_state['original_contract'], st.session_state['new_contract'], st.session_state['document_diff']), [st.session_state['original_contract'], st.session_state['new_contract']], {'max_tokens': int(max_tokens)})
+
+    if 'compare_documents' in st.session_state.get('jobs', {}):
         st.header('Comparison Summary')
-        st.write(st.session_state['comparison_summary'])
+        show_job('compare_documents', 'comparison_summary')
 
 
 # Legal Document Categorization
@@ -350,10 +558,11 @@ elif st.session_state.operation == 'categorize_document':
             text_extracted = extract_text_from_pdf(contract_file)
             st.session_state['document_text'] = text_extracted
 
-            response = categorize_document(ibm_url, ibm_project_id, int(max_tokens), st.session_state['document_text'])
-            st.session_state['document_type'] = response  # Store response in session state
+        submit_job('categorize_document', stream_categorize_document, (ibm_url, ibm_project_id, int(max_tokens), st.session_state['document_text']), [st.session_state['document_text']], {'max_tokens': int(max_tokens)})
+
+    if 'categorize_document' in st.session_state.get('jobs', {}):
         st.header('Document Type')
-        st.write(st.session_state['document_type'])
+        show_job('categorize_document', 'document_type')
 
 
 # Verify Contract
@@ -364,8 +573,25 @@ elif st.session_state.operation == 'verify_contract':
     st.header('Verify Contract')
     st.write('<p style="font-size:20px;">Verify that your contract is uploaded to blockchain.</p>', unsafe_allow_html=True)
 
+    storage_mode = STORAGE_MODES[st.radio('Storage mode used for the upload', list(STORAGE_MODES))]
+
     uploaded_contract = st.file_uploader('Upload the contract file', type=['pdf'])
-    contract_address = st.text_input("Enter the contract address to verify")
+    if storage_mode == MERKLE_BATCH_MODE:
+        # The inclusion receipt carries the contract address of the batch together with the proof
+        receipt_file = st.file_uploader('Upload the inclusion receipt of the contract', type=['json'])
+        inclusion_receipt = None
+        if receipt_file:
+            try:
+                inclusion_receipt = json.loads(receipt_file.getvalue())
+            except ValueError:
+                st.error("The uploaded receipt is not valid JSON. Please upload the receipt downloaded after the upload.")
+            else:
+                if not isinstance(inclusion_receipt, dict) or 'contract_address' not in inclusion_receipt:
+                    st.error("The uploaded file is not an inclusion receipt. Please upload the receipt downloaded after the upload.")
+                    inclusion_receipt = None
+        contract_address = inclusion_receipt['contract_address'] if inclusion_receipt else ''
+    else:
+        contract_address = st.text_input("Enter the contract address to verify")
 
     def is_valid_eth_address(address):
         return Web3.is_address(address)
@@ -380,32 +606,38 @@ elif st.session_state.operation == 'verify_contract':
                 # Extract text from the uploaded PDF
                 uploaded_contract_content = extract_text_from_pdf(uploaded_contract)
 
-                # Normalize the uploaded contract content
-                normalized_uploaded_content = normalize_text(uploaded_contract_content)
-
                 try:
-                    # Load the deployed contract
-                    Contract = w3.eth.contract(address=checksum_address, abi=contract_interface['abi'])
-
-                    # Fetch the contract content stored on the blockchain
-                    stored_contract_content = Contract.functions.getContractContent().call()
-
-                    # Normalize the stored contract content
-                    normalized_stored_content = normalize_text(stored_contract_content)
+                    # Compare the normalized texts, or the local digest with the anchored one
+                    contract_interface = get_contract_interface(MODE_CONTRACTS[storage_mode])
+                    if storage_mode == MERKLE_BATCH_MODE:
+                        inclusion_receipt['contract_address'] = checksum_address
+                        verification = verify_batch_document(w3, contract_interface, inclusion_receipt, uploaded_contract_content)
+                    else:
+                        verification = verify_document(w3, contract_interface, storage_mode, checksum_address, uploaded_contract_content)
 
-                    # Compare the normalized texts
-                    if normalized_uploaded_content == normalized_stored_content:
+                    if verification['matches']:
                         st.success("The uploaded contract content matches the contract stored on the blockchain.")
                     else:
                         st.warning("The uploaded contract content does not match the contract stored on the blockchain.")
 
-                        # Optionally, you can display the differences using difflib
-                        diff = difflib.ndiff(normalized_uploaded_content.splitlines(), normalized_stored_content.splitlines())
-                        st.text('\n'.join(diff))
+                        if storage_mode == FULL_TEXT_MODE:
+                            # Word-level diff of the stored and the uploaded text, showing only the changed regions
+                            document_diff = word_diff(verification['stored'], verification['uploaded'])
+                            # A diff cut short reports unaligned text as replaced, so its counts are only upper bounds
+                            approximately = 'up to ' if document_diff['truncated'] else ''
+                            st.write(f"{approximately}{document_diff['removed_words']} words removed and {approximately}{document_diff['added_words']} words added in {document_diff['total_hunks']} places.")
+                            st.markdown(format_diff_html(document_diff), unsafe_allow_html=True)
+
+                    if storage_mode == HASH_ANCHOR_MODE:
+                        st.write(f"Local SHA-256: {verification['local_digest']}")
+                        st.write(f"Anchored SHA-256: {verification['anchored_digest']}, by {verification['anchored_by']} at block time {verification['anchored_at']}")
+                    elif storage_mode == MERKLE_BATCH_MODE:
+                        st.write(f"Local SHA-256: {verification['local_digest']}")
+                        st.write(f"Anchored Merkle root: {verification['anchored_root']} of {verification['document_count']} contracts, by {verification['anchored_by']} at block time {verification['anchored_at']}")
                 except Exception as e:
                     st.error(f"An error occurred while verifying the contract: {str(e)}")
         else:
-            st.error("Please upload a contract file and enter a valid contract address.")
+            st.error("Please upload a contract file and enter a valid contract address or inclusion receipt.")
 
     
 
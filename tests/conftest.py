@@ -0,0 +1,6 @@
+import os
+import sys
+
+
+# The modules are imported from the repository root, as main.py and the benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,86 @@
+import pytest
+
+from helper_functions.clause_library import assemble_draft, build_skeleton, load_clause_library
+from helper_functions.contract_catalog import CONTRACT_TYPES, COUNTRIES
+
+
+def skeleton():
+    sections = [
+        {"kind": "parties", "title": "Parties", "heading": "## 1. Parties", "text": "Parties text.", "fill": None},
+        {"kind": "purpose", "title": "Purpose", "heading": "## 2. Purpose", "text": "Purpose default.", "fill": "The purpose."},
+        {"kind": "term", "title": "Term", "heading": "## 3. Term", "text": "Term text.", "fill": None},
+        {"kind": "fees", "title": "Fees and Payment", "heading": "## 4. Fees and Payment", "text": "Fees default.", "fill": "The fees."},
+        {"kind": "signatures", "title": "Signatures", "heading": "## Signatures", "text": "Signatures text.", "fill": None},
+    ]
+    return {"title": "Test Agreement", "sections": sections}
+
+
+def assemble(generated, piece_size=None):
+    if piece_size:
+        generated = [generated[index:index + piece_size] for index in range(0, len(generated), piece_size)]
+    else:
+        generated = [generated]
+    return "".join(assemble_draft(skeleton(), generated))
+
+
+def expected(purpose="Purpose default.\n\n", fees="Fees default.\n\n"):
+    return (
+        "# Test Agreement\n\n"
+        "## 1. Parties\n\nParties text.\n\n"
+        f"## 2. Purpose\n\n{purpose}"
+        "## 3. Term\n\nTerm text.\n\n"
+        f"## 4. Fees and Payment\n\n{fees}"
+        "## Signatures\n\nSignatures text.\n\n"
+    )
+
+
+@pytest.mark.parametrize("purpose_heading, fees_heading", [
+    ("Purpose", "Fees and Payment"),
+    ("## Purpose", "## Fees and Payment"),
+    ("### 2. Purpose", "### 4. Fees and Payment"),
+    ("**Purpose:**", "**Fees and Payment**"),
+    ("2.1 purpose:", "FEES AND PAYMENT"),
+])
+def test_headings_are_matched_in_any_markup(purpose_heading, fees_heading):
+    generated = f"{purpose_heading}\nTo evaluate a deal.\n{fees_heading}\nMonthly fee of 5000.\n"
+    assert assemble(generated) == expected("To evaluate a deal.\n\n", "Monthly fee of 5000.\n\n")
+
+
+@pytest.mark.parametrize("piece_size", [1, 3, 7])
+def test_pieces_of_any_size_give_the_same_draft(piece_size):
+    generated = "## 2. Purpose\nTo evaluate a deal.\n## 4. Fees and Payment\nMonthly fee of 5000.\n"
+    assert assemble(generated, piece_size) == assemble(generated)
+
+
+def test_skipped_and_empty_sections_keep_the_library_text():
+    assert assemble("") == expected()
+    assert assemble("## Purpose\n\n\n## Fees and Payment\nMonthly fee.") == expected(fees="Monthly fee.\n\n")
+
+
+def test_preamble_repeated_and_unrequested_sections_are_dropped():
+    generated = (
+        "Here is the draft you asked for.\n"
+        "## Parties\nThe model rewrote the parties.\n"
+        "## Purpose\nTo evaluate a deal.\n"
+        "## Term\nThe model rewrote the term.\n"
+        "## Purpose\nA second purpose.\n"
+        "## Fees and Payment\nMonthly fee.\n"
+        "## Signatures\nSigned.\n"
+    )
+    assert assemble(generated) == expected("To evaluate a deal.\n\n", "Monthly fee.\n\n")
+
+
+def test_sections_out_of_order_are_not_written_twice():
+    generated = "## Fees and Payment\nMonthly fee.\n## Purpose\nTo evaluate a deal.\n"
+    # Once the model moved past Purpose, its library text stands and the late section is dropped
+    assert assemble(generated) == expected(fees="Monthly fee.\n\n")
+
+
+def test_every_contract_type_and_country_has_a_skeleton():
+    library = load_clause_library()
+    for contract_type in CONTRACT_TYPES:
+        for country in COUNTRIES:
+            built = build_skeleton(contract_type, "Acme Corp", "Beta LLC", country, library)
+            draft = "".join(assemble_draft(built, []))
+            for section in built["sections"]:
+                assert section["heading"] in draft
@@ -0,0 +1,88 @@
+import threading
+import time
+
+from helper_functions.job_store import DONE, FAILED, JobStore
+
+
+def test_concurrent_identical_submits_run_once(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), max_workers=4)
+    calls = []
+    release = threading.Event()
+
+    def analyse(text):
+        calls.append(text)
+        release.wait(5)
+        return {"length": len(text)}
+
+    job_ids = []
+    barrier = threading.Barrier(16)
+
+    def submit():
+        barrier.wait()
+        job_ids.append(
+            store.submit("review_contract", analyse, ("contract",), documents=["contract"], parameters={"max_tokens": 100})
+        )
+
+    threads = [threading.Thread(target=submit) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+
+    assert len(set(job_ids)) == 1
+    job = store.wait(job_ids[0], timeout=5)
+    assert job["status"] == DONE
+    assert job["result"] == {"length": 8}
+    assert calls == ["contract"]
+    assert store.stats()["submitted"] == 1
+    assert store.stats()["coalesced"] == 15
+    store.shutdown()
+
+
+def test_different_requests_and_finished_jobs_are_not_coalesced(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), max_workers=2)
+
+    first = store.submit("review_contract", len, ("a",), documents=["a"], parameters={"max_tokens": 100})
+    other_parameters = store.submit("review_contract", len, ("a",), documents=["a"], parameters={"max_tokens": 200})
+    other_document = store.submit("review_contract", len, ("b",), documents=["b"], parameters={"max_tokens": 100})
+    assert len({first, other_parameters, other_document}) == 3
+
+    assert store.wait(first, timeout=5)["status"] == DONE
+    # A finished job is kept for reading, but an identical request afterwards runs again
+    assert store.submit("review_contract", len, ("a",), documents=["a"], parameters={"max_tokens": 100}) != first
+    store.shutdown()
+
+
+def test_failed_and_streaming_jobs(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), max_workers=2)
+
+    def fail():
+        raise RuntimeError("Watsonx is down")
+
+    def stream():
+        yield "Draft "
+        time.sleep(0.05)
+        yield "contract"
+
+    failed = store.wait(store.submit("review_contract", fail, ()), timeout=5)
+    assert failed["status"] == FAILED
+    assert failed["error"] == "RuntimeError: Watsonx is down"
+
+    streamed = store.wait(store.submit("draft_contract", stream, ()), timeout=5)
+    assert streamed["status"] == DONE
+    assert streamed["result"] == "Draft contract"
+    store.shutdown()
+
+
+def test_jobs_survive_a_new_store_on_the_same_file(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path, max_workers=1)
+    job_id = store.submit("review_contract", len, ("abc",), documents=["abc"])
+    store.wait(job_id, timeout=5)
+    store.shutdown()
+
+    reopened = JobStore(path, max_workers=1)
+    assert reopened.get(job_id)["result"] == 3
+    assert reopened.get("unknown") is None
+    reopened.shutdown()
@@ -0,0 +1,82 @@
+import hashlib
+
+import pytest
+
+from helper_functions.merkle import build_merkle_tree, merkle_proof, merkle_root, verify_merkle_proof
+
+
+def digests(count):
+    return [hashlib.sha256(f"document {index}".encode("utf-8")).digest() for index in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4, 5, 7, 8, 9, 16, 33])
+def test_every_proof_verifies(count):
+    leaves = digests(count)
+    levels = build_merkle_tree(leaves)
+    root = merkle_root(levels)
+    for index, digest in enumerate(leaves):
+        assert verify_merkle_proof(digest, merkle_proof(levels, index), root)
+
+
+def test_single_document_root_is_its_leaf_hash():
+    leaves = digests(1)
+    levels = build_merkle_tree(leaves)
+    assert merkle_proof(levels, 0) == []
+    assert merkle_root(levels) == hashlib.sha256(b"\x00" + leaves[0]).digest()
+
+
+def test_empty_batch_is_rejected():
+    with pytest.raises(ValueError):
+        build_merkle_tree([])
+
+
+def test_tampered_document_fails():
+    leaves = digests(5)
+    levels = build_merkle_tree(leaves)
+    root = merkle_root(levels)
+    tampered = hashlib.sha256(b"tampered").digest()
+    for index in range(len(leaves)):
+        assert not verify_merkle_proof(tampered, merkle_proof(levels, index), root)
+
+
+def test_proof_of_another_document_fails():
+    leaves = digests(6)
+    levels = build_merkle_tree(leaves)
+    root = merkle_root(levels)
+    assert not verify_merkle_proof(leaves[0], merkle_proof(levels, 1), root)
+
+
+def test_tampered_proof_fails():
+    leaves = digests(7)
+    levels = build_merkle_tree(leaves)
+    root = merkle_root(levels)
+    for index, digest in enumerate(leaves):
+        proof = merkle_proof(levels, index)
+        for step_index, step in enumerate(proof):
+            flipped = [dict(s) for s in proof]
+            flipped[step_index]["position"] = "right" if step["position"] == "left" else "left"
+            assert not verify_merkle_proof(digest, flipped, root)
+
+            changed = [dict(s) for s in proof]
+            sibling = bytearray.fromhex(step["sibling"])
+            sibling[0] ^= 1
+            changed[step_index]["sibling"] = sibling.hex()
+            assert not verify_merkle_proof(digest, changed, root)
+
+        if proof:
+            assert not verify_merkle_proof(digest, proof[:-1], root)
+
+
+def test_other_root_fails():
+    leaves = digests(4)
+    levels = build_merkle_tree(leaves)
+    other_root = merkle_root(build_merkle_tree(digests(5)))
+    assert not verify_merkle_proof(leaves[0], merkle_proof(levels, 0), other_root)
+
+
+def test_inner_node_does_not_pass_as_document():
+    leaves = digests(4)
+    levels = build_merkle_tree(leaves)
+    root = merkle_root(levels)
+    # The parent of the first two leaves, with the proof of that parent, must not verify as a leaf
+    assert not verify_merkle_proof(levels[1][0], merkle_proof(levels, 0)[1:], root)
@@ -0,0 +1,81 @@
+import random
+import re
+
+import markdown
+import pytest
+from bs4 import BeautifulSoup
+
+from helper_functions.normalization import normalize_pages, normalize_text
+
+
+def baseline_normalize_text(text):
+    # normalize_text before the fast path: every text went through markdown and BeautifulSoup
+    html_content = markdown.markdown(text)
+    soup = BeautifulSoup(html_content, "html.parser")
+    plain_text = soup.get_text()
+    plain_text = re.sub(r'\s+', ' ', plain_text)
+    plain_text = plain_text.strip()
+    plain_text = plain_text.lower()
+    plain_text = re.sub(r'_+', '[underscore]', plain_text)
+    return plain_text
+
+
+CORPUS = [
+    "",
+    "   \n\t ",
+    "This Agreement is made between Acme Corp and Beta LLC.",
+    "Line one\nLine two\r\nLine three\rLine four",
+    "Signed: ________________ Date: ____",
+    "snake_case_word and _leading and trailing_",
+    "Name: _ \nTitle: _",
+    "Page 1 of 3\n\n1. Definitions\n2. Term\n",
+    "Intro paragraph\n\n1. First item\n2. Second item",
+    "Intro paragraph\n1. Not a list after text",
+    "- dash item\n- another",
+    "Text\n\n* starred item",
+    "# Heading\n\nBody text",
+    "Heading\n=======\n\nBody",
+    "Subheading\n-------",
+    "> quoted clause\ncontinues",
+    "Above\n\n---\n\nBelow",
+    "Above\n***\nBelow",
+    "**Bold** and *italic* and `code`",
+    "Escaped \\* star and \\_ underscore",
+    "AT&T and &amp; and &#169; and &copy without semicolon",
+    "Tom & Jerry & Co",
+    "See [the annex](http://example.com) for details",
+    "Reference [annex]\n\n[annex]: http://example.com",
+    "Square [brackets] without links",
+    "<b>inline html</b> and <https://example.com>",
+    "1 < 2 and 3 > 2",
+    "    indented code block\n\nafter",
+    "text\n    indented continuation\n- item",
+    "Tabs\tbetween\twords and non-breaking spaces",
+    "Form\x0cfeed and vertical\x0btab",
+    "UPPER and MiXeD CaSe",
+    "Price: $1,000.00 (one thousand) - 50% off; see s. 2(a)(iii).",
+    "Ünïcödé clause — “quoted” ‘text’ …",
+    "trailing spaces  \nhard break",
+    "a_b_c\nd_e",
+]
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_normalize_text_matches_baseline(text):
+    assert normalize_text(text) == baseline_normalize_text(text)
+
+
+def test_normalize_text_matches_baseline_on_random_text():
+    pieces = ["word", "Clause", "_", "__", "*", "#", ">", "-", "1.", "&", "[", "]", "(", ")", ":", "`", "\\",
+              " ", " ", " ", "\t", "\n", "\n", "\n\n", "\r\n", "    ", "=", "<", "a_b"]
+    generator = random.Random(0)
+    for _ in range(500):
+        text = "".join(generator.choice(pieces) for _ in range(generator.randint(1, 30)))
+        assert normalize_text(text) == baseline_normalize_text(text), repr(text)
+
+
+@pytest.mark.parametrize("text", CORPUS)
+def test_normalize_pages_joins_to_normalize_text(text):
+    middle = len(text) // 2
+    pages = [text[:middle], text[middle:]]
+    assert "".join(normalize_pages(pages)) == normalize_text(text)
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+import helper_functions.word_diff as word_diff_module
+from helper_functions.word_diff import diff_words, format_diff_html, word_diff
+
+
+def apply_opcodes(original_words, new_words, opcodes):
+    # Rebuilds the new text from the original: equal runs are copied from it, every other run comes from the new text
+    rebuilt = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == "equal":
+            assert original_words[i1:i2] == new_words[j1:j2]
+            rebuilt.extend(original_words[i1:i2])
+        else:
+            assert tag in ("replace", "delete", "insert")
+            assert (tag == "delete") == (j1 == j2) and (tag == "insert") == (i1 == i2)
+            rebuilt.extend(new_words[j1:j2])
+        i, j = i2, j2
+    assert (i, j) == (len(original_words), len(new_words))
+    return rebuilt
+
+
+def edit(words, generator, edits):
+    words = list(words)
+    vocabulary = ["alpha", "beta", "gamma", "delta", "party", "term", "fee", "the", "shall"]
+    for _ in range(edits):
+        position = generator.randint(0, len(words))
+        action = generator.choice(("insert", "delete", "replace"))
+        if action == "insert" or not words:
+            words[position:position] = [generator.choice(vocabulary) for _ in range(generator.randint(1, 4))]
+        elif action == "delete":
+            del words[position:position + generator.randint(1, 4)]
+        else:
+            words[position:position + 1] = [generator.choice(vocabulary)]
+    return words
+
+
+def edit_distance(opcodes):
+    return sum(i2 - i1 + j2 - j1 for tag, i1, i2, j1, j2 in opcodes if tag != "equal")
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_opcodes_rebuild_the_new_text(seed):
+    generator = random.Random(seed)
+    vocabulary = ["the", "party", "shall", "pay", "fee", "term", "notice", "days", "law", "of"]
+    original = [generator.choice(vocabulary) for _ in range(generator.randint(0, 300))]
+    new = edit(original, generator, generator.randint(0, 12))
+
+    opcodes = diff_words(original, new)
+    assert apply_opcodes(original, new, opcodes) == new
+
+
+def test_identical_and_empty_inputs():
+    words = "this agreement is made between the parties".split()
+    assert diff_words(words, words) == [("equal", 0, len(words), 0, len(words))]
+    assert diff_words([], []) == []
+    assert diff_words([], words) == [("insert", 0, 0, 0, len(words))]
+    assert diff_words(words, []) == [("delete", 0, len(words), 0, 0)]
+
+
+def test_single_change_is_minimal():
+    original = "the fee is payable within thirty days of the invoice".split()
+    new = "the fee is payable within sixty days of the invoice".split()
+    opcodes = diff_words(original, new)
+    assert [opcode for opcode in opcodes if opcode[0] != "equal"] == [("replace", 5, 6, 5, 6)]
+
+
+def test_word_diff_counts_and_hunks():
+    original = " ".join(f"w{index}" for index in range(100))
+    new = original.replace("w10 ", "").replace("w80", "w80 added")
+    result = word_diff(original, new)
+    assert result["removed_words"] == 1
+    assert result["added_words"] == 1
+    assert result["total_hunks"] == 2
+    assert len(result["hunks"]) == 2
+    assert result["truncated"] is False
+
+
+def test_word_diff_without_changes():
+    result = word_diff("same text here", "same   text\nhere")
+    assert result == {"hunks": [], "total_hunks": 0, "removed_words": 0, "added_words": 0, "truncated": False}
+
+
+def test_work_limit_sets_truncated(monkeypatch):
+    generator = random.Random(1)
+    original = [f"a{generator.randint(0, 20)}" for _ in range(2000)]
+    new = [f"a{generator.randint(0, 20)}" for _ in range(2000)]
+    monkeypatch.setattr(word_diff_module, "MAX_DIFF_WORK", 1000)
+
+    # A diff cut short is still a valid, if coarser, edit script
+    assert apply_opcodes(original, new, diff_words(original, new)) == new
+    result = word_diff(" ".join(original), " ".join(new))
+    assert result["truncated"] is True
+    assert format_diff_html(result).startswith("<p><em>The documents differ too much")
+    assert not format_diff_html(word_diff("a b c", "a x c")).startswith("<p><em>")